@@ -1,4 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Cache backends whose contents are private to one process
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
 
 
 class ConfigConfig(AppConfig):
@@ -6,4 +14,12 @@ class ConfigConfig(AppConfig):
     name = 'config'
     
     def ready(self):
-        import config.signals
\ No newline at end of file
+        # Auth invalidation, the token blacklist, lockouts and OTPs rely on one cache shared
+        # by all workers; refuse to start on a per-process one outside development.
+        backend = settings.CACHES['default']['BACKEND']
+        if backend in PROCESS_LOCAL_CACHES and not settings.ALLOW_PROCESS_LOCAL_CACHE:
+            raise ImproperlyConfigured(
+                f"The default cache ({backend}) is not shared between worker processes. "
+                "Set CACHE_URL to a Redis server, or ALLOW_PROCESS_LOCAL_CACHE for a single-process setup."
+            )
+        import config.signals
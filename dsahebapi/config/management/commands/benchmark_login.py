@@ -0,0 +1,34 @@
+import asyncio
+import os
+import time
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from config.utils.hashing import HashingPool
+
+
+class Command(BaseCommand):
+    help = "Measure password checks per second through the hashing pool at increasing worker counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help="Password checks per run.")
+        parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help="Largest pool size to try.")
+
+    def handle(self, *args, **options):
+        encoded = make_password('benchmark-password')
+        logins = options['logins']
+        workers = 1
+        baseline = None
+        while workers <= options['max_workers']:
+            pool = HashingPool(workers=workers, max_pending=logins)
+            elapsed = asyncio.run(self.run(pool, encoded, logins))
+            pool.executor.shutdown()
+            rate = logins / elapsed
+            baseline = baseline or rate
+            self.stdout.write(f"{workers:>3} workers: {rate:8.1f} logins/s ({rate / baseline:.2f}x)")
+            workers *= 2
+
+    async def run(self, pool, encoded, logins):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(pool.run(check_password, 'benchmark-password', encoded) for _ in range(logins)))
+        assert all(results)
+        return time.perf_counter() - started
@@ -0,0 +1,35 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from config.utils.onboarding import Onboarder, claim_job, parse_records, run_job
+
+
+class Command(BaseCommand):
+    help = "Create users in bulk from a CSV/NDJSON file (mobile, name, usertype) or from uploaded onboarding jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="CSV (with header) or NDJSON file.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Default: from the file extension.")
+        parser.add_argument('--jobs', action='store_true', help="Run the pending jobs uploaded through the API instead.")
+        parser.add_argument('--processes', type=int, default=None, help="Password hashing processes (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Users inserted per transaction.")
+
+    def handle(self, *args, **options):
+        if options['jobs']:
+            while (job := claim_job()) is not None:
+                run_job(job, options['processes'], options['chunk_size'])
+                self.stdout.write(f"Job {job.id} {job.status}: created {job.created_count}, skipped {job.skipped_count}, {len(job.errors)} errors.")
+            return
+        if not options['path']:
+            raise CommandError("Give a file to onboard or --jobs.")
+
+        format = options['format'] or ('ndjson' if os.path.splitext(options['path'])[1] in ('.ndjson', '.jsonl') else 'csv')
+        with open(options['path'], encoding='utf-8-sig') as f:
+            text = f.read()
+
+        def progress(onboarder):
+            self.stdout.write(f"Created {onboarder.created}, skipped {onboarder.skipped}...")
+
+        onboarder = Onboarder(options['processes'], options['chunk_size']).run(parse_records(text, format), progress)
+        for error in onboarder.errors:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(f"Created {onboarder.created} users, skipped {onboarder.skipped} existing, {len(onboarder.errors)} invalid rows."))
@@ -0,0 +1,27 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from config.models import LoginAttempt
+
+
+class Command(BaseCommand):
+    help = "Delete LoginAttempt audit rows older than the retention period, in small chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Retention period in days.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--sleep', type=float, default=0.1, help="Seconds to pause between chunks.")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options['days'])
+        old = LoginAttempt.objects.filter(attempted_at__lt=cutoff)
+        deleted = 0
+        while True:
+            ids = list(old.values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            LoginAttempt.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} login attempts."))
@@ -0,0 +1,28 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils.timezone import now
+from config.models import OTP
+
+
+class Command(BaseCommand):
+    help = "Delete expired and verified OTPs in small chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=float, default=24, help="Keep rows this much younger than now (for support lookups).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.1, help="Seconds to pause between chunks to spare replicas.")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(hours=options['keep_hours'])
+        stale = OTP.objects.filter(Q(expires_at__lt=cutoff) | Q(is_verified=True, created_at__lt=cutoff))
+        deleted = 0
+        while True:
+            ids = list(stale.order_by('id').values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            OTP.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} OTPs."))
@@ -0,0 +1,27 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from config.models import SMSMessage
+
+
+class Command(BaseCommand):
+    help = "Delete sent and failed outbox messages in small chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=float, default=7, help="Keep rows this much younger than now (for delivery lookups).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.1, help="Seconds to pause between chunks to spare replicas.")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options['keep_days'])
+        finished = SMSMessage.objects.filter(status__in=['sent', 'failed'], created_at__lt=cutoff)
+        deleted = 0
+        while True:
+            ids = list(finished.order_by('id').values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            SMSMessage.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} SMS messages."))
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from config.utils.deferred import deferred_effects
+
+
+class Command(BaseCommand):
+    help = "Run the side effects queued by model signals (signup OTPs and the like)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the queued effects once and exit.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Effects claimed per pass.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            claimed = deferred_effects.run_pending(options['batch_size'])
+            if claimed:
+                self.stdout.write(f"Ran {claimed} effects.")
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from config.utils.sms import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued SMS from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due messages once and exit.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Messages claimed per pass (default SMS_BATCH_SIZE).")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = process_outbox(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
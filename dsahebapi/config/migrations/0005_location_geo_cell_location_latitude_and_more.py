@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0004_loginattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
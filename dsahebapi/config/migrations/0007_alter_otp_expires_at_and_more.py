@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0006_smsmessage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='otp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['phone_number', 'is_verified', 'created_at'], name='config_otp_phone_n_18302a_idx'),
+        ),
+    ]
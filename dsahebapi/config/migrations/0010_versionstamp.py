@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0009_onboardingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=150, unique=True)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+    ]
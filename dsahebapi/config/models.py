@@ -4,6 +4,7 @@ import uuid
 from datetime import timedelta
 from django.utils.timezone import now
 from django.conf import settings
+from config.utils.geo import grid_cell
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, mobile, name, usertype, password=None, **extra_fields):
@@ -62,7 +63,7 @@ class OTP(models.Model):
     phone_number = models.CharField(max_length=15)  # Phone number for OTP
     otp = models.CharField(max_length=6)  # The OTP code
     created_at = models.DateTimeField(auto_now_add=True)  # When the OTP was created
-    expires_at = models.DateTimeField()  # When the OTP will expire
+    expires_at = models.DateTimeField(db_index=True)  # When the OTP will expire
     is_sent = models.BooleanField(default=False)  # OTP
     is_verified = models.BooleanField(default=False)  # OTP verification status
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)  # Unique identifier for tracking OTPs
@@ -80,10 +81,104 @@ class OTP(models.Model):
     def __str__(self):
         return f"OTP for {self.phone_number} (Verified: {self.is_verified})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['phone_number', 'is_verified', 'created_at']),
+        ]
+
+
+class SMSMessage(models.Model):
+    """
+    Outbox row for one SMS; written on the request path and delivered by the run_sms_worker command.
+    The text is erased once the row is sent or failed; purge_sms deletes old finished rows.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    phone_number = models.CharField(max_length=15)
+    message = models.TextField()
+    otp = models.ForeignKey(OTP, on_delete=models.SET_NULL, related_name='sms_messages', null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"SMS to {self.phone_number} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+
+class OnboardingJob(models.Model):
+    """
+    An uploaded CSV/NDJSON file of users to create; processed by the onboard_users command.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, related_name='onboarding_jobs', null=True, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    payload = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Onboarding job {self.id} ({self.status})"
+
+
+class VersionStamp(models.Model):
+    """
+    Source of truth for the version stamps of config.utils.versioning; the cache holds copies.
+    """
+    label = models.CharField(max_length=150, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.label}: {self.version}"
+
+
+class DeferredEffect(models.Model):
+    """
+    A signal side effect stored in the transaction of the write that caused it; run and
+    deleted by the run_deferred_effects command (config.utils.deferred).
+    """
+    name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} for {self.object_id}"
+
+    class Meta:
+        unique_together = ('name', 'object_id')
+
 
 class LoginAttempt(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    attempted_at = models.DateTimeField(default=now)
+    attempted_at = models.DateTimeField(default=now, db_index=True)
     successful = models.BooleanField(default=False)
 
 # Max attempts allowed before lockout
@@ -143,6 +238,13 @@ class City(models.Model):
 class Location(models.Model):
     name = models.CharField(max_length=255)
     cities = models.ForeignKey(City, related_name='locations', on_delete=models.CASCADE)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geo_cell = models.CharField(max_length=24, db_index=True, blank=True, null=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
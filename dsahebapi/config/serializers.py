@@ -63,7 +63,7 @@ class LocationSerializer(Schema):
 class ServicesSerializer(Schema):
     id: int
     name: str
-    description: str
+    description: Optional[str]
 
 class SpecializationSerializer(Schema):
     id: int
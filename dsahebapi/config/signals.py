@@ -1,14 +1,80 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.core.exceptions import ObjectDoesNotExist
-from config.utils.otp_utils import send_otp_for_signal
-from .models import CustomUser
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from config.utils.otp_utils import send_otp
+from config.utils.deferred import deferred_effects
+from config.utils.jwt_auth import invalidate_user_on_commit
+from config.utils.token_blacklist import blacklist_changed
+from config.utils.autocomplete import autocomplete_index
+from config.utils.versioning import table_changed
+from .models import CustomUser, Services, Specialization, State, City, Location, University, Degree, College, Memberships, Registration
+
+@deferred_effects.register('send_signup_otp')
+def send_signup_otps(user_ids):
+    for user in CustomUser.objects.filter(id__in=user_ids, usertype='patient', is_verified=False):
+        send_otp(user.mobile, user=user)
+
 
 @receiver(post_save, sender=CustomUser)
 def create_and_send_otp(sender, instance, created, **kwargs):
-
+    # Queued with the INSERT and sent by the run_deferred_effects worker after commit.
     if created and instance.usertype == 'patient':
-        status, message = send_otp_for_signal(instance)
-        if status:
-            instance.is_sent = True
-            instance.save()
+        deferred_effects.defer('send_signup_otp', instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_auth(sender, instance, **kwargs):
+    # Covers password resets and is_active changes; queryset.update() must call invalidate_user itself.
+    invalidate_user_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_blacklisted_auth(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(blacklist_changed)
+        if instance.token.user_id:
+            invalidate_user_on_commit(instance.token.user_id)
+
+
+@receiver(post_save, sender=Services)
+@receiver(post_save, sender=Specialization)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Degree)
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=Services)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Degree)
+@receiver(post_delete, sender=College)
+def update_autocomplete(sender, instance, **kwargs):
+    autocomplete_index.update(instance)
+
+
+@receiver(post_save, sender=State)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Services)
+@receiver(post_save, sender=Specialization)
+@receiver(post_save, sender=University)
+@receiver(post_save, sender=College)
+@receiver(post_save, sender=Degree)
+@receiver(post_save, sender=Memberships)
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=State)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Services)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_delete, sender=University)
+@receiver(post_delete, sender=College)
+@receiver(post_delete, sender=Degree)
+@receiver(post_delete, sender=Memberships)
+@receiver(post_delete, sender=Registration)
+def invalidate_reference_snapshot(sender, **kwargs):
+    # After commit, so no request rebuilds a snapshot from the old rows under the new version.
+    transaction.on_commit(lambda: table_changed(sender))
@@ -1,3 +1,696 @@
-from django.test import TestCase
+import asyncio
+from asgiref.sync import async_to_sync
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
+from io import StringIO
+from datetime import timedelta
+from django.core.cache import cache
+from django.apps import apps
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from ninja.errors import HttpError
+from config.utils.hashing import HashingPool, PoolSaturated, hashing_pool
+from config.models import OTP, City, College, CustomUser, DeferredEffect, LoginAttempt, OnboardingJob, Services, SMSMessage, State, University, VersionStamp
+from config.utils import rate_limit
+from config.utils.autocomplete import MAX_SUGGESTIONS, AutocompleteIndex, Trie
+from config.utils.deferred import STALE_CLAIM, DeferredEffects
+from config.utils.loaders import DataLoader
+from config.utils.pagination import encode_cursor, paginate_queryset
+from config.serializers import CollegeSerializer
+from config.utils.jwt_auth import JWTAuth
+from config.utils.login_guard import arecord_failure
+from config.utils.onboarding import generate_password
+from config.utils.otp_utils import create_otp, send_otp, verify_otp
+from config.utils.otp_store import CACHE_KEY
+from config.utils.sms import LocmemSMSBackend, enqueue_many, process_outbox
+from config.utils.token_blacklist import RESYNC_INTERVAL, blacklist_filter
+from config.utils.versioning import table_label
 
-# Create your tests here.
+
+class JWTAuthCacheTests(TestCase):
+    def setUp(self):
+        JWTAuth.tokens.clear()
+        JWTAuth.users.clear()
+        blacklist_filter.clear()
+        self.user = CustomUser.objects.create(mobile='9000000000', name='Doctor', usertype='doctor')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.auth = JWTAuth()
+
+    def authenticate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.auth.authenticate(None, self.token)
+
+    def test_repeated_requests_skip_user_query(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+
+    def test_user_changes_invalidate_cache(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.name = 'Renamed'
+            self.user.save()
+        self.assertEqual(self.authenticate().name, 'Renamed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(self.authenticate())
+
+    def test_cached_user_is_not_shared(self):
+        self.authenticate().name = 'Changed in a view'
+        self.assertEqual(self.authenticate().name, 'Doctor')
+
+    def test_invalid_token_is_rejected(self):
+        self.assertIsNone(self.auth.authenticate(None, 'not-a-token'))
+
+    @override_settings(ALLOW_PROCESS_LOCAL_CACHE=False)
+    def test_startup_requires_a_shared_cache(self):
+        # Version stamps in a per-process cache would leave other workers trusting revoked tokens
+        with self.assertRaises(ImproperlyConfigured):
+            apps.get_app_config('config').ready()
+
+
+class LogoutTests(TestCase):
+    def setUp(self):
+        JWTAuth.tokens.clear()
+        JWTAuth.users.clear()
+        blacklist_filter.clear()
+        self.user = CustomUser.objects.create(mobile='9000000000', name='Doctor', usertype='doctor')
+        self.other = CustomUser.objects.create(mobile='9000000001', name='Other', usertype='doctor')
+        self.refresh_tokens = [RefreshToken.for_user(self.user) for _ in range(30)]
+        self.access = str(self.refresh_tokens[0].access_token)
+        self.other_access = str(RefreshToken.for_user(self.other).access_token)
+
+    def logout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/users/logout', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_logout_blacklists_in_constant_queries(self):
+        JWTAuth().authenticate(None, self.access)
+        # access token insert, pending ids select, one blacklist insert for all 31 tokens,
+        # then the blacklist and user version stamp upserts after commit
+        with self.assertNumQueries(5):
+            response = self.logout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BlacklistedToken.objects.filter(token__user=self.user).count(), 31)
+        self.assertEqual(OutstandingToken.objects.filter(user=self.other, blacklistedtoken__isnull=False).count(), 0)
+
+    def test_filter_resyncs_without_a_version_bump(self):
+        outstanding = OutstandingToken.objects.get(jti=self.refresh_tokens[1]['jti'])
+        self.assertFalse(blacklist_filter.contains(outstanding.jti))
+        # Blacklisted elsewhere with no version bump reaching this process (bulk_create sends no signal)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=outstanding)])
+        blacklist_filter.checked_at = 0
+        self.assertFalse(blacklist_filter.contains(outstanding.jti))
+        blacklist_filter.refreshed_at -= RESYNC_INTERVAL
+        blacklist_filter.checked_at = 0
+        self.assertTrue(blacklist_filter.contains(outstanding.jti))
+
+    def test_logged_out_access_token_is_rejected(self):
+        auth = JWTAuth()
+        self.assertEqual(auth.authenticate(None, self.access), self.user)
+        self.logout()
+        self.assertIsNone(auth.authenticate(None, self.access))
+        self.assertEqual(auth.authenticate(None, self.other_access), self.other)
+        self.assertEqual(self.logout().status_code, 401)
+
+
+@override_settings(SMS_BACKEND='config.utils.sms.LocmemSMSBackend', SMS_MAX_ATTEMPTS=2)
+class SMSOutboxTests(TestCase):
+    def setUp(self):
+        LocmemSMSBackend.outbox = []
+        LocmemSMSBackend.failing_numbers = set()
+
+    def test_send_otp_only_queues(self):
+        self.assertEqual(send_otp('9000000000')[0], True)
+        self.assertEqual(LocmemSMSBackend.outbox, [])
+        self.assertEqual(process_outbox(), (1, 0))
+        self.assertEqual(LocmemSMSBackend.outbox[0][0], '9000000000')
+        self.assertTrue(OTP.objects.get(phone_number='9000000000').is_sent)
+        message = SMSMessage.objects.get()
+        self.assertEqual((message.status, message.message), ('sent', ''))
+
+    def test_identical_texts_are_batched(self):
+        enqueue_many([(f'90000000{number:02d}', 'Welcome') for number in range(50)])
+        with self.assertNumQueries(4):
+            # due ids, claim, fetch claimed, one status update for the 50 delivered messages
+            self.assertEqual(process_outbox(), (50, 0))
+        self.assertEqual(len(LocmemSMSBackend.outbox), 50)
+
+    def test_failures_back_off_then_give_up(self):
+        LocmemSMSBackend.failing_numbers = {'9000000000'}
+        enqueue_many([('9000000000', 'Hello')])
+        self.assertEqual(process_outbox(), (0, 1))
+        message = SMSMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, now())
+        self.assertEqual(process_outbox(), (0, 0))
+
+        SMSMessage.objects.update(next_attempt_at=now() - timedelta(seconds=1))
+        self.assertEqual(process_outbox(), (0, 1))
+        message = SMSMessage.objects.get()
+        self.assertEqual((message.status, message.message), ('failed', ''))
+
+    def test_purge_removes_old_finished_messages(self):
+        old, recent, pending = enqueue_many([('9000000001', 'a'), ('9000000002', 'b'), ('9000000003', 'c')])
+        SMSMessage.objects.filter(id__in=[old.id, recent.id]).update(status='sent')
+        SMSMessage.objects.filter(id__in=[old.id, pending.id]).update(created_at=now() - timedelta(days=30))
+        call_command('purge_sms', chunk_size=1, sleep=0, stdout=StringIO())
+        self.assertEqual(sorted(SMSMessage.objects.values_list('id', flat=True)), [recent.id, pending.id])
+
+
+class OTPStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_verify_reads_cache_and_consumes_once(self):
+        otp = create_otp('9000000000')
+        with self.assertNumQueries(1):  # only the conditional UPDATE marking it verified
+            self.assertEqual(verify_otp('9000000000', otp.otp), (True, "OTP verified"))
+        self.assertFalse(verify_otp('9000000000', otp.otp)[0])
+        self.assertTrue(OTP.objects.get(id=otp.id).is_verified)
+
+    def test_database_fallback(self):
+        create_otp('9000000000')
+        latest = create_otp('9000000000')
+        cache.clear()
+        self.assertEqual(verify_otp('9000000000', '------'), (False, "Invalid OTP"))
+        self.assertEqual(verify_otp('9000000000', latest.otp), (True, "OTP verified"))
+
+    def test_stale_cache_entry_defers_to_database(self):
+        first = create_otp('9000000000')
+        entry = cache.get(CACHE_KEY.format('9000000000'))
+        second = create_otp('9000000000')
+        cache.set(CACHE_KEY.format('9000000000'), entry)  # as if the newer issue never reached this cache
+        self.assertEqual(verify_otp('9000000000', first.otp), (False, "No OTP found for this phone number"))
+        self.assertEqual(verify_otp('9000000000', second.otp), (True, "OTP verified"))
+
+    def test_expired(self):
+        otp = create_otp('9000000000', expiry_minutes=-1)
+        self.assertEqual(verify_otp('9000000000', otp.otp), (False, "OTP expired"))
+
+    def test_purge_removes_expired_and_verified(self):
+        expired = create_otp('9000000001', expiry_minutes=-60 * 48)
+        verified = create_otp('9000000002')
+        OTP.objects.filter(id=verified.id).update(is_verified=True, created_at=now() - timedelta(days=2))
+        live = create_otp('9000000003')
+        call_command('purge_otps', chunk_size=1, sleep=0, stdout=StringIO())
+        self.assertEqual(list(OTP.objects.values_list('id', flat=True)), [live.id])
+        self.assertFalse(OTP.objects.filter(id__in=[expired.id, verified.id]).exists())
+
+
+@override_settings(LOGIN_AUDIT_ASYNC=False)
+class LoginLockoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.get_buckets().reset()
+        self.user = CustomUser.objects.create_user('9000000000', 'Doctor', 'doctor', password='secret')
+
+    def login(self, password):
+        return self.client.post(f'/api/users/login?mobile=9000000000&password={password}')
+
+    def test_lockout_after_max_failures(self):
+        for _ in range(5):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login('secret').status_code, 403)
+        self.assertEqual(LoginAttempt.objects.filter(user=self.user, successful=False).count(), 5)
+
+    def test_success_resets_failures(self):
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(self.login('secret').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login('secret').status_code, 200)
+
+    def test_failures_recorded_by_other_workers_count(self):
+        # Other workers record into the same shared cache buckets
+        for _ in range(5):
+            async_to_sync(arecord_failure)(self.user.id)
+        self.assertEqual(self.login('secret').status_code, 403)
+
+    def test_hash_upgrade_is_saved_from_the_request(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(password=make_password('secret', hasher='pbkdf2_sha1'))
+        saving_threads = []
+        save = CustomUser.save
+
+        def recording_save(user, *args, **kwargs):
+            saving_threads.append(threading.current_thread().name)
+            return save(user, *args, **kwargs)
+
+        with mock.patch.object(CustomUser, 'save', recording_save):
+            self.assertEqual(self.login('secret').status_code, 200)
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(len(saving_threads), 1)
+        self.assertFalse(saving_threads[0].startswith('password-hash'))
+        self.assertEqual(self.login('secret').status_code, 200)
+
+    def test_lockout_check_does_not_count_rows(self):
+        LoginAttempt.objects.bulk_create([LoginAttempt(user=self.user) for _ in range(50)])
+        self.assertEqual(self.login('secret').status_code, 200)
+
+
+@override_settings(LOGIN_AUDIT_ASYNC=False)
+class HashingPoolTests(TestCase):
+    def test_saturated_pool_rejects_at_once(self):
+        pool = HashingPool(workers=1, max_pending=2)
+        release = threading.Event()
+
+        async def scenario():
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(PoolSaturated):
+                await pool.run(release.wait)
+            release.set()
+            return await asyncio.gather(*running)
+
+        self.assertEqual(asyncio.run(scenario()), [True, True])
+        self.assertEqual(pool.pending, 0)
+        pool.executor.shutdown()
+
+    def test_login_answers_503_when_pool_is_full(self):
+        rate_limit.get_buckets().reset()
+        CustomUser.objects.create_user('9000000001', 'Doctor', 'doctor', password='secret')
+        hashing_pool.pending = hashing_pool.max_pending
+        try:
+            response = self.client.post('/api/users/login?mobile=9000000001&password=secret')
+        finally:
+            hashing_pool.pending = 0
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.client.post('/api/users/login?mobile=9000000001&password=secret').status_code, 200)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        rate_limit.get_buckets().reset()
+
+    def request_otp(self, phone, ip='10.0.0.1'):
+        return self.client.post('/api/users/request-otp', {'phone_number': phone}, content_type='application/json', REMOTE_ADDR=ip)
+
+    def test_per_ip_limit(self):
+        for i in range(3):
+            self.assertEqual(self.request_otp(f'90000000{i:02}').status_code, 200)
+        response = self.request_otp('9000000099')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.request_otp('9000000099', ip='10.0.0.2').status_code, 200)
+
+    def test_per_phone_limit_across_ips(self):
+        for i in range(5):
+            self.assertEqual(self.request_otp('9000000000', ip=f'10.0.1.{i}').status_code, 200)
+        self.assertEqual(self.request_otp('9000000000', ip='10.0.1.9').status_code, 429)
+
+    def test_buckets_are_shared_through_the_file_and_refill(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets')
+            first, second = rate_limit.SharedMemoryBuckets(path, 64), rate_limit.SharedMemoryBuckets(path, 64)
+            self.assertEqual(first.take('k', 2, 0.2), 0)
+            self.assertEqual(second.take('k', 2, 0.2), 0)
+            self.assertGreater(first.take('k', 2, 0.2), 0)
+            time.sleep(0.15)
+            self.assertEqual(second.take('k', 2, 0.2), 0)
+
+    def test_slow_bucket_keeps_its_slot_against_a_faster_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            buckets = rate_limit.SharedMemoryBuckets(os.path.join(directory, 'buckets'), 2)
+            home = rate_limit.key_hash('slow') % 2
+            fast = next(f'fast{i}' for i in range(100) if rate_limit.key_hash(f'fast{i}') % 2 == home)
+            self.assertEqual(buckets.take('slow', 1, 3600), 0)
+            time.sleep(0.15)  # longer than the fast key's period, far from the slow bucket refilling
+            self.assertEqual(buckets.take(fast, 5, 0.1), 0)
+            self.assertGreater(buckets.take('slow', 1, 3600), 0)
+
+    def test_cache_reset_keeps_other_entries(self):
+        buckets = rate_limit.CacheBuckets()
+        cache.set('unrelated', 1)
+        self.assertEqual(buckets.take('k', 1, 60), 0)
+        self.assertGreater(buckets.take('k', 1, 60), 0)
+        buckets.reset()
+        self.assertEqual(buckets.take('k', 1, 60), 0)
+        self.assertEqual(cache.get('unrelated'), 1)
+
+    def test_parse_rate(self):
+        self.assertEqual(rate_limit.parse_rate('3/m'), (3, 60))
+        self.assertEqual(rate_limit.parse_rate('5/10m'), (5, 600))
+
+
+class OnboardingTests(TestCase):
+    csv_text = (
+        "mobile,name,usertype\n"
+        "9100000001,Dr A,doctor\n"
+        "9100000002,B,patient\n"
+        "9100000001,Dr A again,doctor\n"
+        "9100000003,C,superadmin\n"
+        "9000000000,Existing,doctor\n"
+    )
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user('9000000000', 'Admin', 'admin', password='secret')
+        self.access = str(RefreshToken.for_user(self.admin).access_token)
+
+    def test_command_creates_users_and_queues_credentials(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.csv_text)
+        self.addCleanup(os.unlink, f.name)
+        call_command('onboard_users', f.name, '--processes', '2', '--chunk-size', '2', stdout=StringIO(), stderr=StringIO())
+
+        users = {user.mobile: user for user in CustomUser.objects.filter(mobile__startswith='91')}
+        self.assertEqual(sorted(users), ['9100000001', '9100000002'])
+        self.assertEqual(users['9100000001'].name, 'Dr A')
+        # Bulk insert skips the patient OTP signal; each user gets exactly the credentials SMS
+        self.assertFalse(OTP.objects.exists())
+        for mobile, user in users.items():
+            sms = SMSMessage.objects.get(phone_number=mobile)
+            self.assertTrue(check_password(sms.message.split()[3].rstrip('.'), user.password))
+
+    def test_passwords_do_not_follow_the_random_module(self):
+        random.seed(0)
+        first = generate_password()
+        random.seed(0)
+        self.assertNotEqual(generate_password(), first)  # 1 in 900000 chance of a false failure
+        self.assertRegex(first, r'^[1-9]\d{5}$')
+
+    def test_endpoint_queues_job_for_worker(self):
+        upload = SimpleUploadedFile('users.csv', self.csv_text.encode())
+        response = self.client.post('/api/users/onboarding', {'file': upload}, HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        job_id = response.json()['data']['job_id']
+        self.assertEqual(OnboardingJob.objects.get(id=job_id).status, 'pending')
+
+        call_command('onboard_users', '--jobs', '--processes', '1', stdout=StringIO())
+        data = self.client.get(f'/api/users/onboarding/{job_id}', HTTP_AUTHORIZATION=f'Bearer {self.access}').json()['data']
+        self.assertEqual((data['status'], data['created'], data['skipped']), ('done', 2, 1))
+        self.assertEqual([error['line'] for error in data['errors']], [4, 5])
+
+    def test_endpoint_is_admin_only(self):
+        doctor = CustomUser.objects.create_user('9000000009', 'Doctor', 'doctor', password='secret')
+        access = str(RefreshToken.for_user(doctor).access_token)
+        upload = SimpleUploadedFile('users.csv', self.csv_text.encode())
+        response = self.client.post('/api/users/onboarding', {'file': upload}, HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 403)
+
+
+class DeferredEffectsTests(TestCase):
+    def test_patient_signup_queues_its_otp_in_the_same_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(2):  # the user INSERT and its queued effect
+                patient = CustomUser.objects.create(mobile='9200000001', name='P', usertype='patient')
+        self.assertFalse(OTP.objects.exists())
+        self.assertEqual(list(DeferredEffect.objects.values_list('name', 'object_id')), [('send_signup_otp', patient.id)])
+
+        call_command('run_deferred_effects', once=True, stdout=StringIO())
+        otp = OTP.objects.get(phone_number='9200000001')
+        self.assertEqual(otp.user, patient)
+        self.assertEqual(SMSMessage.objects.get(phone_number='9200000001').otp, otp)
+        self.assertFalse(DeferredEffect.objects.exists())
+
+    @override_settings(DEFERRED_EFFECTS_ASYNC=False)
+    def test_inline_effects_follow_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            CustomUser.objects.create(mobile='9200000003', name='P', usertype='patient')
+        self.assertFalse(OTP.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(OTP.objects.filter(phone_number='9200000003').exists())
+        self.assertFalse(DeferredEffect.objects.exists())
+
+    def test_rolled_back_signup_has_no_effects(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                CustomUser.objects.create(mobile='9200000002', name='P', usertype='patient')
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(DeferredEffect.objects.exists())
+
+    def test_effects_are_coalesced_per_object(self):
+        effects = DeferredEffects()
+        calls = []
+        effects.register('touch')(calls.append)
+        for object_id in [1, 2, 1, 1, 3, 2]:
+            effects.defer('touch', object_id)
+        self.assertEqual(effects.run_pending(), 3)
+        self.assertEqual(calls, [[1, 2, 3]])
+        self.assertEqual(effects.run_pending(), 0)
+
+    def test_failed_effects_stay_queued(self):
+        effects = DeferredEffects()
+
+        @effects.register('fail')
+        def fail(ids):
+            raise RuntimeError
+
+        effects.defer('fail', 1)
+        self.assertEqual(effects.run_pending(), 1)
+        self.assertEqual(effects.run_pending(), 0)  # claimed until the claim goes stale
+        DeferredEffect.objects.update(claimed_at=now() - STALE_CLAIM - timedelta(seconds=1))
+        self.assertEqual(effects.run_pending(), 1)
+        self.assertTrue(DeferredEffect.objects.exists())
+
+    def test_redeferred_while_running_runs_again(self):
+        effects = DeferredEffects()
+        calls = []
+
+        @effects.register('touch')
+        def touch(ids):
+            calls.append(ids)
+            if len(calls) == 1:
+                effects.defer('touch', 1)  # the object changed while the effect ran
+
+        effects.defer('touch', 1)
+        effects.run_pending()
+        effects.run_pending()
+        self.assertEqual(calls, [[1], [1]])
+        self.assertFalse(DeferredEffect.objects.exists())
+
+
+class ReferenceSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()  # fresh version stamps: snapshots of earlier tests' rows are stale
+        self.state = State.objects.create(name='Bihar', status='A')
+        City.objects.create(name='Patna', state=self.state)
+
+    def cities(self):
+        return self.client.get('/api/utils/cities').json()
+
+    def test_served_from_memory_until_a_table_changes(self):
+        self.assertEqual(self.cities(), [{'id': City.objects.get().id, 'name': 'Patna', 'state': {'id': self.state.id, 'name': 'Bihar'}}])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.cities()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Gaya', state=self.state)
+        self.assertEqual([city['name'] for city in self.cities()], ['Gaya', 'Patna'])
+
+    def test_nested_table_change_rebuilds(self):
+        self.cities()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.state.name = 'Bihar State'
+            self.state.save()
+        self.assertEqual(self.cities()[0]['state']['name'], 'Bihar State')
+
+    def test_write_in_another_worker_rebuilds(self):
+        self.cities()
+        # Another worker renames the city and bumps the stored stamp; this worker's cache entry is gone
+        City.objects.update(name='Gaya')
+        VersionStamp.objects.filter(label=table_label(City)).update(version=F('version') + 1)
+        cache.clear()
+        self.assertEqual(self.cities()[0]['name'], 'Gaya')
+
+    def test_other_reference_tables(self):
+        Services.objects.create(name='Dental')
+        self.assertEqual(self.client.get('/api/utils/services').json()[0]['description'], None)
+        self.assertEqual(self.client.get('/api/utils/degrees').json(), [])
+
+
+class DataLoaderTests(TestCase):
+    def make_colleges(self, start, count):
+        for i in range(start, start + count):
+            state = State.objects.create(name=f'State {i}', status='A')
+            city = City.objects.create(name=f'City {i}', state=state)
+            other_city = City.objects.create(name=f'Other {i}', state=State.objects.create(name=f'Other {i}', status='A'))
+            university = University.objects.create(name=f'University {i}', state=state, city=other_city, pincode='800001')
+            College.objects.create(name=f'College {i}', state=state, city=city, pincode='800001', affiliation_type='govt', affliated_to=university)
+
+    def serialize_colleges(self):
+        colleges = DataLoader().load(list(College.objects.all()), CollegeSerializer)
+        return [CollegeSerializer.from_orm(college).dict() for college in colleges]
+
+    def test_queries_grow_with_depth_not_rows(self):
+        # colleges; states + cities + universities; cities' states + universities' cities; their states
+        self.make_colleges(0, 2)
+        with self.assertNumQueries(6):
+            small = self.serialize_colleges()
+        self.make_colleges(2, 10)
+        with self.assertNumQueries(6):
+            large = self.serialize_colleges()
+        self.assertEqual(large[:2], small)
+        self.assertEqual(large[0]['affliated_to']['city']['state']['name'], 'Other 0')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        State.objects.create(name='Bihar', status='A')
+
+    def test_etag_round_trip(self):
+        response = self.client.get('/api/utils/states')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/utils/states', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            State.objects.create(name='Assam', status='A')
+        response = self.client.get('/api/utils/states', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_survives_a_cache_flush(self):
+        # Stamps are stored in the database, so a flush (or another worker) cannot re-seed them
+        etag = self.client.get('/api/utils/states')['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get('/api/utils/states', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/utils/cities')['Last-Modified']
+        self.assertEqual(self.client.get('/api/utils/cities', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_unmarked_endpoints_are_untouched(self):
+        self.assertNotIn('ETag', self.client.get('/api/utils/autocomplete?q=bi'))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Ten states sharing three status values, so every page boundary falls inside a tie
+        self.states = [State.objects.create(name=f'State {number}', status=str(number % 3)) for number in range(10)]
+        self.factory = RequestFactory()
+
+    def walk(self, ordering, limit):
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            page, cursor = paginate_queryset(State.objects.all(), self.factory.get('/', params), ordering=ordering)
+            ids += [state.id for state in page]
+            pages += 1
+            if cursor is None:
+                return ids, pages
+
+    def test_ties_are_broken_by_id_in_both_directions(self):
+        for ordering in (('status',), ('-status',)):
+            expected = list(State.objects.order_by(*ordering, ('-' if ordering[0].startswith('-') else '') + 'id').values_list('id', flat=True))
+            self.assertEqual(self.walk(ordering, 3), (expected, 4))
+
+    def test_last_full_page_has_no_cursor(self):
+        self.assertEqual(self.walk(('id',), 5)[1], 2)
+
+    def test_cursor_is_stable_across_inserts_before_it(self):
+        request = self.factory.get('/', {'limit': 4})
+        first, cursor = paginate_queryset(State.objects.all(), request, ordering=('status',))
+        State.objects.create(name='Earlier', status=' ')  # sorts before every row already served
+        State.objects.create(name='Later', status='2')
+        second, _ = paginate_queryset(State.objects.all(), self.factory.get('/', {'limit': 4, 'cursor': cursor}), ordering=('status',))
+        expected = list(State.objects.order_by('status', 'id').values_list('id', flat=True))
+        start = expected.index(first[-1].id) + 1
+        self.assertEqual([state.id for state in second], expected[start:start + 4])
+        self.assertFalse({state.id for state in first} & {state.id for state in second})
+
+    def test_bad_cursors_are_rejected(self):
+        for cursor in (
+            'not-base64!', encode_cursor([1, 2, 3]), 'e30',  # garbage, wrong arity, not a list
+            encode_cursor([[1], 2]), encode_cursor([{'id__gt': 0}, 2]),  # nested values
+            encode_cursor(['1', 'x']),  # not a valid id
+        ):
+            with self.assertRaises(HttpError) as raised:
+                paginate_queryset(State.objects.all(), self.factory.get('/', {'cursor': cursor}), ordering=('status',))
+            self.assertEqual(raised.exception.status_code, 400)
+
+    @override_settings(API_MAX_PAGE_SIZE=5)
+    def test_limit_is_capped(self):
+        page, cursor = paginate_queryset(State.objects.all(), self.factory.get('/', {'limit': 50}))
+        self.assertEqual(len(page), 5)
+        self.assertIsNotNone(cursor)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        state = State.objects.create(name='Maharashtra', status='A')
+        self.pune = City.objects.create(name='Pune', state=state)
+        self.pimpri = City.objects.create(name='Pimpri Chinchwad', state=state)
+
+    def suggest(self, q, **params):
+        response = self.client.get('/api/utils/autocomplete', {'q': q, **params})
+        return [(row['kind'], row['name']) for row in response.json()['data']]
+
+    def test_prefix_of_any_word_matches(self):
+        self.assertEqual(self.suggest('chin'), [('city', 'Pimpri Chinchwad')])
+        self.assertEqual(self.suggest('Pimpri  CH'), [('city', 'Pimpri Chinchwad')])
+        self.assertEqual(self.suggest('xyz'), [])
+
+    def test_ranked_by_popularity_then_length(self):
+        trie = Trie()
+        trie.add('city', 1, 'Panvel', 0)
+        trie.add('city', 2, 'Pune', 0)
+        trie.add('city', 3, 'Pandharpur', 5)
+        self.assertEqual([entry['name'] for entry in trie.suggest('p')], ['Pandharpur', 'Pune', 'Panvel'])
+        self.assertEqual([entry['name'] for entry in trie.suggest('p', limit=1)], ['Pandharpur'])
+        trie.remove('city', 3)
+        self.assertEqual([entry['name'] for entry in trie.suggest('pan')], ['Panvel'])
+
+    def test_nodes_keep_only_the_best_suggestions(self):
+        trie = Trie()
+        for number in range(MAX_SUGGESTIONS + 5):
+            trie.add('service', number, f'Care {number:02d}', popularity=number)
+        top = trie.suggest('care')
+        self.assertEqual(len(top), MAX_SUGGESTIONS)
+        self.assertEqual(top[0]['id'], MAX_SUGGESTIONS + 4)
+        trie.remove('service', MAX_SUGGESTIONS + 4)
+        self.assertEqual(len(trie.suggest('care')), MAX_SUGGESTIONS)
+
+    def test_saves_and_deletes_reach_the_index(self):
+        self.assertEqual(self.suggest('pu'), [('city', 'Pune')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pune.name = 'Poona'
+            self.pune.save()
+        self.assertEqual(self.suggest('pu'), [])
+        self.assertEqual(self.suggest('poo'), [('city', 'Poona')])
+        with self.captureOnCommitCallbacks(execute=True):
+            Services.objects.create(name='Physiotherapy', status=False)
+        self.assertEqual(self.suggest('phy'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pimpri.delete()
+        self.assertEqual(self.suggest('chin'), [])
+
+    def test_rolled_back_writes_are_not_suggested(self):
+        self.assertEqual(self.suggest('pa'), [])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                City.objects.create(name='Panvel', state=self.pune.state)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.suggest('pa'), [])
+
+    def test_other_processes_apply_changes_as_deltas(self):
+        other = AutocompleteIndex()
+        self.assertEqual(len(other.suggest('p')), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Panvel', state=self.pune.state)
+        with mock.patch.object(other, '_rebuild', side_effect=AssertionError("rebuilt")):
+            self.assertEqual(len(other.suggest('p')), 3)
+            with self.assertNumQueries(0):
+                other.suggest('pan')
@@ -1,6 +1,7 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
+from django.http import JsonResponse
 
-def create_response(status: str, message: str, data: Optional[Any] = None) -> Dict:
+def create_response(status: str, message: str, data: Optional[Any] = None, **meta: Any) -> Dict:
     """
     Creates a standardized API response body.
 
@@ -8,6 +9,7 @@ def create_response(status: str, message: str, data: Optional[Any] = None) -> Di
         status (str): The status of the request, either 'success' or 'failure'.
         message (str): A message describing the result.
         data (Any, optional): The response data (if any). Defaults to None.
+        **meta: Extra top-level keys for the envelope (e.g. next_cursor).
 
     Returns:
         dict: A standardized response dictionary.
@@ -15,36 +17,43 @@ def create_response(status: str, message: str, data: Optional[Any] = None) -> Di
     return {
         "status": status,
         "message": message,
-        "data": data if data is not None else None
+        "data": data if data is not None else None,
+        **meta,
     }
 
 
-def success_response(message: str, data: Optional[Any] = None) -> Dict:
+def success_response(message: str, data: Optional[Any] = None, **meta: Any) -> Dict:
     """
     Creates a success response body.
 
     Args:
         message (str): The success message.
         data (Any, optional): The response data. Defaults to None.
+        **meta: Extra top-level keys for the envelope (e.g. next_cursor).
 
     Returns:
         dict: A success response.
     """
-    return create_response(status="success", message=message, data=data)
+    return create_response(status="success", message=message, data=data, **meta)
 
 
-def failure_response(message: str, data: Optional[Any] = None) -> Dict:
+def failure_response(message: str, data: Optional[Any] = None, status_code: Optional[int] = None) -> Union[Dict, JsonResponse]:
     """
     Creates a failure response body.
 
     Args:
         message (str): The failure message.
         data (Any, optional): The failure data. Defaults to None.
+        status_code (int, optional): HTTP status. When given, a JsonResponse with that
+            status is returned instead of the body (which would be sent as 200).
 
     Returns:
-        dict: A failure response.
+        dict | JsonResponse: A failure response.
     """
-    return create_response(status="failure", message=message, data=data)
+    body = create_response(status="failure", message=message, data=data)
+    if status_code is not None:
+        return JsonResponse(body, status=status_code)
+    return body
 
 
 def error_response(message: str, data: Optional[Any] = None) -> Dict:
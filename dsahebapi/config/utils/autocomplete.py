@@ -0,0 +1,235 @@
+import re
+import threading
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from config.utils.versioning import bump_version, get_version
+
+VERSION_LABEL = 'autocomplete'
+HEAD_KEY = 'autocomplete:{}:head'  # version -> sequence number of the last logged change
+CHANGE_KEY = 'autocomplete:{}:{}'  # (version, sequence number) -> (kind, id) of the entries that changed
+CHANGE_TIMEOUT = 60 * 60
+MAX_CHANGES = 500  # A process further behind than this rebuilds instead
+MAX_SUGGESTIONS = 10
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall((text or '').lower()))
+
+
+def index_keys(name):
+    """
+    Strings under which a name is indexed: the whole name and every suffix starting at a word,
+    so "Pimpri Chinchwad" is found by both "pim" and "chin".
+    """
+    words = normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class TrieNode:
+    __slots__ = ('children', 'terminals', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.terminals = set()  # Entry keys whose indexed string ends here
+        self.top = []  # Best MAX_SUGGESTIONS entry keys in this subtree
+
+
+class Trie:
+    """
+    Prefix trie where every node caches the best suggestions of its subtree,
+    so a lookup costs one walk down the prefix and no sorting.
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.entries = {}  # (kind, id) -> {"kind", "id", "name", "popularity"}
+
+    def _rank(self, key):
+        entry = self.entries[key]
+        return (-entry['popularity'], len(entry['name']), entry['name'])
+
+    def _path(self, text, create=False):
+        nodes = [self.root]
+        node = self.root
+        for char in text:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = TrieNode()
+            nodes.append(child)
+            node = child
+        return nodes
+
+    def _refresh_path(self, nodes):
+        for node in reversed(nodes):
+            candidates = set(node.terminals)
+            for child in node.children.values():
+                candidates.update(child.top)
+            node.top = sorted(candidates, key=self._rank)[:MAX_SUGGESTIONS]
+
+    def add(self, kind, object_id, name, popularity=0):
+        key = (kind, object_id)
+        self.entries[key] = {"kind": kind, "id": object_id, "name": name, "popularity": popularity}
+        for text in index_keys(name):
+            nodes = self._path(text, create=True)
+            nodes[-1].terminals.add(key)
+            self._refresh_path(nodes)
+
+    def remove(self, kind, object_id):
+        key = (kind, object_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        for text in index_keys(entry['name']):
+            nodes = self._path(text)
+            if nodes:
+                nodes[-1].terminals.discard(key)
+                self._refresh_path(nodes)
+        del self.entries[key]
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        nodes = self._path(normalize(prefix))
+        if not nodes:
+            return []
+        entries = self.entries
+        return [entries[key] for key in nodes[-1].top if key in entries][:limit]
+
+
+def _sources():
+    """
+    (kind, queryset of (id, name, popularity)) for every model served by autocomplete.
+    Imported lazily because this module is loaded from config.signals.
+    """
+    from config.models import City, College, Degree, Location, Services, Specialization
+    return [
+        ('service', Services, Services.objects.filter(status=True).annotate(popularity=Count('listings'))),
+        ('specialization', Specialization, Specialization.objects.filter(status=True).annotate(popularity=Count('listings'))),
+        ('city', City, City.objects.annotate(popularity=Count('listings'))),
+        ('location', Location, Location.objects.annotate(popularity=Count('listings'))),
+        ('degree', Degree, Degree.objects.filter(status=True).annotate(popularity=Count('educations'))),
+        ('college', College, College.objects.filter(status=True).annotate(popularity=Count('educations'))),
+    ]
+
+
+def kind_for_model(model):
+    for kind, source_model, _ in _sources():
+        if source_model is model:
+            return kind
+    return None
+
+
+class AutocompleteIndex:
+    """
+    Per-process trie over reference data names, ranked by how many listings use each name.
+
+    Changes are shared through a log in the cache, like the listing FacetIndex: after commit,
+    the (kind, id) of each entry whose name, status or popularity changed is appended under
+    the next sequence number, and every process re-reads only those rows on its next
+    suggestion. The whole trie is rebuilt only on the first read, when the process is more
+    than MAX_CHANGES behind, or when the log or an entry it needs has left the cache.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.trie = None
+        self.version = None
+        self.seq = 0
+
+    @staticmethod
+    def _load(keys=None):
+        """
+        {(kind, id): (name, popularity)} for the given entries (all when None) that are served.
+        """
+        ids = {}
+        if keys is not None:
+            for kind, object_id in keys:
+                ids.setdefault(kind, set()).add(object_id)
+        rows = {}
+        for kind, _, queryset in _sources():
+            if keys is not None:
+                if kind not in ids:
+                    continue
+                queryset = queryset.filter(id__in=ids[kind])
+            for object_id, name, popularity in queryset.values_list('id', 'name', 'popularity'):
+                rows[(kind, object_id)] = (name, popularity)
+        return rows
+
+    def _rebuild(self, version, head):
+        trie = Trie()
+        for (kind, object_id), (name, popularity) in self._load().items():
+            trie.add(kind, object_id, name, popularity)
+        self.trie, self.version, self.seq = trie, version, head
+
+    def _start_log(self):
+        """
+        Move to a new version with an empty change log; every process rebuilds on its next read.
+        """
+        version = bump_version(VERSION_LABEL)
+        cache.add(HEAD_KEY.format(version), 0, timeout=None)
+        return version
+
+    def _log_head(self):
+        version = get_version(VERSION_LABEL)
+        head = cache.get(HEAD_KEY.format(version))
+        if head is None:
+            version, head = self._start_log(), 0
+        return version, head
+
+    def ensure_current(self):
+        # Checked under the lock, so concurrent callers wait for one rebuild instead of each running it.
+        with self.lock:
+            version, head = self._log_head()
+            if self.trie is None or version != self.version or head < self.seq or head - self.seq > MAX_CHANGES:
+                self._rebuild(version, head)
+                return
+            if head == self.seq:
+                return
+            keys = [CHANGE_KEY.format(version, seq) for seq in range(self.seq + 1, head + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) < len(keys):
+                self._rebuild(version, head)  # expired, or logged but not written yet
+                return
+            entries = set().union(*changes.values())
+            loaded = self._load(entries)
+            for kind, object_id in entries:
+                self.trie.remove(kind, object_id)
+                if (kind, object_id) in loaded:
+                    name, popularity = loaded[(kind, object_id)]
+                    self.trie.add(kind, object_id, name, popularity)
+            self.seq = head
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        self.ensure_current()
+        return self.trie.suggest(prefix, limit)
+
+    def update(self, instance):
+        """
+        Log a saved or deleted reference row, once the transaction commits.
+        """
+        kind = kind_for_model(type(instance))
+        if kind is not None:
+            self.changed(kind, [instance.pk])
+
+    def changed(self, kind, ids):
+        """
+        Log that the entries `ids` of `kind` changed (e.g. their popularity), once the transaction commits.
+        """
+        entries = sorted({(kind, object_id) for object_id in ids if object_id is not None})
+        if entries:
+            transaction.on_commit(lambda: self._log_changes(entries))
+
+    def _log_changes(self, entries):
+        version = get_version(VERSION_LABEL)
+        try:
+            seq = cache.incr(HEAD_KEY.format(version))
+        except ValueError:
+            self._start_log()  # the log is gone: rebuilding covers this change too
+            return
+        cache.set(CHANGE_KEY.format(version, seq), entries, CHANGE_TIMEOUT)
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from django.views.decorators.http import condition
+from config.utils.versioning import get_version, table_label
+
+
+def conditional(*models):
+    """
+    Mark a GET endpoint as depending only on the rows of `models`. With conditional_get
+    installed on the API, it gets ETag/Last-Modified headers from the tables' version stamps
+    and answers If-None-Match/If-Modified-Since with 304 without running the view.
+    """
+    def decorator(view):
+        view.conditional_models = models
+        return view
+    return decorator
+
+
+def table_versions(models):
+    return [get_version(table_label(model)) for model in models]
+
+
+def conditional_get(run):
+    """
+    NinjaAPI view decorator (api.add_decorator(conditional_get, mode="view")) applying
+    Django's condition() to the operations marked with @conditional. Validators are computed
+    from cached version stamps, so a 304 costs no query.
+    """
+    operation = getattr(run, '__self__', None)
+    models = getattr(getattr(operation, 'view_func', None), 'conditional_models', None)
+    if not models:
+        return run
+
+    def etag(request, *args, **kwargs):
+        return '-'.join(format(version, 'x') for version in table_versions(models))
+
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(max(table_versions(models)) / 1e9, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)(run)
@@ -0,0 +1,93 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from ..models import DeferredEffect
+
+logger = logging.getLogger(__name__)
+
+STALE_CLAIM = timedelta(minutes=5)  # A claim older than this belongs to a dead or failed pass
+
+
+class DeferredEffects:
+    """
+    Side effects of model signals (SMS, OTPs, notifications) run off the request path.
+
+    A signal calls `defer(name, object_id)`, which stores a DeferredEffect row in the
+    transaction of the write: the effect exists exactly when the write commits, never for a
+    rolled-back one, and survives a crash until the run_deferred_effects worker runs it.
+    Rows are unique per (name, object_id), so an object saved several times before the
+    worker gets to it runs each effect once, and handlers receive the ids in batches.
+    A handler that raises keeps its rows, which are retried once the claim goes stale, so
+    handlers must be safe to repeat. With DEFERRED_EFFECTS_ASYNC off, effects also run
+    inline right after the commit.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, name):
+        """
+        Decorator registering `handler(ids)` as the effect `name`.
+        """
+        def decorator(handler):
+            self.handlers[name] = handler
+            return handler
+        return decorator
+
+    def defer(self, name, object_id):
+        if name not in self.handlers:
+            raise KeyError(f"Unknown deferred effect {name!r}")
+        # Re-deferring an effect that a worker is running releases its claim, so it runs again.
+        DeferredEffect.objects.bulk_create(
+            [DeferredEffect(name=name, object_id=object_id)],
+            update_conflicts=True, unique_fields=['name', 'object_id'], update_fields=['claim_token'],
+        )
+        if not getattr(settings, 'DEFERRED_EFFECTS_ASYNC', True):
+            transaction.on_commit(lambda: self.run(name, [object_id]))
+
+    def run(self, name, ids, claim_token=None):
+        """
+        Run effect `name` for `ids` and delete their rows; they stay queued if the handler fails.
+        """
+        try:
+            self.handlers[name](ids)
+        except Exception:
+            logger.exception("Deferred effect %s failed for %d objects", name, len(ids))
+            return False
+        DeferredEffect.objects.filter(name=name, object_id__in=ids, claim_token=claim_token).delete()
+        return True
+
+    def claim(self, batch_size=100):
+        """
+        Claim up to `batch_size` queued effects with one conditional UPDATE, so concurrent
+        workers never run the same row. Returns (claim_token, [(name, object_id)]).
+        """
+        current = now()
+        due = Q(claim_token__isnull=True) | Q(claimed_at__lt=current - STALE_CLAIM)
+        ids = list(DeferredEffect.objects.filter(due).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return None, []
+        token = uuid.uuid4()
+        DeferredEffect.objects.filter(due, id__in=ids).update(claim_token=token, claimed_at=current)
+        return token, list(DeferredEffect.objects.filter(claim_token=token).values_list('name', 'object_id'))
+
+    def run_pending(self, batch_size=100):
+        """
+        One worker pass: claim queued effects and call each handler once with its ids.
+        Returns the number of effects claimed.
+        """
+        token, effects = self.claim(batch_size)
+        ids_by_name = defaultdict(list)
+        for name, object_id in effects:
+            ids_by_name[name].append(object_id)
+        for name, ids in ids_by_name.items():
+            self.run(name, ids, token)
+        return len(effects)
+
+
+deferred_effects = DeferredEffects()
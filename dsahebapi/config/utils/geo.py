@@ -0,0 +1,42 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+CELL_SIZE_DEG = 0.05  # ~5.5 km of latitude per grid cell
+
+
+def grid_cell(latitude, longitude):
+    """
+    Return the grid cell key ("<lat_index>:<lng_index>") containing a coordinate, or None.
+    """
+    if latitude is None or longitude is None:
+        return None
+    return f"{math.floor(latitude / CELL_SIZE_DEG)}:{math.floor(longitude / CELL_SIZE_DEG)}"
+
+
+def cells_within(latitude, longitude, radius_km):
+    """
+    Return the keys of every grid cell overlapping the bounding box of a circle.
+    """
+    lat_span = radius_km / KM_PER_DEGREE_LAT
+    lng_span = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+    lat_range = range(math.floor((latitude - lat_span) / CELL_SIZE_DEG), math.floor((latitude + lat_span) / CELL_SIZE_DEG) + 1)
+    lng_range = range(math.floor((longitude - lng_span) / CELL_SIZE_DEG), math.floor((longitude + lng_span) / CELL_SIZE_DEG) + 1)
+    return [f"{lat_index}:{lng_index}" for lat_index in lat_range for lng_index in lng_range]
+
+
+def haversine_distances(latitude, longitude, points):
+    """
+    Great-circle distance in km from one origin to each (lat, lng) pair in `points`.
+    A plain Python loop (numpy is not a dependency); the grid prefilter keeps `points` small.
+    """
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+    distances = []
+    for lat, lng in points:
+        lat2 = radians(lat)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(lng) - lng1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))))
+    return distances
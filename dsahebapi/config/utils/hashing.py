@@ -0,0 +1,57 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class HashingPool:
+    """
+    Bounded thread pool for password hashing (PBKDF2 releases the GIL, so threads use every core).
+
+    At most `max_pending` jobs may be running or queued; further calls raise PoolSaturated at
+    once, so a login burst gets fast 503s instead of piling up behind the hashers.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+        self.max_pending = max_pending or getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', None) or self.workers * 8
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.executor = None
+
+    def is_saturated(self):
+        return self.pending >= self.max_pending
+
+    def _acquire(self):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise PoolSaturated("Password hashing queue is full")
+            self.pending += 1
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+
+    def _release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        """
+        Run `func(*args)` on the pool and await its result. Raises PoolSaturated when full.
+        """
+        self._acquire()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the job ends, even if the awaiting request was cancelled meanwhile.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,105 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from ninja.security import HttpBearer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from config.utils.token_blacklist import blacklist_filter
+from config.utils.versioning import bump_version, get_version
+
+
+def version_label(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached tokens and user object of a user in every process.
+    Call after logout, blacklisting, a password reset or an is_active change.
+    """
+    bump_version(version_label(user_id))
+
+
+def invalidate_user_on_commit(user_id):
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU mapping; the least recently used entry is evicted first.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class JWTAuth(HttpBearer):
+    """
+    Bearer authentication with simplejwt semantics and per-process caches.
+
+    Verified tokens are kept by SHA-256 of the raw token until their `exp`, user objects by id.
+    Both are tagged with the user's version stamp, so invalidate_user() (run on logout,
+    blacklisting and user saves) makes every process verify and load the user again.
+    Every request is also checked against the in-process jti blacklist filter.
+    A cache hit costs one version lookup in the Django cache and no database query.
+    """
+    backend = JWTAuthentication()
+    tokens = LRUCache(getattr(settings, 'JWT_AUTH_TOKEN_CACHE_SIZE', 10000))
+    users = LRUCache(getattr(settings, 'JWT_AUTH_USER_CACHE_SIZE', 5000))
+
+    def authenticate(self, request, token):
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self.tokens.get(key)
+        if entry is not None:
+            expires_at, user_id, jti, verified_version = entry
+            if expires_at > time.time() and not blacklist_filter.contains(jti):
+                version = get_version(version_label(user_id))
+                cached = self.users.get(user_id)
+                if verified_version == version and cached is not None and cached[0] == version:
+                    # Views may modify request.auth; never hand out the cached instance itself.
+                    return copy.copy(cached[1])
+            self.tokens.pop(key)
+
+        try:
+            validated_token = self.backend.get_validated_token(token)
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            jti = validated_token[api_settings.JTI_CLAIM]
+            if blacklist_filter.contains(jti):
+                return None
+            version = get_version(version_label(user_id))
+            user = self.backend.get_user(validated_token)
+        except (InvalidToken, TokenError, AuthenticationFailed, KeyError):
+            return None
+        self.tokens.set(key, (validated_token['exp'], user_id, jti, version))
+        self.users.set(user_id, (version, user))
+        return copy.copy(user)
@@ -0,0 +1,83 @@
+import typing
+from collections import defaultdict
+from django.core.exceptions import FieldDoesNotExist
+from ninja import Schema
+
+
+def nested_fields(schema):
+    """
+    (name, nested schema) for each field of `schema` that is itself a Schema (or Optional of one).
+    """
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if typing.get_origin(annotation) is typing.Union:
+            annotation = next((arg for arg in typing.get_args(annotation) if arg is not type(None)), None)
+        if isinstance(annotation, type) and issubclass(annotation, Schema):
+            yield name, annotation
+
+
+class DataLoader:
+    """
+    Resolves the foreign keys read by nested schemas in batches, level by level.
+
+    Before a list is serialized, `load(objects, schema)` collects the ids of every related
+    object its nested schemas will touch, fetches each related model with one IN query per
+    level (objects loaded earlier in the same request are reused), and puts the results in
+    Django's relation cache. Serialization then runs without queries, so a response costs
+    one query per model per nesting level whatever the number of rows.
+    """
+
+    def __init__(self):
+        self.loaded = defaultdict(dict)  # model -> {pk: instance}
+
+    def load(self, objects, schema):
+        level = [(list(objects), schema)] if objects else []
+        while level:
+            links = []
+            wanted = defaultdict(set)
+            for instances, instance_schema in level:
+                model = type(instances[0])
+                for name, nested in nested_fields(instance_schema):
+                    try:
+                        field = model._meta.get_field(name)
+                    except FieldDoesNotExist:
+                        continue  # Computed by the schema, not a relation
+                    if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                        continue
+                    related_model = field.related_model
+                    for instance in instances:
+                        related_id = getattr(instance, field.attname)
+                        if related_id is not None and not field.is_cached(instance) and related_id not in self.loaded[related_model]:
+                            wanted[related_model].add(related_id)
+                    links.append((instances, field, nested))
+
+            for related_model, ids in wanted.items():
+                self.loaded[related_model].update(related_model._base_manager.in_bulk(ids))
+
+            next_level = []
+            for instances, field, nested in links:
+                related = {}
+                for instance in instances:
+                    if field.is_cached(instance):
+                        value = field.get_cached_value(instance)
+                    else:
+                        related_id = getattr(instance, field.attname)
+                        value = self.loaded[field.related_model].get(related_id) if related_id is not None else None
+                        field.set_cached_value(instance, value)
+                    if value is not None:
+                        related[id(value)] = value
+                if related:
+                    next_level.append((list(related.values()), nested))
+            level = next_level
+        return objects
+
+
+def load_related(request, objects, schema):
+    """
+    Batch-load what `schema` needs for `objects` with the request's DataLoader, shared by
+    every call in the same request.
+    """
+    loader = getattr(request, 'dataloader', None)
+    if loader is None:
+        loader = request.dataloader = DataLoader()
+    return loader.load(objects, schema)
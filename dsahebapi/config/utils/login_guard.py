@@ -0,0 +1,130 @@
+import logging
+import queue
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils.timezone import now
+from ..models import LOCKOUT_TIME, MAX_ATTEMPTS, LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = 6  # The lockout window is counted in this many sub-windows
+FAILURE_KEY = 'login_fail:{}:{}'
+
+
+def _bucket_seconds():
+    return max(1, int(LOCKOUT_TIME.total_seconds()) // BUCKETS)
+
+
+def _keys(user_id):
+    """
+    Keys of the buckets covering the lockout window, current bucket first.
+    """
+    current = int(time.time()) // _bucket_seconds()
+    return [FAILURE_KEY.format(user_id, bucket) for bucket in range(current, current - BUCKETS, -1)]
+
+
+def _timeout():
+    # Buckets expire on their own once they leave the window.
+    return int(LOCKOUT_TIME.total_seconds()) + _bucket_seconds()
+
+
+async def arecent_failures(user_id):
+    """
+    Failed logins of a user in the sliding lockout window (to one bucket's precision).
+    One read of BUCKETS keys in the shared cache, so the count covers every worker,
+    however many attempts were ever made. Async, for the async login view.
+    """
+    return sum((await cache.aget_many(_keys(user_id))).values())
+
+
+async def ais_locked(user_id):
+    return await arecent_failures(user_id) >= MAX_ATTEMPTS
+
+
+async def arecord_failure(user_id):
+    key = _keys(user_id)[0]
+    if not await cache.aadd(key, 1, timeout=_timeout()):
+        try:
+            await cache.aincr(key)
+        except ValueError:  # expired between add and incr
+            await cache.aadd(key, 1, timeout=_timeout())
+
+
+async def areset_failures(user_id):
+    await cache.adelete_many(_keys(user_id))
+
+
+class AuditWriter:
+    """
+    Writes LoginAttempt rows off the request path: attempts are queued and a daemon thread
+    inserts them in batches. When the queue is full attempts are dropped (and logged) rather
+    than slowing logins down. With LOGIN_AUDIT_ASYNC off, rows are written inline.
+    """
+    batch_size = 500
+    interval = 1.0
+
+    def __init__(self, max_queue=10000):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def record(self, user_id, successful):
+        attempt = LoginAttempt(user_id=user_id, successful=successful, attempted_at=now())
+        if not getattr(settings, 'LOGIN_AUDIT_ASYNC', True):
+            attempt.save()
+            return
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(attempt)
+        except queue.Full:
+            logger.warning("Login audit queue full; dropping attempt of user %s", user_id)
+
+    async def arecord(self, user_id, successful):
+        if getattr(settings, 'LOGIN_AUDIT_ASYNC', True):
+            self.record(user_id, successful)  # only a queue put
+        else:
+            await sync_to_async(self.record)(user_id, successful)
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._run, name='login-audit', daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self.flush(batch)
+
+    def flush(self, batch=None):
+        """
+        Insert `batch` (default: whatever is queued now) with one bulk insert.
+        """
+        if batch is None:
+            batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            LoginAttempt.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Could not write %d login attempts", len(batch))
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.timezone import now
+from ..models import CustomUser, OnboardingJob
+from .sms import enqueue_many
+
+ONBOARDING_USERTYPES = {'doctor', 'patient', 'hospital', 'clinic', 'front_desk', 'back_desk'}
+CREDENTIALS_MESSAGE = "Your password is {}. Please use it to log in."
+
+
+def generate_password():
+    # A random 6-digit password from the OS CSPRNG, sent to the user by SMS
+    return str(100000 + secrets.randbelow(900000))
+
+
+def parse_records(text, format):
+    """
+    Yield (line, record) for each row of a CSV (with a header) or NDJSON payload.
+    Records are dicts with at least mobile, name and usertype.
+    """
+    if format == 'csv':
+        for line, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            yield line, row
+    elif format == 'ndjson':
+        for line, raw in enumerate(io.StringIO(text), start=1):
+            if raw.strip():
+                try:
+                    yield line, json.loads(raw)
+                except ValueError:
+                    yield line, None
+    else:
+        raise ValueError(f"Unknown format {format!r}")
+
+
+def clean_record(record):
+    """
+    Return ((mobile, name, usertype), None) or (None, error).
+    """
+    if not isinstance(record, dict):
+        return None, "Not a valid record"
+    mobile = str(record.get('mobile') or '').strip()
+    name = str(record.get('name') or '').strip()
+    usertype = str(record.get('usertype') or '').strip()
+    if not mobile or len(mobile) > 15:
+        return None, "Invalid mobile"
+    if usertype not in ONBOARDING_USERTYPES:
+        return None, f"Invalid usertype {usertype!r}"
+    return (mobile, name[:255], usertype), None
+
+
+def _setup_worker():
+    # Spawned workers do not inherit the configured project
+    django.setup()
+
+
+class Onboarder:
+    """
+    Creates users in bulk: passwords are hashed in a process pool, users are inserted with
+    bulk_create (per-row signals such as the patient OTP are not sent), and the credential
+    SMS of each chunk is queued in the outbox within the same transaction.
+    """
+
+    def __init__(self, processes=None, chunk_size=1000):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def run(self, rows, progress=None):
+        """
+        Onboard an iterable of (line, record). Returns self with created, skipped and errors.
+        """
+        with ProcessPoolExecutor(self.processes, initializer=_setup_worker) as pool:
+            chunk = []
+            for line, record in rows:
+                chunk.append((line, record))
+                if len(chunk) >= self.chunk_size:
+                    self._onboard_chunk(chunk, pool)
+                    chunk = []
+                    if progress:
+                        progress(self)
+            if chunk:
+                self._onboard_chunk(chunk, pool)
+                if progress:
+                    progress(self)
+        return self
+
+    def _onboard_chunk(self, chunk, pool):
+        users = {}
+        for line, record in chunk:
+            cleaned, error = clean_record(record)
+            if error:
+                self.errors.append({'line': line, 'error': error})
+            elif cleaned[0] in users:
+                self.errors.append({'line': line, 'error': "Duplicate mobile in file"})
+            else:
+                users[cleaned[0]] = cleaned
+        existing = set(CustomUser.objects.filter(mobile__in=users).values_list('mobile', flat=True))
+        self.skipped += len(existing)
+        users = [user for mobile, user in users.items() if mobile not in existing]
+        if not users:
+            return
+
+        passwords = [generate_password() for _ in users]
+        hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (4 * self.processes))))
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(
+                [
+                    CustomUser(mobile=mobile, name=name, usertype=usertype, password=hashed)
+                    for (mobile, name, usertype), hashed in zip(users, hashes)
+                ],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+            # Rows lost to a concurrent signup keep the other password; only ours get credentials.
+            stored = dict(CustomUser.objects.filter(mobile__in=[user[0] for user in users]).values_list('mobile', 'password'))
+            messages = [
+                (mobile, CREDENTIALS_MESSAGE.format(password))
+                for (mobile, _, _), password, hashed in zip(users, passwords, hashes)
+                if stored.get(mobile) == hashed
+            ]
+            enqueue_many(messages)
+        self.created += len(messages)
+        self.skipped += len(users) - len(messages)
+
+
+def claim_job():
+    """
+    Claim the oldest pending job with a conditional UPDATE, so two workers never run the same one.
+    """
+    for job_id in OnboardingJob.objects.filter(status='pending').order_by('id').values_list('id', flat=True)[:5]:
+        if OnboardingJob.objects.filter(id=job_id, status='pending').update(status='running'):
+            return OnboardingJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job, processes=None, chunk_size=1000):
+    def progress(onboarder):
+        OnboardingJob.objects.filter(id=job.id).update(created_count=onboarder.created, skipped_count=onboarder.skipped)
+
+    onboarder = Onboarder(processes, chunk_size)
+    try:
+        onboarder.run(parse_records(job.payload, job.format), progress)
+        job.status = 'done'
+    except Exception as e:
+        onboarder.errors.append({'line': None, 'error': str(e)})
+        job.status = 'failed'
+    job.created_count = onboarder.created
+    job.skipped_count = onboarder.skipped
+    job.errors = onboarder.errors
+    job.finished_at = now()
+    job.save(update_fields=['status', 'created_count', 'skipped_count', 'errors', 'finished_at'])
+    return job
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+from ..models import OTP
+
+CACHE_KEY = 'otp:{}'
+
+
+class DatabaseOTPStore:
+    """
+    Looks up the latest unverified OTP of a number through the
+    (phone_number, is_verified, created_at) index; cost does not grow with the table.
+    """
+
+    def issue(self, otp):
+        # Older codes of the number stop working once a new one is sent.
+        OTP.objects.filter(phone_number=otp.phone_number, is_verified=False, expires_at__gt=otp.created_at).exclude(
+            id=otp.id
+        ).update(expires_at=otp.created_at)
+
+    def latest(self, phone_number):
+        """
+        Return (otp_id, code, expires_at) of the latest unverified OTP, or None.
+        """
+        return (
+            OTP.objects.filter(phone_number=phone_number, is_verified=False)
+            .order_by('-created_at')
+            .values_list('id', 'otp', 'expires_at')
+            .first()
+        )
+
+    def forget(self, phone_number):
+        pass
+
+    def verify(self, phone_number, otp_code):
+        """
+        Check `otp_code` against the latest OTP of the number and consume it.
+        Returns (verified, message) like verify_otp always has.
+        """
+        return self.consume(self.latest(phone_number), phone_number, otp_code)
+
+    def consume(self, latest, phone_number, otp_code):
+        if latest is None:
+            return False, "No OTP found for this phone number"
+        otp_id, code, expires_at = latest
+        if now() > expires_at:
+            return False, "OTP expired"
+        if code != otp_code:
+            return False, "Invalid OTP"
+        # Conditional update: a code can be consumed only once, even by concurrent requests,
+        # and not at all once a newer OTP has superseded it.
+        if not OTP.objects.filter(id=otp_id, is_verified=False, expires_at__gt=now()).update(is_verified=True):
+            return False, "No OTP found for this phone number"
+        self.forget(phone_number)
+        return True, "OTP verified"
+
+
+class CacheOTPStore(DatabaseOTPStore):
+    """
+    Keeps the latest OTP of each number in the shared cache until it expires, so verification
+    is a cache read; the database is read when the entry is missing (evicted, or issued before
+    the cache was in use) and when the code does not match it, in case the entry is older than
+    the row. The OTP row stays the record and is still marked verified.
+    """
+
+    def issue(self, otp):
+        super().issue(otp)
+        timeout = (otp.expires_at - now()).total_seconds()
+        if timeout > 0:
+            cache.set(CACHE_KEY.format(otp.phone_number), (otp.id, otp.otp, otp.expires_at), timeout)
+
+    def latest(self, phone_number):
+        return cache.get(CACHE_KEY.format(phone_number)) or super().latest(phone_number)
+
+    def verify(self, phone_number, otp_code):
+        latest = self.latest(phone_number)
+        if latest is not None and latest[1] != otp_code:
+            latest = super().latest(phone_number)
+        return self.consume(latest, phone_number, otp_code)
+
+    def forget(self, phone_number):
+        cache.delete(CACHE_KEY.format(phone_number))
+
+
+_stores = {}
+
+
+def get_otp_store():
+    path = settings.OTP_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
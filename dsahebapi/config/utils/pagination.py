@@ -0,0 +1,108 @@
+import base64
+import datetime
+import decimal
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from ninja.errors import HttpError
+
+
+def get_page_size(request) -> int:
+    """
+    Read the `limit` query parameter, falling back to API_PAGE_SIZE and capped at API_MAX_PAGE_SIZE.
+    """
+    default = getattr(settings, 'API_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+    try:
+        limit = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values) -> str:
+    """
+    Encode the ordering key values of the last row of a page as an opaque cursor.
+    """
+    raw = json.dumps([_cursor_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size=None) -> list:
+    """
+    Decode a cursor produced by encode_cursor, expecting `size` values when given.
+    Raises HttpError(400) if it is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HttpError(400, "Invalid cursor")
+    if (
+        not isinstance(values, list)
+        or (size is not None and len(values) != size)
+        or not all(value is None or isinstance(value, (str, int, float)) for value in values)
+    ):
+        raise HttpError(400, "Invalid cursor")
+    return values
+
+
+def _ordering_for(queryset, ordering):
+    fields = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+    # The primary key is always the final tie-breaker so every row has a unique position.
+    if not any(field.lstrip('-') in ('id', 'pk') for field in fields):
+        descending = bool(fields) and fields[-1].startswith('-')
+        fields.append('-id' if descending else 'id')
+    return fields
+
+
+def _after(fields, values) -> Q:
+    """
+    Build the keyset condition "row comes after (values)" for the given ordering.
+    """
+    condition = Q()
+    for i, field in enumerate(fields):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(fields[:i], values[:i]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def paginate_queryset(queryset, request, ordering=None):
+    """
+    Return one keyset page of `queryset` and the cursor of the next page (None on the last page).
+
+    Every ordering field must be readable as an attribute of the returned rows (model fields or
+    annotations), so the cursor can be built from the last row. Because the page is selected with
+    a `WHERE (key, id) > cursor` condition instead of OFFSET, page N costs the same as page one.
+    """
+    fields = _ordering_for(queryset, ordering)
+    limit = get_page_size(request)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, len(fields))
+        try:
+            queryset = queryset.filter(_after(fields, values))
+        except (ValueError, TypeError, ValidationError):
+            raise HttpError(400, "Invalid cursor")  # a value of the wrong type for its field
+
+    rows = list(queryset.order_by(*fields)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field.lstrip('-')) for field in fields])
+    return rows, next_cursor
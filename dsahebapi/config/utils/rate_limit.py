@@ -0,0 +1,161 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+SLOT = struct.Struct('<Qddd')  # key hash, tokens left, last refill, time the bucket is full again (time.time())
+PROBES = 8  # Slots tried after the home slot of a key before one is recycled
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+GENERATION_KEY = 'ratelimit:generation'
+
+
+def parse_rate(rate):
+    """
+    '3/m', '5/10m' -> (capacity, seconds to refill it).
+    """
+    count, period = rate.split('/')
+    amount, unit = re.fullmatch(r'(\d*)([smhd])', period).groups()
+    return int(count), int(amount or 1) * UNITS[unit]
+
+
+def key_hash(key):
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+class SharedMemoryBuckets:
+    """
+    Token buckets in a memory-mapped file shared by every worker process on the host.
+
+    The file is a fixed open-addressing table of SLOT records. A check locks one record
+    with fcntl (and a thread lock, since fcntl locks are per process), refills the bucket
+    for the time elapsed and takes a token: a few microseconds and no network round trip.
+    Each slot records when its bucket will be full again, computed from the rate of the key
+    that wrote it; past that time the slot holds no state and may be reused by any key, whatever
+    its own rate. If all probed slots are busy the last one is recycled, which only errs
+    towards allowing a request.
+    """
+
+    def __init__(self, path=None, slots=None):
+        self.path = path or settings.RATE_LIMIT_FILE
+        self.slots = slots or settings.RATE_LIMIT_SLOTS
+        self.lock = threading.Lock()
+        self.pid = None
+        self.fd = None
+        self.map = None
+
+    def _open(self):
+        # Reopened after a fork so each worker holds its own descriptor (fcntl locks are per process).
+        if self.pid == os.getpid():
+            return
+        size = self.slots * SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self.fd, self.map, self.pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    def take(self, key, capacity, period):
+        """
+        Take a token for `key`. Returns 0 if allowed, else the seconds until a token is back.
+        """
+        rate = capacity / period
+        wanted = key_hash(key)
+        with self.lock:
+            self._open()
+            home = wanted % self.slots
+            for probe in range(PROBES + 1):
+                index = (home + probe) % self.slots
+                offset = index * SLOT.size
+                fcntl.lockf(self.fd, fcntl.LOCK_EX, SLOT.size, offset)
+                try:
+                    current = time.time()
+                    stored, tokens, updated, full_at = SLOT.unpack_from(self.map, offset)
+                    if stored == wanted:
+                        tokens = min(capacity, tokens + (current - updated) * rate)
+                    elif stored and probe < PROBES and current < full_at:
+                        continue  # Busy with another key
+                    else:
+                        tokens = capacity
+                    if tokens < 1:
+                        retry_after = (1 - tokens) / rate
+                    else:
+                        tokens, retry_after = tokens - 1, 0
+                    SLOT.pack_into(self.map, offset, wanted, tokens, current, current + (capacity - tokens) / rate)
+                    return retry_after
+                finally:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+    def reset(self):
+        with self.lock:
+            self._open()
+            self.map[:] = bytes(len(self.map))
+
+
+class CacheBuckets:
+    """
+    Fixed-window counters in the Django cache (atomic add/incr), for hosts that cannot share
+    a file between workers. Accuracy depends on the cache backend being shared. Keys carry a
+    generation number so reset() drops every counter without touching other cache entries.
+    """
+
+    def generation(self):
+        return cache.get_or_set(GENERATION_KEY, 0, timeout=None)
+
+    def take(self, key, capacity, period):
+        window = int(time.time() // period)
+        cache_key = f'ratelimit:{self.generation()}:{key}:{window}'
+        if cache.add(cache_key, 1, timeout=period):
+            return 0
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:  # expired between add and incr
+            cache.add(cache_key, 1, timeout=period)
+            return 0
+        if count <= capacity:
+            return 0
+        return (window + 1) * period - time.time()
+
+    def reset(self):
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:  # no counter was ever taken
+            pass
+
+
+_backends = {}
+
+
+def get_buckets():
+    path = settings.RATE_LIMIT_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check(policy, request, phone=None):
+    """
+    Apply the RATE_LIMITS policy `policy` to the client IP and, if given, the phone number.
+    Returns 0 when the request may proceed, else the seconds to wait before retrying.
+    """
+    limits = settings.RATE_LIMITS.get(policy, {})
+    buckets = get_buckets()
+    values = {'ip': client_ip(request), 'phone': phone}
+    for scope, rate in limits.items():
+        if values.get(scope) is None:
+            continue
+        capacity, period = parse_rate(rate)
+        retry_after = buckets.take(f'{policy}:{scope}:{values[scope]}', capacity, period)
+        if retry_after:
+            return retry_after
+    return 0
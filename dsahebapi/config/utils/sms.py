@@ -0,0 +1,181 @@
+import logging
+import random
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+import requests
+from ..models import OTP, SMSMessage
+
+logger = logging.getLogger(__name__)
+
+STALE_CLAIM = timedelta(minutes=5)  # A 'sending' row older than this belongs to a dead worker
+
+
+class BaseSMSBackend:
+    """
+    Delivers SMS to a provider. `max_recipients` is how many numbers one request may carry.
+    """
+    max_recipients = 1
+
+    def send(self, phone_numbers, message):
+        """
+        Send one message to up to `max_recipients` numbers; return None on success or an error string.
+        """
+        raise NotImplementedError
+
+
+class AzmobiaSMSBackend(BaseSMSBackend):
+    """
+    HTTP token-key API of sms.azmobia.com over a pooled keep-alive session.
+    The provider accepts a comma separated list of numbers for the same text.
+    """
+
+    def __init__(self):
+        self.max_recipients = settings.SMS_MAX_RECIPIENTS
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=10)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, phone_numbers, message):
+        params = {
+            'authentic-key': settings.SMS_API_KEY,
+            'senderid': settings.SMS_SENDER_ID,
+            'route': 1,
+            'number': ','.join(phone_numbers),
+            'message': message,
+            'templateid': settings.SMS_TEMPLATE_ID,
+        }
+        try:
+            response = self.session.get(settings.SMS_API_URL, params=params, timeout=settings.SMS_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            return f"Error sending SMS: {e}"
+        if response.status_code != 200:
+            return f"Failed to send SMS: {response.status_code}, {response.text[:200]}"
+        return None
+
+
+class LocmemSMSBackend(BaseSMSBackend):
+    """
+    Keeps sent messages in `LocmemSMSBackend.outbox` instead of calling a provider (for tests).
+    Numbers listed in `failing_numbers` fail, to exercise retries.
+    """
+    max_recipients = 100
+    outbox = []
+    failing_numbers = set()
+
+    def send(self, phone_numbers, message):
+        if self.failing_numbers.intersection(phone_numbers):
+            return "Provider rejected the request"
+        self.outbox.extend((phone_number, message) for phone_number in phone_numbers)
+        return None
+
+
+_backends = {}
+
+
+def get_backend():
+    path = settings.SMS_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def enqueue_sms(phone_number, message, otp=None):
+    """
+    Queue an SMS for the worker; the request path never waits on the provider.
+    """
+    return SMSMessage.objects.create(phone_number=phone_number, message=message, otp=otp)
+
+
+def enqueue_many(messages):
+    """
+    Queue many (phone_number, message) pairs with one bulk insert.
+    """
+    return SMSMessage.objects.bulk_create(
+        [SMSMessage(phone_number=phone_number, message=message) for phone_number, message in messages],
+        batch_size=500,
+    )
+
+
+def claim_batch(batch_size=None):
+    """
+    Claim up to `batch_size` due messages for this worker with one conditional UPDATE, so
+    concurrent workers never send the same row. Stale claims of dead workers are taken over.
+    """
+    current = now()
+    due = Q(status='pending', next_attempt_at__lte=current) | Q(status='sending', claimed_at__lt=current - STALE_CLAIM)
+    ids = list(SMSMessage.objects.filter(due).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size or settings.SMS_BATCH_SIZE])
+    if not ids:
+        return []
+    token = uuid.uuid4()
+    SMSMessage.objects.filter(due, id__in=ids).update(status='sending', claim_token=token, claimed_at=current)
+    return list(SMSMessage.objects.filter(claim_token=token, status='sending'))
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter: SMS_RETRY_DELAY, doubled per failed attempt.
+    """
+    base = settings.SMS_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=base * random.uniform(0.8, 1.2))
+
+
+def dispatch(messages, backend=None):
+    """
+    Send claimed messages, batching recipients of identical texts, and record the outcome.
+    Returns (sent, failed) counts; failed messages are rescheduled until SMS_MAX_ATTEMPTS.
+    The text of a message is erased once it is sent or given up on, since it may carry an
+    OTP or a password.
+    """
+    backend = backend or get_backend()
+    by_text = defaultdict(list)
+    for message in messages:
+        by_text[message.message].append(message)
+
+    errors = {}
+    for text, group in by_text.items():
+        for start in range(0, len(group), backend.max_recipients):
+            chunk = group[start:start + backend.max_recipients]
+            error = backend.send([message.phone_number for message in chunk], text)
+            for message in chunk:
+                errors[message.id] = error
+
+    current = now()
+    sent = [message.id for message in messages if errors[message.id] is None]
+    failed = [message for message in messages if errors[message.id] is not None]
+    if sent:
+        SMSMessage.objects.filter(id__in=sent).update(
+            status='sent', message='', sent_at=current, attempts=F('attempts') + 1, claim_token=None,
+        )
+        otp_ids = [message.otp_id for message in messages if message.otp_id and errors[message.id] is None]
+        if otp_ids:
+            OTP.objects.filter(id__in=otp_ids).update(is_sent=True)
+    for message in failed:
+        message.attempts += 1
+        message.last_error = errors[message.id]
+        message.claim_token = None
+        if message.attempts >= settings.SMS_MAX_ATTEMPTS:
+            message.status = 'failed'
+            message.message = ''
+            logger.warning("Giving up on SMS %s to %s: %s", message.id, message.phone_number, message.last_error)
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = current + retry_delay(message.attempts)
+    if failed:
+        SMSMessage.objects.bulk_update(failed, ['status', 'message', 'attempts', 'last_error', 'next_attempt_at', 'claim_token'], batch_size=100)
+    return len(sent), len(failed)
+
+
+def process_outbox(batch_size=None, backend=None):
+    """
+    One worker pass: claim a batch and dispatch it. Returns (sent, failed).
+    """
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+    return dispatch(messages, backend)
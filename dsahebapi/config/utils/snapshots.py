@@ -0,0 +1,51 @@
+import threading
+from collections import namedtuple
+from django.http import HttpResponse
+from pydantic import TypeAdapter
+from config.utils.loaders import DataLoader
+from config.utils.versioning import get_version, table_label
+
+Snapshot = namedtuple('Snapshot', ['versions', 'body'])
+
+
+class SnapshotCache:
+    """
+    Whole-table responses for near-static reference data, held in process as pre-serialized
+    JSON bytes. A snapshot records the version stamps of the tables it was built from
+    (nested serializers read several); it is rebuilt when any of them moves and replaced in
+    one assignment, so readers always see a complete snapshot, old or new.
+
+    Each worker keeps its own snapshots, but the stamps are read from the database through
+    the shared cache, so a write in one worker makes every worker rebuild on its next request.
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, queryset, schema, models):
+        """
+        Serve `queryset` serialized as list[schema] under `name`; `models` are every table it reads.
+        """
+        self.sources[name] = (queryset, schema, TypeAdapter(list[schema]), [table_label(model) for model in models])
+
+    def body(self, name):
+        queryset, schema, adapter, labels = self.sources[name]
+        versions = tuple(get_version(label) for label in labels)
+        snapshot = self.snapshots.get(name)
+        if snapshot is None or snapshot.versions != versions:
+            with self.lock:
+                snapshot = self.snapshots.get(name)
+                if snapshot is None or snapshot.versions != versions:
+                    instances = DataLoader().load(list(queryset.all()), schema)
+                    rows = adapter.validate_python(instances, from_attributes=True)
+                    snapshot = Snapshot(versions, adapter.dump_json(rows))
+                    self.snapshots[name] = snapshot
+        return snapshot.body
+
+    def response(self, name):
+        return HttpResponse(self.body(name), content_type='application/json')
+
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from config.utils.versioning import bump_version, get_version
+
+VERSION_LABEL = 'auth:blacklist'
+CHECK_INTERVAL = 1  # Seconds between checks of the shared blacklist version
+RESYNC_INTERVAL = 30  # Seconds after which the database is read even if no bump was seen
+SETTLE_SECONDS = 5  # Rows this recent may still be joined by earlier ids committing late
+BATCH_SIZE = 1000
+
+
+class BlacklistFilter:
+    """
+    In-process set of blacklisted, unexpired jtis.
+
+    Refreshed incrementally: only BlacklistedToken rows past the id watermark are read, when the
+    blacklist version in the shared cache changed, and at least every RESYNC_INTERVAL anyway,
+    so a lost bump delays revocation by seconds rather than until the token expires. The watermark stops short of rows younger than
+    SETTLE_SECONDS so that ids committed out of order are still picked up on a later refresh.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jtis = {}  # jti -> expires_at (epoch seconds)
+        self.watermark = 0
+        self.unsettled = False
+        self.version = None
+        self.checked_at = 0
+        self.refreshed_at = 0
+
+    def refresh(self):
+        now = timezone.now()
+        settled = now - timedelta(seconds=SETTLE_SECONDS)
+        rows = (
+            BlacklistedToken.objects.filter(id__gt=self.watermark, token__expires_at__gt=now)
+            .order_by('id')
+            .values_list('id', 'blacklisted_at', 'token__jti', 'token__expires_at')
+        )
+        self.unsettled = False
+        self.refreshed_at = time.monotonic()
+        for row_id, blacklisted_at, jti, expires_at in rows:
+            self.jtis[jti] = expires_at.timestamp()
+            if blacklisted_at >= settled:
+                self.unsettled = True
+            elif not self.unsettled:
+                self.watermark = row_id
+        cutoff = now.timestamp()
+        for jti in [jti for jti, expires_at in self.jtis.items() if expires_at <= cutoff]:
+            del self.jtis[jti]
+
+    def contains(self, jti):
+        """
+        Whether `jti` is blacklisted. Costs a set lookup; at most once per CHECK_INTERVAL the
+        shared version is read, and the database only when something was blacklisted since.
+        """
+        now = time.monotonic()
+        if now - self.checked_at >= CHECK_INTERVAL:
+            with self.lock:
+                if now - self.checked_at >= CHECK_INTERVAL:
+                    version = get_version(VERSION_LABEL)
+                    if version != self.version or self.unsettled or now - self.refreshed_at >= RESYNC_INTERVAL:
+                        self.refresh()
+                        self.version = version
+                    self.checked_at = now
+        return jti in self.jtis
+
+    def clear(self):
+        with self.lock:
+            self.jtis.clear()
+            self.watermark = 0
+            self.unsettled = False
+            self.version = None
+            self.checked_at = 0
+            self.refreshed_at = 0
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def blacklist_changed():
+    """
+    Make every process refresh its filter; this one does so on its next check.
+    """
+    bump_version(VERSION_LABEL)
+    blacklist_filter.checked_at = 0
+
+
+def blacklist_user_tokens(user, access_token=None):
+    """
+    Blacklist every outstanding token of `user` with set-based statements and return how many
+    were added. `access_token` (a validated AccessToken) is recorded as outstanding first, so
+    the token used for the request is revoked as well; simplejwt only tracks refresh tokens.
+    """
+    if access_token is not None:
+        OutstandingToken.objects.bulk_create([
+            OutstandingToken(
+                user=user,
+                jti=access_token[api_settings.JTI_CLAIM],
+                token=str(access_token),
+                created_at=timezone.now(),
+                expires_at=datetime_from_epoch(access_token['exp']),
+            )
+        ], ignore_conflicts=True)
+    pending = OutstandingToken.objects.filter(user=user, blacklistedtoken__isnull=True).values_list('id', flat=True)
+    added = BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id in pending],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    blacklist_changed()
+    return len(added)
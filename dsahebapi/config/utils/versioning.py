@@ -0,0 +1,52 @@
+import time
+from django.core.cache import cache
+from config.models import VersionStamp
+
+VERSION_KEY = 'version:{}'
+
+
+def _stored_version(label: str) -> int:
+    # The first worker to need a stamp seeds it; everyone else reads the same row.
+    return VersionStamp.objects.get_or_create(label=label, defaults={'version': time.time_ns()})[0].version
+
+
+def get_version(label: str) -> int:
+    """
+    Return the current version stamp of `label`. Stamps are stored in the VersionStamp table
+    and read through the shared cache, so every worker sees the same value, and a stamp
+    missing from the cache (first use, eviction, flush) is reloaded rather than re-invented.
+    """
+    key = VERSION_KEY.format(label)
+    version = cache.get(key)
+    if version is None:
+        version = _stored_version(label)
+        # add() never overwrites a newer stamp set by a concurrent bump_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(label: str) -> int:
+    """
+    Mark `label` as changed and return its new version stamp (nanoseconds since the epoch).
+    """
+    version = time.time_ns()
+    # One upsert (INSERT ... ON DUPLICATE KEY UPDATE on MySQL)
+    VersionStamp.objects.bulk_create(
+        [VersionStamp(label=label, version=version)],
+        update_conflicts=True, unique_fields=['label'], update_fields=['version'],
+    )
+    cache.set(VERSION_KEY.format(label), version, timeout=None)
+    return version
+
+
+def table_label(model) -> str:
+    return f'table:{model._meta.label_lower}'
+
+
+def table_changed(model) -> int:
+    """
+    Mark the rows of `model` as changed (called by save/delete signals after commit;
+    queryset.update() and bulk writes must call it themselves).
+    """
+    return bump_version(table_label(model))
@@ -1,30 +1,38 @@
 from ninja import Router
 from config.utils.api_helpers import success_response, failure_response
 from config.serializers import OTP_Request, OTP_Verify
-from config.utils.otp_utils import send_otp, verify_otp, send_sms, generate_otp
+from config.utils.otp_utils import send_otp, verify_otp, send_sms
 from django.contrib.auth import get_user_model
-import random
-from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import check_password, make_password
 from config.serializers import User_Create, User_Profile, User_Profile
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.conf import settings
-from django.contrib.auth import authenticate
+from django.db import transaction
+from asgiref.sync import sync_to_async
 from ninja.errors import HttpError
-from ninja.security import HttpBearer
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
-from django_ratelimit.decorators import ratelimit
-from datetime import timedelta
-from django.utils import timezone
-from config.models import LoginAttempt
+from config.utils.jwt_auth import JWTAuth, invalidate_user
+from config.utils.token_blacklist import blacklist_user_tokens
+from config.utils import rate_limit
+from config.utils.login_guard import ais_locked, areset_failures, arecord_failure, audit_writer
+from config.utils.hashing import PoolSaturated, hashing_pool
+from config.utils.onboarding import generate_password
+from config.models import OnboardingJob
+from ninja import File
+from ninja.files import UploadedFile
 
 User = get_user_model()
 router = Router()
 
+def throttled_response(retry_after):
+    response = failure_response(message="Too many requests. Please try again later.", status_code=429)
+    response['Retry-After'] = str(max(1, round(retry_after)))
+    return response
+
 @router.post("/request-otp")
-@ratelimit(key='ip', rate='3/m', method='ALL', block=True) 
 def request_otp(request, data: OTP_Request):
-    if getattr(request, 'limited', False):  # Check if the rate limit is exceeded
-        return failure_response(message="Too many requests. Please try again later.", status_code=429)
+    retry_after = rate_limit.check('otp', request, phone=data.phone_number)
+    if retry_after:
+        return throttled_response(retry_after)
 
     success, message = send_otp(data.phone_number)
     response_data = None
@@ -41,6 +49,10 @@ def verify_otp_view(request, data: OTP_Verify):
     """
     Endpoint to verify OTP for the given phone number.
     """
+    retry_after = rate_limit.check('otp_verify', request, phone=data.phone_number)
+    if retry_after:
+        return throttled_response(retry_after)
+
     # Use the utility function to verify OTP
     success, message = verify_otp(data.phone_number, data.otp)
     
@@ -60,47 +72,64 @@ def verify_otp_view(request, data: OTP_Verify):
 
 
 # Generate a random 6-digit password
-def generate_random_password():
-    return str(random.randint(100000, 999999))
+generate_random_password = generate_password
+
+def issue_tokens(user):
+    refresh = RefreshToken.for_user(user)
+    return str(refresh.access_token), str(refresh)
+
+def busy_response():
+    response = failure_response(message="Server is busy. Please try again shortly.", status_code=503)
+    response['Retry-After'] = '1'
+    return response
+
+@transaction.atomic
+def register_user(data, hashed_password, generated_password):
+    # One commit for the user, its queued effects, the credentials SMS and the refresh token.
+    # The SMS row is the durable record of the send; the OutstandingToken row is what
+    # blacklist_user_tokens revokes, so neither can be skipped.
+    user = get_user_model().objects.create(
+        mobile=data.mobile,
+        usertype=data.usertype,
+        password=hashed_password,
+        is_verified=False,  # The user is not verified initially
+    )
+
+    # Send the generated password to the user via SMS
+    send_sms(data.mobile, f"Your password is {generated_password}. Please use it to log in.")
+
+    # Optionally, generate JWT token for immediate use
+    return issue_tokens(user)
 
 # User Registration API (with auto-generated password)
 @router.post("/create-user")
-def create_user(request, data: User_Create):
+async def create_user(request, data: User_Create):
     try:
         # Generate a random 6-digit password
         generated_password = generate_random_password()
 
-        # Hash the generated password
-        hashed_password = make_password(generated_password)
-
-        # Create the user
-        user = get_user_model().objects.create(
-            mobile=data.mobile,
-            usertype=data.usertype,
-            password=hashed_password,
-            is_verified=False,  # The user is not verified initially
-        )
+        # Hash the generated password on the bounded hashing pool, off the event loop
+        hashed_password = await hashing_pool.run(make_password, generated_password)
 
-        # Send the generated password to the user via SMS
-        send_sms(data.mobile, f"Your password is {generated_password}. Please use it to log in.")
-
-        # Optionally, generate JWT token for immediate use
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
+        access_token, refresh_token = await sync_to_async(register_user)(data, hashed_password, generated_password)
 
         # Return success response with JWT and info
         return success_response(message="User created successfully", data={
             "access_token": access_token,
-            "refresh_token": str(refresh),
+            "refresh_token": refresh_token,
         })
 
+    except PoolSaturated:
+        return busy_response()
     except Exception as e:
         return failure_response(message=str(e))
     
-MAX_ATTEMPTS = 5
-LOCKOUT_TIME = timedelta(minutes=30)
 @router.post("/login-with-otp")
 def login_with_otp(request, data: OTP_Verify):
+    retry_after = rate_limit.check('otp_verify', request, phone=data.phone_number)
+    if retry_after:
+        return throttled_response(retry_after)
+
     # Verify OTP for the provided mobile number
     is_verified, message = verify_otp(data.phone_number, data.otp)
     if is_verified:
@@ -115,47 +144,56 @@ def login_with_otp(request, data: OTP_Verify):
     return failure_response(message=message)
 
 @router.post("/login")
-def login(request, mobile: str, password: str):
+async def login(request, mobile: str, password: str):
     if not mobile or not password:
-        raise failure_response(message="Please enter your mobile and passoword.", status_code=401)
+        return failure_response(message="Please enter your mobile and passoword.", status_code=401)
     
-    user = get_user_model().objects.filter(mobile=mobile).first()
+    retry_after = rate_limit.check('login', request, phone=mobile)
+    if retry_after:
+        return throttled_response(retry_after)
+    
+    user = await get_user_model().objects.filter(mobile=mobile).afirst()
     if not user:
         return failure_response(message="User not found", status_code=404)
     
-    # Track failed login attempts
-    if LoginAttempt.objects.filter(user=user, successful=False, attempted_at__gt=timezone.now() - LOCKOUT_TIME).count() >= MAX_ATTEMPTS:
+    # Failed attempts in the lockout window come from cache counters, not from LoginAttempt
+    if await ais_locked(user.id):
         return failure_response(message="Account locked due to too many failed login attempts. Please try again later.", status_code=403)
     
-    user_authenticated = authenticate(request, mobile=mobile, password=password)
-    if not user_authenticated:
-        # Log failed login attempt
-        LoginAttempt.objects.create(user=user, successful=False)
+    # PBKDF2 runs on the bounded hashing pool; a full pool answers 503 immediately.
+    # Only the pure check runs there: the setter just notes that the hash needs an upgrade.
+    needs_upgrade = []
+    try:
+        password_ok = await hashing_pool.run(check_password, password, user.password, needs_upgrade.append)
+    except PoolSaturated:
+        return busy_response()
+    if not (password_ok and user.is_active):
+        await arecord_failure(user.id)
+        await audit_writer.arecord(user.id, successful=False)
         return failure_response(message="Invalid credentials", status_code=401)
+
+    if needs_upgrade:
+        # Re-hash with the preferred hasher; skipped under load and retried on a later login.
+        try:
+            user.password = await hashing_pool.run(make_password, password)
+        except PoolSaturated:
+            pass
+        else:
+            await sync_to_async(user.save)(update_fields=['password'])
     
     # Reset failed login attempts on successful login
-    LoginAttempt.objects.filter(user=user).update(successful=True)
+    await areset_failures(user.id)
+    await audit_writer.arecord(user.id, successful=True)
     
     # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
-    access_token = str(refresh.access_token)
+    access_token, refresh_token = await sync_to_async(issue_tokens)(user)
     
     return success_response(message="Login successful", data={
         "access_token": access_token,
-        "refresh_token": str(refresh),
+        "refresh_token": refresh_token,
         "user_type": user.usertype,
     })
 
-class JWTAuth(HttpBearer):
-    def authenticate(self, request, token):
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        try:
-            validated_token = JWTAuthentication().get_validated_token(token)
-            user = JWTAuthentication().get_user(validated_token)
-            return user
-        except Exception:
-            return None
-
 auth = JWTAuth()
 
 @router.get("/profile", auth=auth)
@@ -194,44 +232,94 @@ def logout(request):
     """
     user = request.auth
     
-    # Blacklist all outstanding tokens for the user
-    tokens = OutstandingToken.objects.filter(user=user)
-    for token in tokens:
-        BlacklistedToken.objects.get_or_create(token=token)
+    # Blacklist all outstanding tokens for the user, including the access token of this request
+    access_token = AccessToken(request.headers['Authorization'].split(' ', 1)[1])
+    blacklist_user_tokens(user, access_token)
+    invalidate_user(user.id)
     
     return success_response(message="Logout successful")
 
+def is_admin(user):
+    return user.is_staff or user.is_superuser or user.usertype in ('admin', 'superadmin')
+
+@router.post("/onboarding", auth=auth)
+def upload_onboarding(request, file: UploadedFile = File(...), format: str = None):
+    """
+    Queue a CSV (with a mobile,name,usertype header) or NDJSON file of users for the
+    onboard_users worker. Returns the job id to poll.
+    """
+    if not is_admin(request.auth):
+        return failure_response(message="Only admins can onboard users", status_code=403)
+    format = format or ('ndjson' if file.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+    if format not in ('csv', 'ndjson'):
+        return failure_response(message="Format must be csv or ndjson", status_code=400)
+    try:
+        payload = file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return failure_response(message="File must be UTF-8 text", status_code=400)
+    job = OnboardingJob.objects.create(created_by=request.auth, format=format, payload=payload)
+    return success_response(message="Onboarding queued", data={"job_id": job.id, "status": job.status})
+
+@router.get("/onboarding/{job_id}", auth=auth)
+def onboarding_status(request, job_id: int):
+    if not is_admin(request.auth):
+        return failure_response(message="Only admins can onboard users", status_code=403)
+    job = OnboardingJob.objects.filter(id=job_id).defer('payload').first()
+    if not job:
+        return failure_response(message="Job not found", status_code=404)
+    return success_response(message="Onboarding job", data={
+        "job_id": job.id,
+        "status": job.status,
+        "created": job.created_count,
+        "skipped": job.skipped_count,
+        "errors": job.errors,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    })
+
 @router.post("/request-password-reset")
 def request_password_reset(request, mobile: str):
     """
     Request OTP for password reset.
     """
+    retry_after = rate_limit.check('otp', request, phone=mobile)
+    if retry_after:
+        return throttled_response(retry_after)
+
     user = get_user_model().objects.filter(mobile=mobile).first()
     if not user:
         return failure_response(message="User not found", status_code=404)
     
-    # Generate and send OTP
-    otp = generate_otp(mobile)
-    send_sms(mobile, f"our login OTP for Trainmenu is : {otp} is valid for 30 minutes. Team Trainmenu")
+    # Generate, store and send the OTP checked by reset-password
+    send_otp(mobile)
     
     return success_response(message="OTP sent successfully")
 
 @router.post("/reset-password")
-def reset_password(request, mobile: str, otp: str, new_password: str):
+async def reset_password(request, mobile: str, otp: str, new_password: str):
     """
     Reset password after OTP verification.
     """
-    is_verified, message = verify_otp(mobile, otp)
+    retry_after = rate_limit.check('password_reset', request, phone=mobile)
+    if retry_after:
+        return throttled_response(retry_after)
+
+    # Refuse before the OTP is consumed if there is no capacity to hash the new password
+    if hashing_pool.is_saturated():
+        return busy_response()
+
+    is_verified, message = await sync_to_async(verify_otp)(mobile, otp)
     if not is_verified:
         return failure_response(message=message, status_code=404)
     
-    user = get_user_model().objects.filter(mobile=mobile).first()
+    user = await get_user_model().objects.filter(mobile=mobile).afirst()
     if not user:
         return failure_response(message="User not found", status_code=404)
     
     # Update the user's password
-    user.set_password(new_password)
-    user.save()
+    try:
+        user.password = await hashing_pool.run(make_password, new_password)
+    except PoolSaturated:
+        return busy_response()
+    await sync_to_async(user.save)(update_fields=['password'])
     
-    return success_response(message="Password reset successfully")
-
+    return success_response(message="Password reset successfully")
\ No newline at end of file
@@ -1,14 +1,41 @@
 from ninja import Router
+from config.utils.api_helpers import success_response
+from config.utils.autocomplete import autocomplete_index, MAX_SUGGESTIONS
+from config.utils.conditional import conditional
+from config.utils.loaders import load_related
+from config.utils.snapshots import snapshot_cache
 from .models import State, City, Location, Services, Specialization, University, College, Degree, Memberships, Registration
 from .serializers import StateSerializer, CitySerializer, LocationSerializer, ServicesSerializer, SpecializationSerializer, UniversitySerializer, CollegeSerializer, DegreeSerializer, MembershipsSerializer, RegistrationSerializer
 
 router = Router()
 
+# Reference tables served as in-process JSON snapshots, rebuilt when a table they read changes.
+# Nested states/cities/universities are batch-loaded by DataLoader while building.
+snapshot_cache.register('states', State.objects.all(), StateSerializer, [State])
+snapshot_cache.register('cities', City.objects.all(), CitySerializer, [City, State])
+snapshot_cache.register('locations', Location.objects.all(), LocationSerializer, [Location, City, State])
+snapshot_cache.register('services', Services.objects.all(), ServicesSerializer, [Services])
+snapshot_cache.register('specializations', Specialization.objects.all(), SpecializationSerializer, [Specialization])
+snapshot_cache.register('universities', University.objects.all(), UniversitySerializer, [University, City, State])
+snapshot_cache.register('colleges', College.objects.all(), CollegeSerializer, [College, University, City, State])
+snapshot_cache.register('degrees', Degree.objects.all(), DegreeSerializer, [Degree])
+snapshot_cache.register('memberships', Memberships.objects.all(), MembershipsSerializer, [Memberships])
+snapshot_cache.register('registrations', Registration.objects.all(), RegistrationSerializer, [Registration])
+
+@router.get("/autocomplete", response=dict)
+def autocomplete(request, q: str, limit: int = MAX_SUGGESTIONS):
+    """
+    Typeahead suggestions over services, specializations, cities, locations, degrees and colleges.
+    Served from an in-process trie, ranked by how many listings use each name.
+    """
+    suggestions = autocomplete_index.suggest(q, max(1, min(limit, MAX_SUGGESTIONS)))
+    return success_response(message="Suggestions fetched successfully", data=suggestions)
+
 # Endpoints for State
 @router.get("/states", response=list[StateSerializer])
+@conditional(State)
 def get_states(request):
-    states = State.objects.all()
-    return states
+    return snapshot_cache.response('states')
 
 @router.post("/states", response=StateSerializer)
 def create_state(request, data: StateSerializer):
@@ -16,6 +43,7 @@ def create_state(request, data: StateSerializer):
     return state
 
 @router.get("/states/{state_id}", response=StateSerializer)
+@conditional(State)
 def get_state(request, state_id: int):
     state = State.objects.get(id=state_id)
     return state
@@ -32,18 +60,57 @@ def update_state(request, state_id: int, data: StateSerializer):
 
 # Example for City:
 @router.get("/cities", response=list[CitySerializer])
+@conditional(City, State)
 def get_cities(request):
-    cities = City.objects.all()
-    return cities
+    return snapshot_cache.response('cities')
 
 @router.post("/cities", response=CitySerializer)
 def create_city(request, data: CitySerializer):
     city = City.objects.create(**data.dict())
-    return city
+    return load_related(request, [city], CitySerializer)[0]
 
 @router.get("/cities/{city_id}", response=CitySerializer)
+@conditional(City, State)
 def get_city(request, city_id: int):
     city = City.objects.get(id=city_id)
-    return city
+    return load_related(request, [city], CitySerializer)[0]
+
+@router.get("/locations", response=list[LocationSerializer])
+@conditional(Location, City, State)
+def get_locations(request):
+    return snapshot_cache.response('locations')
+
+@router.get("/services", response=list[ServicesSerializer])
+@conditional(Services)
+def get_services(request):
+    return snapshot_cache.response('services')
+
+@router.get("/specializations", response=list[SpecializationSerializer])
+@conditional(Specialization)
+def get_specializations(request):
+    return snapshot_cache.response('specializations')
+
+@router.get("/universities", response=list[UniversitySerializer])
+@conditional(University, City, State)
+def get_universities(request):
+    return snapshot_cache.response('universities')
+
+@router.get("/colleges", response=list[CollegeSerializer])
+@conditional(College, University, City, State)
+def get_colleges(request):
+    return snapshot_cache.response('colleges')
+
+@router.get("/degrees", response=list[DegreeSerializer])
+@conditional(Degree)
+def get_degrees(request):
+    return snapshot_cache.response('degrees')
 
+@router.get("/memberships", response=list[MembershipsSerializer])
+@conditional(Memberships)
+def get_memberships(request):
+    return snapshot_cache.response('memberships')
 
+@router.get("/registrations", response=list[RegistrationSerializer])
+@conditional(Registration)
+def get_registrations(request):
+    return snapshot_cache.response('registrations')
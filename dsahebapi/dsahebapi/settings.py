@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
 from datetime import timedelta
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -87,6 +88,27 @@ DATABASES = {
         'PORT': config('DB_PORT'),
     }
 }
+# Cache
+# Version stamps, login lockout counters, cached OTPs and rate-limit counters live here, so
+# every worker process must see the same cache: set CACHE_URL (e.g. redis://127.0.0.1:6379/1).
+# Without it a per-process LocMemCache is used, which is only accepted for single-process
+# development and tests (ALLOW_PROCESS_LOCAL_CACHE, on by default with DEBUG).
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+ALLOW_PROCESS_LOCAL_CACHE = config('ALLOW_PROCESS_LOCAL_CACHE', default=DEBUG, cast=bool)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -127,4 +149,58 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-SMS_API_KEY = config('SMS_API_KEY')
\ No newline at end of file
+SMS_API_KEY = config('SMS_API_KEY')
+
+# Where issued OTPs are looked up on verification (config.utils.otp_store)
+OTP_STORE = config('OTP_STORE', default='config.utils.otp_store.CacheOTPStore')
+
+# SMS outbox (config.utils.sms); messages are delivered by `manage.py run_sms_worker`
+SMS_BACKEND = config('SMS_BACKEND', default='config.utils.sms.AzmobiaSMSBackend')
+SMS_API_URL = config('SMS_API_URL', default='http://sms.azmobia.com/http-tokenkeyapi.php')
+SMS_SENDER_ID = config('SMS_SENDER_ID', default='TRAINM')
+SMS_TEMPLATE_ID = config('SMS_TEMPLATE_ID', default='1207168149392467501')
+SMS_TIMEOUT = config('SMS_TIMEOUT', default=5, cast=float)  # Seconds per provider request
+SMS_MAX_RECIPIENTS = config('SMS_MAX_RECIPIENTS', default=100, cast=int)  # Numbers per provider request
+SMS_BATCH_SIZE = config('SMS_BATCH_SIZE', default=200, cast=int)  # Messages claimed per worker pass
+SMS_MAX_ATTEMPTS = config('SMS_MAX_ATTEMPTS', default=5, cast=int)
+SMS_RETRY_DELAY = config('SMS_RETRY_DELAY', default=30, cast=int)  # Seconds, doubled after each failure
+
+# Keyset pagination for list endpoints
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=20, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=100, cast=int)
+
+# Per-process cache of public listing search responses
+SEARCH_CACHE_MAX_ENTRIES = config('SEARCH_CACHE_MAX_ENTRIES', default=2048, cast=int)
+SEARCH_CACHE_TTL = config('SEARCH_CACHE_TTL', default=10, cast=int)  # Seconds
+
+# Days ahead covered by the precomputed availability bitmaps ("available on" search filter)
+AVAILABILITY_HORIZON_DAYS = config('AVAILABILITY_HORIZON_DAYS', default=30, cast=int)
+
+# Per-process caches of verified JWTs and their users (config.utils.jwt_auth)
+JWT_AUTH_TOKEN_CACHE_SIZE = config('JWT_AUTH_TOKEN_CACHE_SIZE', default=10000, cast=int)
+JWT_AUTH_USER_CACHE_SIZE = config('JWT_AUTH_USER_CACHE_SIZE', default=5000, cast=int)
+
+# Login audit rows (config.models.LoginAttempt) are written by a background thread when True
+LOGIN_AUDIT_ASYNC = config('LOGIN_AUDIT_ASYNC', default=True, cast=bool)
+
+# Password hashing pool used by the async auth endpoints (config.utils.hashing).
+# Unset workers means one per CPU; unset max pending means eight jobs per worker.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=0, cast=int) or None
+PASSWORD_HASHING_MAX_PENDING = config('PASSWORD_HASHING_MAX_PENDING', default=0, cast=int) or None
+
+# Rate limits of the auth endpoints (config.utils.rate_limit): policy -> {scope: 'count/period'},
+# scope 'ip' (client address) or 'phone' (number in the request); periods s, m, h, d, e.g. '5/10m'
+RATE_LIMITS = {
+    'otp': {'ip': '3/m', 'phone': '5/h'},
+    'otp_verify': {'ip': '20/m', 'phone': '10/10m'},
+    'login': {'ip': '30/m', 'phone': '10/m'},
+    'password_reset': {'ip': '10/m', 'phone': '5/10m'},
+}
+RATE_LIMIT_BACKEND = config('RATE_LIMIT_BACKEND', default='config.utils.rate_limit.SharedMemoryBuckets')
+# Shared by all workers on a host; /dev/shm keeps it in memory where available
+RATE_LIMIT_FILE = config('RATE_LIMIT_FILE', default=os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'dsahebapi-ratelimit'))
+RATE_LIMIT_SLOTS = config('RATE_LIMIT_SLOTS', default=65536, cast=int)
+
+# Signal side effects (config.utils.deferred) are queued for `manage.py run_deferred_effects` when True,
+# run inline right after commit when False
+DEFERRED_EFFECTS_ASYNC = config('DEFERRED_EFFECTS_ASYNC', default=True, cast=bool)
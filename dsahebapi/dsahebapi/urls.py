@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.urls import path
 from ninja import NinjaAPI
+from config.utils.conditional import conditional_get
 from config.views import router as config_router
 from config.views_utils import router as utils_router
 from listings.views import router as listings_router
 from listings.views_doctor import router as listings_router_doctor
+from listings.views_booking import router as listings_router_booking
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -16,11 +18,15 @@ api = NinjaAPI(
     description="API Doctor Saheb"  # Optional: Add a description for better context
     )
 
+# ETag/Last-Modified and 304s for GET endpoints marked with @conditional(...)
+api.add_decorator(conditional_get, mode="view")
+
 # Add the 'config' app's router to the '/api/users/' URL path
 api.add_router("/users/", config_router, tags=["Users"])
 api.add_router("/utils/", utils_router, tags=["Utils"])
 api.add_router("/listing/", listings_router, tags=["Listings"])
 api.add_router("/listing/doctor/", listings_router_doctor, tags=["Doctor Listings"])
+api.add_router("/listing/booking/", listings_router_booking, tags=["Appointments"])
 
 urlpatterns = [
     path('admin/', admin.site.urls),
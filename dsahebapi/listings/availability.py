@@ -0,0 +1,142 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Availability, AvailabilityBitmap, Listing, Unavailability
+from .slots import MINUTES_PER_DAY, WEEKDAYS, blackout_interval, day_schedule
+
+CELL_MINUTES = 5
+CELLS_PER_DAY = MINUTES_PER_DAY // CELL_MINUTES
+BITMAP_BYTES = CELLS_PER_DAY // 8
+CHUNK_SIZE = 500
+COVERED_KEY = 'availability:covered:{}'  # date -> every listing's bitmap for it is written
+FILL_LOCK_KEY = 'availability:filling:{}'  # date -> a request is filling in missing bitmaps
+FILL_LOCK_TIMEOUT = 60
+
+
+def horizon_days():
+    return getattr(settings, 'AVAILABILITY_HORIZON_DAYS', 30)
+
+
+def _parse(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def cell_mask(start_minute, end_minute):
+    """
+    Bitmask of the cells overlapping [start_minute, end_minute).
+    """
+    first = start_minute // CELL_MINUTES
+    last = -(-end_minute // CELL_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def schedule_bitmap(schedule):
+    """
+    Bitmap (as an int) of the cells covered by the slots of a day_schedule() result.
+    """
+    bits = 0
+    for slot in schedule["slots"]:
+        bits |= cell_mask(_parse(slot["start"]), _parse(slot["end"]))
+    return bits
+
+
+def refresh_bitmaps(listing_ids=None, start=None, days=None):
+    """
+    Recompute the bitmaps of the given listings (all when None) for `days` days from `start`.
+    Work is done in chunks of listings, with two reads and one replace per chunk.
+    A full refresh covers one day past the horizon, so a late daily run leaves no gap.
+    Returns the number of rows written.
+    """
+    covers_all = listing_ids is None
+    start = start or timezone.localdate()
+    days = days or horizon_days() + (1 if covers_all else 0)
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    end = dates[-1]
+    if listing_ids is None:
+        listing_ids = list(Listing.objects.values_list('id', flat=True))
+        AvailabilityBitmap.objects.filter(date__lt=start).delete()
+    listing_ids = list(listing_ids)
+
+    written = 0
+    for offset in range(0, len(listing_ids), CHUNK_SIZE):
+        chunk = listing_ids[offset:offset + CHUNK_SIZE]
+        weekly = {}
+        for availability in Availability.objects.filter(listing_id__in=chunk, status=True):
+            weekly.setdefault((availability.listing_id, availability.day), []).append(availability)
+        blackouts = {}
+        for unavailability in Unavailability.objects.filter(
+            listing_id__in=chunk, status=True, dateofunavailability__range=(start, end),
+        ):
+            key = (unavailability.listing_id, unavailability.dateofunavailability)
+            blackouts.setdefault(key, []).append(blackout_interval(unavailability))
+
+        rows = []
+        for listing_id in chunk:
+            for day in dates:
+                availabilities = weekly.get((listing_id, WEEKDAYS[day.weekday()]))
+                if not availabilities:
+                    continue
+                bits = schedule_bitmap(day_schedule(availabilities, blackouts.get((listing_id, day), [])))
+                if bits:
+                    rows.append(AvailabilityBitmap(listing_id=listing_id, date=day, bits=bits.to_bytes(BITMAP_BYTES, 'big')))
+
+        with transaction.atomic():
+            AvailabilityBitmap.objects.filter(listing_id__in=chunk, date__range=(start, end)).delete()
+            # A concurrent refresh of the same days writes the same rows.
+            AvailabilityBitmap.objects.bulk_create(rows, batch_size=CHUNK_SIZE, ignore_conflicts=True)
+        written += len(rows)
+    if covers_all:
+        _mark_covered(dates)
+    return written
+
+
+def _mark_covered(dates):
+    cache.set_many({COVERED_KEY.format(day.isoformat()): True for day in dates}, timeout=(horizon_days() + 2) * 86400)
+
+
+def ensure_bitmaps(day, queryset):
+    """
+    Fill in the missing bitmaps of the listings in `queryset` for `day` when no full refresh
+    has covered it (the cache was flushed, or the daily job is late).
+
+    The scheduled refresh_availability_bitmaps job is what fills the horizon; this fallback
+    only computes candidates that have a schedule for the weekday but no bitmap, and only one
+    request per day does it at a time; the others filter with the bitmaps already written.
+    """
+    if cache.get(COVERED_KEY.format(day.isoformat())):
+        return
+    scheduled = Availability.objects.filter(status=True, day=WEEKDAYS[day.weekday()]).values('listing_id')
+    missing = list(
+        queryset.filter(id__in=scheduled)
+        .exclude(id__in=AvailabilityBitmap.objects.filter(date=day).values('listing_id'))
+        .values_list('id', flat=True)
+    )
+    if not missing:
+        return
+    lock = FILL_LOCK_KEY.format(day.isoformat())
+    if not cache.add(lock, True, timeout=FILL_LOCK_TIMEOUT):
+        return
+    try:
+        refresh_bitmaps(missing, start=day, days=1)
+    finally:
+        cache.delete(lock)
+
+
+def filter_available(queryset, day, start_minute=0, end_minute=MINUTES_PER_DAY):
+    """
+    Narrow a Listing queryset to listings with a bookable slot overlapping
+    [start_minute, end_minute) on `day`.
+
+    The bitmaps of all candidates for that day are read in one query and tested against
+    the requested window with a single AND each; no schedule is evaluated at request time.
+    """
+    ensure_bitmaps(day, queryset)
+    mask = cell_mask(start_minute, end_minute)
+    rows = AvailabilityBitmap.objects.filter(date=day, listing__in=queryset.values('id')).values_list('listing_id', 'bits')
+    available = [listing_id for listing_id, bits in rows if int.from_bytes(bits, 'big') & mask]
+    return queryset.filter(id__in=available)
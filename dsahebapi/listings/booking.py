@@ -0,0 +1,143 @@
+from datetime import datetime
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Appointment, DayCounter, SlotCounter
+from .slots import compute_schedules, listing_schedule
+
+
+class BookingError(Exception):
+    pass
+
+
+def _slot_of(listing_id, day, start_time):
+    """
+    The (slot, max_in_day) of the schedule slot starting at `start_time` on `day`.
+    """
+    schedule = listing_schedule(listing_id, day, 1)[0]
+    start = start_time.strftime('%H:%M')
+    for slot in schedule["slots"]:
+        if slot["start"] == start:
+            return slot, schedule["max_in_day"]
+    raise BookingError("Slot not available")
+
+
+def _ensure_counters(listing_id, day, start_time, slot_capacity, day_capacity):
+    """
+    Create the slot and day counter rows on first use. Existing rows are left alone: their
+    capacity is kept in line with the schedule by sync_capacity() when it changes, so a
+    worker holding a stale schedule never overwrites it.
+    """
+    SlotCounter.objects.bulk_create(
+        [SlotCounter(listing_id=listing_id, date=day, start_time=start_time, capacity=slot_capacity)],
+        ignore_conflicts=True,
+    )
+    DayCounter.objects.bulk_create([DayCounter(listing_id=listing_id, date=day, capacity=day_capacity)], ignore_conflicts=True)
+
+
+def sync_capacity(listing_ids):
+    """
+    Set the capacity of the listings' counters from today on to their current schedule, after
+    an Availability/Unavailability change. A slot no longer in the schedule gets capacity 0.
+    `booked` is never touched; a capacity lowered below it just refuses new bookings.
+    """
+    today = timezone.localdate()
+    for listing_id in listing_ids:
+        slot_counters = list(SlotCounter.objects.filter(listing_id=listing_id, date__gte=today))
+        day_counters = list(DayCounter.objects.filter(listing_id=listing_id, date__gte=today))
+        dates = {counter.date for counter in slot_counters} | {counter.date for counter in day_counters}
+        if not dates:
+            continue
+        schedules = compute_schedules(listing_id, sorted(dates))
+        changed_slots = []
+        for counter in slot_counters:
+            capacities = {slot["start"]: slot["capacity"] for slot in schedules[counter.date]["slots"]}
+            capacity = capacities.get(counter.start_time.strftime('%H:%M'), 0)
+            if counter.capacity != capacity:
+                counter.capacity = capacity
+                changed_slots.append(counter)
+        changed_days = []
+        for counter in day_counters:
+            if counter.capacity != schedules[counter.date]["max_in_day"]:
+                counter.capacity = schedules[counter.date]["max_in_day"]
+                changed_days.append(counter)
+        SlotCounter.objects.bulk_update(changed_slots, ['capacity'], batch_size=500)
+        DayCounter.objects.bulk_update(changed_days, ['capacity'], batch_size=500)
+
+
+def book_appointment(listing_id, user, day, start_time):
+    """
+    Book one place in a slot, honouring both max_in_slot and max_in_day.
+
+    Capacity is taken with one conditional UPDATE per counter (booked < capacity), so only the
+    two counter rows are locked; they are always taken slot first, then day, and a full day
+    rolls back the slot increment with the rest of the transaction.
+    """
+    current = timezone.localtime()
+    if (day, start_time) <= (current.date(), current.time()):
+        raise BookingError("Slot has already started")
+    slot, max_in_day = _slot_of(listing_id, day, start_time)
+    _ensure_counters(listing_id, day, start_time, slot["capacity"], max_in_day)
+
+    with transaction.atomic():
+        taken = SlotCounter.objects.filter(
+            listing_id=listing_id, date=day, start_time=start_time, booked__lt=F('capacity'),
+        ).update(booked=F('booked') + 1)
+        if not taken:
+            raise BookingError("Slot is fully booked")
+        taken = DayCounter.objects.filter(
+            listing_id=listing_id, date=day, booked__lt=F('capacity'),
+        ).update(booked=F('booked') + 1)
+        if not taken:
+            raise BookingError("No more appointments available on this day")
+        return Appointment.objects.create(
+            listing_id=listing_id,
+            user=user,
+            date=day,
+            start_time=start_time,
+            end_time=datetime.strptime(slot["end"], '%H:%M').time(),
+        )
+
+
+def cancel_appointment(appointment):
+    """
+    Cancel a booked appointment and give its place back to the slot and day counters.
+    """
+    with transaction.atomic():
+        cancelled = Appointment.objects.filter(pk=appointment.pk, status='booked').update(status='cancelled')
+        if not cancelled:
+            raise BookingError("Appointment is already cancelled")
+        SlotCounter.objects.filter(
+            listing_id=appointment.listing_id, date=appointment.date, start_time=appointment.start_time, booked__gt=0,
+        ).update(booked=F('booked') - 1)
+        DayCounter.objects.filter(
+            listing_id=appointment.listing_id, date=appointment.date, booked__gt=0,
+        ).update(booked=F('booked') - 1)
+    appointment.status = 'cancelled'
+
+
+def with_bookings(listing_id, schedule):
+    """
+    Add the remaining places ("available") to each slot and day of a listing_schedule() result.
+    """
+    if not schedule:
+        return schedule
+    dates = [day["date"] for day in schedule]
+    booked_slots = {
+        (row['date'], row['start_time'].strftime('%H:%M')): row['booked']
+        for row in SlotCounter.objects.filter(listing_id=listing_id, date__range=(min(dates), max(dates)))
+        .values('date', 'start_time', 'booked')
+    }
+    booked_days = dict(
+        DayCounter.objects.filter(listing_id=listing_id, date__range=(min(dates), max(dates)))
+        .values_list('date', 'booked')
+    )
+    result = []
+    for day in schedule:
+        slots = [
+            {**slot, "available": max(0, slot["capacity"] - booked_slots.get((day["date"], slot["start"]), 0))}
+            for slot in day["slots"]
+        ]
+        available_in_day = max(0, day["max_in_day"] - booked_days.get(day["date"], 0))
+        result.append({**day, "slots": slots, "available_in_day": available_in_day})
+    return result
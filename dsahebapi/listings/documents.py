@@ -0,0 +1,118 @@
+from django.db import connection
+from django.db.models import Prefetch
+from .models import Listing, ListingDocument, Education, RegistrationList
+
+REBUILD_CHUNK_SIZE = 200
+
+
+def _named(obj):
+    return {"id": obj.id, "name": obj.name} if obj is not None else None
+
+
+def build_listing_document(listing):
+    """
+    Build the JSON read model of a listing loaded by `listings_for_documents`.
+    """
+    return {
+        "id": listing.id,
+        "user_id": listing.user_id,
+        "title": listing.title,
+        "slug": listing.slug,
+        "description": listing.description,
+        "contact_number": listing.contact_number,
+        "whatsapp_number": listing.whatsapp_number,
+        "email": listing.email,
+        "address": listing.address,
+        "map_link": listing.map_link,
+        "latitude": listing.latitude,
+        "longitude": listing.longitude,
+        "state": _named(listing.state),
+        "city": _named(listing.city),
+        "location": _named(listing.location),
+        "status": listing.status,
+        "online_verified": listing.online_verified,
+        "offline_verified": listing.offline_verified,
+        "claimed": listing.claimed,
+        "qna": listing.qna,
+        "experienceyear": listing.experienceyear,
+        "fee": listing.fee,
+        "profile_image": listing.profile_image.name or None,
+        "banner_image": listing.banner_image.name or None,
+        "video_link": listing.video_link,
+        "services": [_named(service) for service in listing.services.all()],
+        "specialization": [_named(specialization) for specialization in listing.specialization.all()],
+        "memberships": [_named(membership) for membership in listing.memberships.all()],
+        "education": [
+            {
+                "id": education.id,
+                "degree": _named(education.degree),
+                "college": _named(education.college),
+                "year": education.year,
+            }
+            for education in listing.education.all()
+        ],
+        "experience": [
+            {
+                "id": experience.id,
+                "title": experience.title,
+                "description": experience.description,
+                "start_date": experience.start_date,
+                "end_date": experience.end_date,
+                "ongoing": experience.ongoing,
+            }
+            for experience in listing.experience.all()
+        ],
+        "registration": [
+            {"id": registration.id, "name": _named(registration.name), "year": registration.year}
+            for registration in listing.registration.all()
+        ],
+        "created_at": listing.created_at,
+        "updated_at": listing.updated_at,
+    }
+
+
+def listings_for_documents():
+    """
+    Listing queryset that loads everything a document needs in a fixed number of queries.
+    """
+    return Listing.objects.select_related('state', 'city', 'location').prefetch_related(
+        'services',
+        'specialization',
+        'memberships',
+        'experience',
+        Prefetch('education', queryset=Education.objects.select_related('degree', 'college')),
+        Prefetch('registration', queryset=RegistrationList.objects.select_related('name')),
+    )
+
+
+def rebuild_listing_documents(listing_ids):
+    """
+    Rebuild (or drop, for listings that no longer exist) the documents of the given listings.
+    """
+    listing_ids = list(set(listing_ids))
+    for start in range(0, len(listing_ids), REBUILD_CHUNK_SIZE):
+        chunk = listing_ids[start:start + REBUILD_CHUNK_SIZE]
+        listings = listings_for_documents().filter(id__in=chunk)
+        documents = [ListingDocument(listing=listing, document=build_listing_document(listing)) for listing in listings]
+        ListingDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target.
+            unique_fields=['listing'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['document', 'updated_at'],
+        )
+        found = {document.listing_id for document in documents}
+        missing = [listing_id for listing_id in chunk if listing_id not in found]
+        if missing:
+            ListingDocument.objects.filter(listing_id__in=missing).delete()
+
+
+def get_listing_document(listing_id):
+    """
+    Return the document of a listing with one primary-key lookup, building it on a miss.
+    """
+    document = ListingDocument.objects.filter(pk=listing_id).values_list('document', flat=True).first()
+    if document is None:
+        rebuild_listing_documents([listing_id])
+        document = ListingDocument.objects.filter(pk=listing_id).values_list('document', flat=True).first()
+    return document
@@ -0,0 +1,229 @@
+import threading
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from config.utils.versioning import bump_version, get_version
+from .models import Listing
+
+VERSION_LABEL = 'listings.facets'
+HEAD_KEY = 'facets:{}:head'  # version -> sequence number of the last logged change
+CHANGE_KEY = 'facets:{}:{}'  # (version, sequence number) -> ids of the listings that changed
+CHANGE_TIMEOUT = 60 * 60
+MAX_CHANGES = 500  # A process further behind than this rebuilds instead
+
+# (label, lower bound inclusive, upper bound exclusive or None)
+FEE_BANDS = [
+    ('0-300', 0, 300),
+    ('300-500', 300, 500),
+    ('500-1000', 500, 1000),
+    ('1000+', 1000, None),
+]
+FACETS = ('city', 'specialization', 'service', 'fee_band', 'verification')
+
+
+def fee_band(fee):
+    for label, low, high in FEE_BANDS:
+        if fee >= low and (high is None or fee < high):
+            return label
+    return None
+
+
+def apply_facet_filters(queryset, filters):
+    """
+    Apply selected facet values (facet name -> value) to a Listing queryset.
+    """
+    if filters.get('city') is not None:
+        queryset = queryset.filter(city_id=filters['city'])
+    if filters.get('specialization') is not None:
+        queryset = queryset.filter(specialization=filters['specialization'])
+    if filters.get('service') is not None:
+        queryset = queryset.filter(services=filters['service'])
+    if filters.get('fee_band'):
+        bands = {label: (low, high) for label, low, high in FEE_BANDS}
+        low, high = bands.get(filters['fee_band'], (0, None))
+        queryset = queryset.filter(fee__gte=low)
+        if high is not None:
+            queryset = queryset.filter(fee__lt=high)
+    if filters.get('verification') == 'online':
+        queryset = queryset.filter(online_verified=True)
+    elif filters.get('verification') == 'offline':
+        queryset = queryset.filter(offline_verified=True)
+    return queryset
+
+
+class FacetIndex:
+    """
+    Per-process posting sets (facet -> value -> set of active listing ids).
+
+    Changes are shared through a log in the cache: after commit, the ids of the changed
+    listings are appended under the next sequence number of the current version. Every
+    process, the writer included, reads the entries it has not seen and re-reads only those
+    listings. A full rebuild happens only on the first read, after invalidate(), when the
+    process is more than MAX_CHANGES behind, or when an entry it needs has left the cache;
+    losing the head of the log bumps the version, so every process rebuilds once.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.seq = 0
+        self.postings = {facet: defaultdict(set) for facet in FACETS}
+        self.values = {}  # listing id -> {facet: set of values}
+        self.universe = set()
+
+    def _add(self, listing_id, values):
+        self.values[listing_id] = values
+        self.universe.add(listing_id)
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                self.postings[facet][value].add(listing_id)
+
+    def _remove(self, listing_id):
+        values = self.values.pop(listing_id, None)
+        self.universe.discard(listing_id)
+        if not values:
+            return
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                posting = self.postings[facet].get(value)
+                if posting is not None:
+                    posting.discard(listing_id)
+                    if not posting:
+                        del self.postings[facet][value]
+
+    @staticmethod
+    def _load(listing_ids=None):
+        listings = Listing.objects.filter(status=True)
+        specializations = Listing.specialization.through.objects.filter(listing__status=True)
+        services = Listing.services.through.objects.filter(listing__status=True)
+        if listing_ids is not None:
+            listings = listings.filter(id__in=listing_ids)
+            specializations = specializations.filter(listing_id__in=listing_ids)
+            services = services.filter(listing_id__in=listing_ids)
+
+        values = {}
+        for listing_id, city_id, fee, online, offline in listings.values_list(
+            'id', 'city_id', 'fee', 'online_verified', 'offline_verified'
+        ):
+            verification = set()
+            if online:
+                verification.add('online')
+            if offline:
+                verification.add('offline')
+            values[listing_id] = {
+                'city': {city_id},
+                'specialization': set(),
+                'service': set(),
+                'fee_band': {fee_band(fee)},
+                'verification': verification,
+            }
+        for listing_id, specialization_id in specializations.values_list('listing_id', 'specialization_id'):
+            if listing_id in values:
+                values[listing_id]['specialization'].add(specialization_id)
+        for listing_id, service_id in services.values_list('listing_id', 'services_id'):
+            if listing_id in values:
+                values[listing_id]['service'].add(service_id)
+        return values
+
+    def rebuild(self, version=None, head=None):
+        with self.lock:
+            if version is None:
+                version, head = self._log_head()
+            self.postings = {facet: defaultdict(set) for facet in FACETS}
+            self.values = {}
+            self.universe = set()
+            for listing_id, values in self._load().items():
+                self._add(listing_id, values)
+            self.version, self.seq = version, head
+
+    def _start_log(self):
+        """
+        Move to a new version with an empty change log; every process rebuilds on its next read.
+        """
+        version = bump_version(VERSION_LABEL)
+        cache.add(HEAD_KEY.format(version), 0, timeout=None)
+        return version
+
+    def _log_head(self):
+        version = get_version(VERSION_LABEL)
+        head = cache.get(HEAD_KEY.format(version))
+        if head is None:
+            version, head = self._start_log(), 0
+        return version, head
+
+    def ensure_current(self):
+        with self.lock:
+            version, head = self._log_head()
+            if version != self.version or head < self.seq or head - self.seq > MAX_CHANGES:
+                self.rebuild(version, head)
+                return
+            if head == self.seq:
+                return
+            keys = [CHANGE_KEY.format(version, seq) for seq in range(self.seq + 1, head + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) < len(keys):
+                self.rebuild(version, head)  # expired, or logged but not written yet
+                return
+            listing_ids = set().union(*changes.values())
+            loaded = self._load(listing_ids)
+            for listing_id in listing_ids:
+                self._remove(listing_id)
+                if listing_id in loaded:
+                    self._add(listing_id, loaded[listing_id])
+            self.seq = head
+
+    def refresh_listings(self, listing_ids):
+        """
+        Log that the given listings changed, once the transaction commits.
+        """
+        listing_ids = sorted(set(listing_ids))
+        transaction.on_commit(lambda: self._log_changes(listing_ids))
+
+    def _log_changes(self, listing_ids):
+        version = get_version(VERSION_LABEL)
+        try:
+            seq = cache.incr(HEAD_KEY.format(version))
+        except ValueError:
+            self._start_log()  # the log is gone: rebuilding covers this change too
+            return
+        cache.set(CHANGE_KEY.format(version, seq), listing_ids, CHANGE_TIMEOUT)
+
+    def invalidate(self):
+        transaction.on_commit(self._start_log)
+
+    def matching_ids(self, filters, exclude=None):
+        """
+        Listing ids matching every selected facet value, optionally ignoring one facet.
+        """
+        result = None
+        for facet, value in filters.items():
+            if facet == exclude or value is None or value == '':
+                continue
+            posting = self.postings[facet].get(value, set())
+            result = set(posting) if result is None else result & posting
+        return self.universe if result is None else result
+
+    def counts(self, candidate_ids=None, filters=None):
+        """
+        Count listings per facet value among the candidates.
+
+        Counts for a facet ignore that facet's own selection, so the UI can show how many
+        results picking another value of the same facet would give.
+        """
+        self.ensure_current()
+        filters = {facet: value for facet, value in (filters or {}).items() if facet in FACETS}
+        with self.lock:
+            base = self.universe if candidate_ids is None else self.universe & set(candidate_ids)
+            counts = {}
+            for facet in FACETS:
+                scope = base & self.matching_ids(filters, exclude=facet)
+                facet_counts = {}
+                for value, posting in self.postings[facet].items():
+                    size = len(posting & scope)  # Iterates over the smaller of the two sets
+                    if size:
+                        facet_counts[value] = size
+                counts[facet] = facet_counts
+            return counts
+
+
+facet_index = FacetIndex()
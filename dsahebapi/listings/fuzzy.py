@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import Listing, TrigramPosting, TrigramTerm
+from .search import tokenize
+
+PAD = '$'
+SIMILARITY_THRESHOLD = 0.35
+MAX_CANDIDATES = 200
+MIN_FUZZY_TERM_LENGTH = 4
+
+
+def trigrams(text):
+    """
+    Set of padded 3-character grams of each word, e.g. "skin" -> $$s, $sk, ski, kin, in$.
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f'{PAD}{PAD}{word}{PAD}'
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_term(kind, object_id, text):
+    """
+    Add or refresh one name in the trigram index; a no-op when the text is unchanged.
+    """
+    term = TrigramTerm.objects.filter(kind=kind, object_id=object_id).first()
+    if term is not None and term.text == text:
+        return
+    grams = trigrams(text)
+    with transaction.atomic():
+        if term is None:
+            term = TrigramTerm.objects.create(kind=kind, object_id=object_id, text=text, gram_count=len(grams))
+        else:
+            term.text, term.gram_count = text, len(grams)
+            term.save(update_fields=['text', 'gram_count'])
+            term.postings.all().delete()
+        TrigramPosting.objects.bulk_create([TrigramPosting(gram=gram, term=term) for gram in grams])
+
+
+def remove_term(kind, object_id):
+    TrigramTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def similar_terms(text, kinds, threshold=SIMILARITY_THRESHOLD, limit=10):
+    """
+    Return up to `limit` (similarity, TrigramTerm) pairs for names similar to `text`, best first.
+
+    Candidates come from the postings of the query's grams only, and the Jaccard bound
+    (a term needs at least threshold * |query| grams and at most |query| / threshold grams)
+    is pushed into the query so most of the index is never touched.
+    """
+    grams = trigrams(text)
+    if not grams:
+        return []
+    size = len(grams)
+    min_hits = max(1, int(threshold * size))
+    rows = (
+        TrigramPosting.objects.filter(
+            gram__in=grams,
+            term__kind__in=kinds,
+            term__gram_count__gte=int(threshold * size),
+            term__gram_count__lte=int(size / threshold) + 1,
+        )
+        .values('term_id')
+        .annotate(hits=Count('id'))
+        .filter(hits__gte=min_hits)
+        .order_by('-hits')[:MAX_CANDIDATES]
+    )
+    hits = {row['term_id']: row['hits'] for row in rows}
+    scored = []
+    for term in TrigramTerm.objects.filter(id__in=hits):
+        common = hits[term.id]
+        similarity = common / (size + term.gram_count - common)
+        if similarity >= threshold:
+            scored.append((similarity, term))
+    scored.sort(key=lambda pair: (-pair[0], pair[1].text))
+    return scored[:limit]
+
+
+def fuzzy_listings(queryset, query):
+    """
+    Typo-tolerant fallback for a search that found nothing.
+
+    Listing titles are matched against the whole query, and each longer query word against
+    specialization and service names. Returns the filtered queryset and the matched names.
+    """
+    matches = similar_terms(query, ['listing'])
+    for word in {word for word in tokenize(query) if len(word) >= MIN_FUZZY_TERM_LENGTH}:
+        matches.extend(similar_terms(word, ['specialization', 'service'], limit=3))
+    if not matches:
+        return queryset.none(), []
+
+    ids = {'listing': set(), 'specialization': set(), 'service': set()}
+    for _, term in matches:
+        ids[term.kind].add(term.object_id)
+    condition = Q(id__in=ids['listing'])
+    if ids['specialization']:
+        condition |= Q(id__in=Listing.objects.filter(specialization__in=ids['specialization']).values('id'))
+    if ids['service']:
+        condition |= Q(id__in=Listing.objects.filter(services__in=ids['service']).values('id'))
+    suggestions = []
+    for _, term in sorted(matches, key=lambda pair: -pair[0]):
+        if term.text not in suggestions:
+            suggestions.append(term.text)
+    return queryset.filter(condition), suggestions
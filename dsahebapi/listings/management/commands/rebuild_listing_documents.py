@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from listings.documents import REBUILD_CHUNK_SIZE, rebuild_listing_documents
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized listing documents served by the public listing endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('listing_ids', nargs='*', type=int, help="Only rebuild these listings.")
+
+    def handle(self, *args, **options):
+        listing_ids = options['listing_ids'] or Listing.objects.values_list('id', flat=True).iterator(chunk_size=REBUILD_CHUNK_SIZE)
+        batch, count = [], 0
+        for listing_id in listing_ids:
+            batch.append(listing_id)
+            if len(batch) == REBUILD_CHUNK_SIZE:
+                rebuild_listing_documents(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            rebuild_listing_documents(batch)
+            count += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} listing documents."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from listings.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute listing rating aggregates from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('listing_ids', nargs='*', type=int, help="Only repair these listings.")
+
+    def handle(self, *args, **options):
+        count = rebuild_ratings(options['listing_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {count} listings."))
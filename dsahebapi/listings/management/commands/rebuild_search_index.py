@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from listings.models import Listing
+from listings.search import reindex_listings
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Recompute Listing.search_tags from the linked names and rebuild the search token index."
+
+    def handle(self, *args, **options):
+        batch, count = [], 0
+        for listing_id in Listing.objects.values_list('id', flat=True).iterator(chunk_size=CHUNK_SIZE):
+            batch.append(listing_id)
+            if len(batch) == CHUNK_SIZE:
+                reindex_listings(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            reindex_listings(batch)
+            count += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} listings."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from config.models import Services, Specialization
+from listings.fuzzy import index_term
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Rebuild the trigram index used for typo-tolerant listing search."
+
+    def handle(self, *args, **options):
+        sources = [
+            ('listing', Listing.objects.values_list('id', 'title')),
+            ('specialization', Specialization.objects.values_list('id', 'name')),
+            ('service', Services.objects.values_list('id', 'name')),
+        ]
+        count = 0
+        for kind, rows in sources:
+            for object_id, text in rows.iterator(chunk_size=1000):
+                index_term(kind, object_id, text)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} names."))
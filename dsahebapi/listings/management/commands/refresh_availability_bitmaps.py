@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from listings.availability import refresh_bitmaps
+
+
+class Command(BaseCommand):
+    help = "Recompute the availability bitmaps for the rolling horizon (schedule daily to roll it forward)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('listing_ids', nargs='*', type=int, help="Only refresh these listings.")
+        parser.add_argument('--days', type=int, default=None, help="Days ahead to cover (default AVAILABILITY_HORIZON_DAYS).")
+
+    def handle(self, *args, **options):
+        count = refresh_bitmaps(options['listing_ids'] or None, days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} availability bitmaps."))
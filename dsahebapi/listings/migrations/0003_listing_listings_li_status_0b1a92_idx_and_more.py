@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0004_loginattempt'),
+        ('listings', '0002_listingsearchtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'title', 'id'], name='listings_li_status_0b1a92_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['created_by', 'title', 'id'], name='listings_li_created_cbd979_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['listing', 'created_at', 'id'], name='listings_re_listing_7d5292_idx'),
+        ),
+    ]
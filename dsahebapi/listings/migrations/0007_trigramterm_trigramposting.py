@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_listingrating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrigramTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('listing', 'Listing'), ('specialization', 'Specialization'), ('service', 'Service')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('text', models.CharField(max_length=255)),
+                ('gram_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'gram_count'], name='listings_tr_kind_b3c5b0_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='listings.trigramterm')),
+            ],
+            options={
+                'unique_together': {('gram', 'term')},
+            },
+        ),
+    ]
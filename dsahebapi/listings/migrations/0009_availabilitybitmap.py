@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_appointment_daycounter_slotcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('bits', models.BinaryField(max_length=36)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_bitmaps', to='listings.listing')),
+            ],
+            options={
+                'unique_together': {('listing', 'date')},
+            },
+        ),
+    ]
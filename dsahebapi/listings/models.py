@@ -5,6 +5,8 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.template.defaultfilters import slugify
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from config.utils.geo import grid_cell
 from config.models import CustomUser, State, City, Location, Services, Specialization, Degree, University, College, Memberships, Registration
 CustomUser = get_user_model()
 
@@ -89,6 +91,9 @@ class Experience(models.Model):
         ordering = ['title']
 
 
+SEARCH_TAG_FIELDS = {'title', 'state', 'state_id', 'city', 'city_id', 'location', 'location_id'}
+
+
 class Listing(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='listings')
     title = models.CharField(max_length=100)
@@ -99,6 +104,9 @@ class Listing(models.Model):
     state = models.ForeignKey(State, on_delete=models.DO_NOTHING, related_name='listings')
     location = models.ForeignKey(Location, on_delete=models.DO_NOTHING, related_name='listings')
     map_link = models.URLField(blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geo_cell = models.CharField(max_length=24, db_index=True, blank=True, null=True, editable=False)
     whatsapp_number = models.CharField(max_length=15, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     status = models.BooleanField(default=True)
@@ -137,19 +145,38 @@ class Listing(models.Model):
             if not self.banner_image.name.endswith(('jpg', 'jpeg', 'png')):
                 raise ValidationError('Banner image must be in JPG, JPEG, or PNG format.')
 
+    def build_search_tags(self):
+        """
+        Search text from the title and the current names of the linked services,
+        specializations, state, city and location.
+        """
+        # An unsaved listing has no services or specializations yet.
+        services = [service.name for service in self.services.all()] if self.pk else []
+        specializations = [spec.name for spec in self.specialization.all()] if self.pk else []
         search_terms = [
             self.title,
-            " ".join([service.name for service in self.services.all()]),
-            " ".join([spec.name for spec in self.specialization.all()]),
+            " ".join(services),
+            " ".join(specializations),
             str(self.state.name),
             str(self.city.name),
             str(self.location.name),
         ]
-        self.search_tags = " ".join(search_terms).lower()  # Join all terms and convert to lowercase
+        return " ".join(search_terms).lower()  # Join all terms and convert to lowercase
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        # Fall back to the coordinates of the listing's location when none are given
+        if (self.latitude is None or self.longitude is None) and self.location_id:
+            location = self.location
+            self.latitude, self.longitude = location.latitude, location.longitude
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        # Keep the search text in line with the title and place, however the listing is saved.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or SEARCH_TAG_FIELDS.intersection(update_fields):
+            self.search_tags = self.build_search_tags()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_tags'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -157,6 +184,69 @@ class Listing(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['status', 'title', 'id']),  # Keyset pagination of public listings
+            models.Index(fields=['created_by', 'title', 'id']),  # Keyset pagination of "my listings"
+        ]
+
+
+class ListingSearchToken(models.Model):
+    """
+    Inverted index entry: one row per (token, listing) built from Listing.search_tags.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.token} -> {self.listing_id}'
+
+    class Meta:
+        unique_together = ('token', 'listing')
+
+
+class ListingDocument(models.Model):
+    """
+    Denormalized read model of a listing with its related names, rebuilt whenever they change.
+    """
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    document = models.JSONField(encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Document for listing {self.listing_id}'
+
+
+class TrigramTerm(models.Model):
+    """
+    A searchable name (listing title, specialization or service) in the trigram index.
+    """
+    KIND_CHOICES = [
+        ('listing', 'Listing'),
+        ('specialization', 'Specialization'),
+        ('service', 'Service'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    text = models.CharField(max_length=255)
+    gram_count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.kind}: {self.text}'
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        indexes = [
+            models.Index(fields=['kind', 'gram_count']),
+        ]
+
+
+class TrigramPosting(models.Model):
+    gram = models.CharField(max_length=3)
+    term = models.ForeignKey(TrigramTerm, on_delete=models.CASCADE, related_name='postings')
+
+    class Meta:
+        unique_together = ('gram', 'term')
 
 
 class Availability(models.Model):
@@ -247,6 +337,98 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['listing', 'created_at', 'id']),  # Keyset pagination of a listing's reviews
+        ]
 
 
+class ListingRating(models.Model):
+    """
+    Running aggregate of a listing's published reviews, kept current by Review signals.
+    """
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+    average = models.FloatField(default=0, db_index=True)
+    last_review_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.average:.1f} ({self.review_count}) for listing {self.listing_id}'
+
 
+class SlotCounter(models.Model):
+    """
+    Booked vs. available capacity of one slot; taken with a conditional UPDATE, never COUNT.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='slot_counters')
+    date = models.DateField()
+    start_time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.listing_id} {self.date} {self.start_time}: {self.booked}/{self.capacity}'
+
+    class Meta:
+        unique_together = ('listing', 'date', 'start_time')
+
+
+class DayCounter(models.Model):
+    """
+    Booked vs. available capacity of a listing for a whole day (Availability.max_in_day).
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='day_counters')
+    date = models.DateField()
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.listing_id} {self.date}: {self.booked}/{self.capacity}'
+
+    class Meta:
+        unique_together = ('listing', 'date')
+
+
+class Appointment(models.Model):
+    STATUS_CHOICES = [
+        ('booked', 'Booked'),
+        ('cancelled', 'Cancelled'),
+    ]
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='appointments')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='appointments')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='booked')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.listing.title} - {self.date} {self.start_time}'
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['listing', 'date', 'start_time']),
+        ]
+
+
+class AvailabilityBitmap(models.Model):
+    """
+    One bit per 5-minute cell of a day (bit 0 = 00:00-00:05) that falls inside a bookable slot.
+    Precomputed for a rolling horizon; days without any slot have no row.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='availability_bitmaps')
+    date = models.DateField(db_index=True)
+    bits = models.BinaryField(max_length=36)
+
+    def __str__(self):
+        return f'{self.listing_id} {self.date}'
+
+    class Meta:
+        unique_together = ('listing', 'date')
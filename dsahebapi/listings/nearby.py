@@ -0,0 +1,48 @@
+from config.utils.geo import CELL_SIZE_DEG, KM_PER_DEGREE_LAT, cells_within, haversine_distances
+from .models import Listing
+from .ratings import with_rating
+
+MAX_RADIUS_KM = 50
+
+
+def _candidates(queryset, latitude, longitude, radius_km):
+    """
+    Exact (distance_km, listing_id) pairs for listings within radius_km, nearest first.
+    Candidates are pruned by grid cell in the database before any distance is computed.
+    """
+    rows = list(
+        queryset.filter(geo_cell__in=cells_within(latitude, longitude, radius_km))
+        .values_list('id', 'latitude', 'longitude')
+    )
+    distances = haversine_distances(latitude, longitude, [(lat, lng) for _, lat, lng in rows])
+    matches = [(distance, row[0]) for distance, row in zip(distances, rows) if distance <= radius_km]
+    matches.sort()
+    return matches
+
+
+def nearby_listings(latitude, longitude, radius_km=None, limit=20, queryset=None):
+    """
+    Return up to `limit` (listing, distance_km) pairs ordered by distance.
+
+    With a radius, every listing within it is considered; radii above MAX_RADIUS_KM raise
+    ValueError. Without one, the search ring grows from a single cell until `limit` listings
+    are found or MAX_RADIUS_KM is reached (nearest-K).
+    """
+    if queryset is None:
+        queryset = Listing.objects.filter(status=True)
+
+    if radius_km is not None:
+        if radius_km > MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be at most {MAX_RADIUS_KM}")
+        matches = _candidates(queryset, latitude, longitude, radius_km)
+    else:
+        radius = CELL_SIZE_DEG * KM_PER_DEGREE_LAT
+        while True:
+            matches = _candidates(queryset, latitude, longitude, radius)
+            if len(matches) >= limit or radius >= MAX_RADIUS_KM:
+                break
+            radius = min(radius * 2, MAX_RADIUS_KM)
+
+    matches = matches[:limit]
+    listings = with_rating(Listing.objects.all()).in_bulk([listing_id for _, listing_id in matches])
+    return [(listings[listing_id], distance) for distance, listing_id in matches if listing_id in listings]
@@ -0,0 +1,97 @@
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from .models import ListingRating, Review
+
+STARS = range(1, 6)
+
+
+def with_rating(queryset):
+    """
+    Annotate a Listing queryset with `rating_average` and `rating_count` from ListingRating.
+    """
+    return queryset.annotate(
+        rating_average=Coalesce('rating__average', Value(0.0), output_field=FloatField()),
+        rating_count=Coalesce('rating__review_count', Value(0), output_field=IntegerField()),
+    )
+
+
+def apply_review_change(listing_id, old=None, new=None):
+    """
+    Move one review's contribution in the listing aggregate.
+    `old` and `new` are the (rating, created_at) of the published review before and after the
+    change, or None when it was not / is no longer counted.
+    """
+    if old == new:
+        return
+    changes = {}
+
+    def add(field, amount):
+        changes[field] = changes.get(field, 0) + amount
+
+    if old is not None:
+        add('review_count', -1)
+        add('rating_total', -old[0])
+        add(f'star_{old[0]}', -1)
+    if new is not None:
+        add('review_count', 1)
+        add('rating_total', new[0])
+        add(f'star_{new[0]}', 1)
+
+    with transaction.atomic():
+        ListingRating.objects.get_or_create(listing_id=listing_id)
+        rows = ListingRating.objects.filter(listing_id=listing_id)
+        updates = {field: F(field) + amount for field, amount in changes.items() if amount}
+        if updates:
+            rows.update(**updates)
+        # Computed in a second statement: MySQL evaluates SET left to right, other backends don't.
+        rows.update(average=Case(
+            When(review_count__gt=0, then=F('rating_total') * 1.0 / F('review_count')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+        if new is not None and old is None:
+            rows.filter(Q(last_review_at__isnull=True) | Q(last_review_at__lt=new[1])).update(last_review_at=new[1])
+        elif old is not None and new is None:
+            latest = Review.objects.filter(listing_id=listing_id, status=True).aggregate(latest=Max('created_at'))['latest']
+            rows.update(last_review_at=latest)
+
+
+def rebuild_ratings(listing_ids=None):
+    """
+    Recompute the aggregates from the Review table in bulk. Returns the number of rows written.
+    """
+    reviews = Review.objects.filter(status=True)
+    if listing_ids is not None:
+        reviews = reviews.filter(listing_id__in=listing_ids)
+    aggregates = reviews.values('listing_id').annotate(
+        review_count=Count('id'),
+        rating_total=Sum('rating'),
+        last_review_at=Max('created_at'),
+        **{f'star_{star}': Count('id', filter=Q(rating=star)) for star in STARS},
+    ).order_by()
+
+    ratings = [
+        ListingRating(
+            listing_id=row['listing_id'],
+            review_count=row['review_count'],
+            rating_total=row['rating_total'],
+            average=row['rating_total'] / row['review_count'],
+            last_review_at=row['last_review_at'],
+            **{f'star_{star}': row[f'star_{star}'] for star in STARS},
+        )
+        for row in aggregates
+    ]
+    fields = ['review_count', 'rating_total', 'average', 'last_review_at'] + [f'star_{star}' for star in STARS]
+    with transaction.atomic():
+        # Reset first so listings whose reviews are all gone end up at zero.
+        scope = ListingRating.objects.all() if listing_ids is None else ListingRating.objects.filter(listing_id__in=listing_ids)
+        scope.update(average=0, last_review_at=None, review_count=0, rating_total=0, **{f'star_{star}': 0 for star in STARS})
+        ListingRating.objects.bulk_create(
+            ratings,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['listing'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=fields,
+        )
+    return len(ratings)
@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models import Q
+from .availability import refresh_bitmaps
+from .booking import sync_capacity
+from .models import Availability, Listing
+from .search_cache import search_cache
+from .slots import WEEKDAYS, invalidate_slots
+
+WINDOW_FIELDS = [('start_time', 'end_time'), ('start_time2', 'end_time2'), ('start_time3', 'end_time3')]
+SCHEDULE_FIELDS = [field for window in WINDOW_FIELDS for field in window] + ['slot_time', 'max_in_slot', 'max_in_day', 'status']
+SLOT_TIMES = {value for value, _ in Availability.SLOT_TIME_CHOICES}
+BATCH_SIZE = 500
+
+
+def entry_errors(entry):
+    """
+    Validation errors of one weekly schedule entry, checked in memory.
+    Unlike Availability.clean, every pair of windows is checked for overlap.
+    """
+    errors = []
+    if entry['day'] not in WEEKDAYS:
+        errors.append(f"Invalid day '{entry['day']}'.")
+    if entry['slot_time'] not in SLOT_TIMES:
+        errors.append(f"Invalid slot_time '{entry['slot_time']}'.")
+    if entry['max_in_slot'] < 1 or entry['max_in_day'] < 1:
+        errors.append("max_in_slot and max_in_day must be positive.")
+
+    windows = []
+    for number, (start_field, end_field) in enumerate(WINDOW_FIELDS, start=1):
+        start, end = entry[start_field], entry[end_field]
+        if start is None and end is None and number > 1:
+            continue
+        if start is None or end is None:
+            errors.append(f"Slot {number} needs both a start and an end time.")
+        elif start >= end:
+            errors.append(f"Slot {number} start time must be before its end time.")
+        else:
+            windows.append((start, end, number))
+    windows.sort()
+    for (_, end, number), (start, _, next_number) in zip(windows, windows[1:]):
+        if start < end:
+            errors.append(f"Slot {next_number} overlaps with slot {number}.")
+    return errors
+
+
+def bulk_upsert_schedules(user, entries):
+    """
+    Create or update the weekly Availability of many listings at once.
+
+    `entries` are dicts with listing_id, day and the SCHEDULE_FIELDS. Every entry is validated
+    first; if any fails nothing is written and (None, errors) is returned, one error item per
+    failing entry. Otherwise all rows are written with bulk_create / bulk_update in one
+    transaction: the first existing row of a (listing, day) is updated, any further duplicates
+    are switched off. Returns ({"created", "updated"}, []).
+    """
+    listing_ids = {entry['listing_id'] for entry in entries}
+    allowed = set(
+        Listing.objects.filter(Q(created_by=user) | Q(user=user), id__in=listing_ids).values_list('id', flat=True)
+    )
+
+    errors = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        entry['day'] = entry['day'].upper()
+        problems = entry_errors(entry)
+        if entry['listing_id'] not in allowed:
+            problems.insert(0, "Listing not found.")
+        key = (entry['listing_id'], entry['day'])
+        if key in seen:
+            problems.append("Duplicate entry for this listing and day.")
+        seen.add(key)
+        if problems:
+            errors.append({"index": index, "listing_id": entry['listing_id'], "day": entry['day'], "errors": problems})
+    if errors:
+        return None, errors
+
+    existing = {}
+    switched_off = []
+    for availability in Availability.objects.filter(
+        listing_id__in=listing_ids, day__in={day for _, day in seen},
+    ).order_by('id'):
+        key = (availability.listing_id, availability.day)
+        if key not in seen:
+            continue
+        if key in existing:
+            availability.status = False
+            switched_off.append(availability)
+        else:
+            existing[key] = availability
+
+    to_create, to_update = [], []
+    for entry in entries:
+        values = {field: entry[field] for field in SCHEDULE_FIELDS}
+        availability = existing.get((entry['listing_id'], entry['day']))
+        if availability is None:
+            to_create.append(Availability(listing_id=entry['listing_id'], day=entry['day'], **values))
+        else:
+            for field, value in values.items():
+                setattr(availability, field, value)
+            to_update.append(availability)
+
+    # Bulk writes send no signals: refresh what the Availability receivers would have.
+    with transaction.atomic():
+        Availability.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Availability.objects.bulk_update(to_update, SCHEDULE_FIELDS, batch_size=BATCH_SIZE)
+        Availability.objects.bulk_update(switched_off, ['status'], batch_size=BATCH_SIZE)
+        transaction.on_commit(lambda: schedules_changed(listing_ids))
+    return {"created": len(to_create), "updated": len(to_update)}, []
+
+
+def schedules_changed(listing_ids):
+    for listing_id in listing_ids:
+        invalidate_slots(listing_id)
+    sync_capacity(listing_ids)
+    refresh_bitmaps(listing_ids)
+    search_cache.invalidate({'availability'})
@@ -0,0 +1,120 @@
+import re
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from .models import Listing, ListingSearchToken
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+MAX_TOKEN_LENGTH = 64
+MIN_PREFIX_LENGTH = 2
+MAX_QUERY_TERMS = 6
+TITLE_WEIGHT = 3  # Extra weight for tokens that appear in the listing title
+EXACT_MATCH_BONUS = 2  # Extra score when a query term matches a whole token
+
+
+def tokenize(text):
+    """
+    Split text into lowercase alphanumeric tokens.
+    """
+    if not text:
+        return []
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(text.lower())]
+
+
+def query_terms(query):
+    """
+    Normalize a search query into unique prefix terms, in order of appearance.
+    """
+    terms = []
+    for term in tokenize(query):
+        if len(term) >= MIN_PREFIX_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def listing_token_weights(listing):
+    """
+    Compute token -> weight for a listing from its search tags (or title if tags are empty).
+    """
+    weights = Counter(token for token in tokenize(listing.search_tags or listing.title) if len(token) >= MIN_PREFIX_LENGTH)
+    for token in set(tokenize(listing.title)):
+        if token in weights:
+            weights[token] += TITLE_WEIGHT
+    return weights
+
+
+def index_listing(listing):
+    """
+    Bring the inverted index rows of a listing in line with its current search tags.
+    Only the tokens that changed are written. Returns the tokens before and after the change.
+    """
+    weights = listing_token_weights(listing)
+    existing = {row.token: row for row in ListingSearchToken.objects.filter(listing_id=listing.pk)}
+
+    stale_ids = [row.id for token, row in existing.items() if token not in weights]
+    to_create = [
+        ListingSearchToken(listing_id=listing.pk, token=token, weight=weight)
+        for token, weight in weights.items() if token not in existing
+    ]
+    to_update = []
+    for token, row in existing.items():
+        if token in weights and row.weight != weights[token]:
+            row.weight = weights[token]
+            to_update.append(row)
+
+    with transaction.atomic():
+        if stale_ids:
+            ListingSearchToken.objects.filter(id__in=stale_ids).delete()
+        if to_create:
+            ListingSearchToken.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            ListingSearchToken.objects.bulk_update(to_update, ['weight'])
+    return set(existing) | set(weights)
+
+
+def reindex_listings(listing_ids):
+    """
+    Rebuild the search tags of listings from the current names of what they link to, then
+    their index rows. Used when a linked service, specialization or place is renamed or
+    removed. Returns {listing_id: tokens before and after the change}.
+    """
+    listings = list(
+        Listing.objects.filter(id__in=set(listing_ids))
+        .select_related('state', 'city', 'location')
+        .prefetch_related('services', 'specialization')
+    )
+    changed = []
+    for listing in listings:
+        search_tags = listing.build_search_tags()
+        if search_tags != listing.search_tags:
+            listing.search_tags = search_tags
+            changed.append(listing)
+    Listing.objects.bulk_update(changed, ['search_tags'], batch_size=500)
+    return {listing.pk: index_listing(listing) for listing in listings}
+
+
+def search_listings(queryset, query):
+    """
+    Filter a Listing queryset to the listings whose tokens match every term of the query
+    (prefix match, AND semantics), annotated with a `search_score` and ordered by it.
+    Returns the queryset untouched when the query has no usable terms.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset
+
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(search_tokens__token__startswith=term)
+
+    # Filtering before annotating makes the aggregates run over the matched tokens only.
+    queryset = queryset.filter(any_term).annotate(
+        search_score=Sum('search_tokens__weight')
+        + Count('search_tokens', filter=Q(search_tokens__token__in=terms)) * EXACT_MATCH_BONUS,
+        **{
+            f'term_{i}_hits': Count('search_tokens', filter=Q(search_tokens__token__startswith=term))
+            for i, term in enumerate(terms)
+        },
+    )
+    queryset = queryset.filter(**{f'term_{i}_hits__gt': 0 for i in range(len(terms))})
+    return queryset.order_by('-search_score', 'id')
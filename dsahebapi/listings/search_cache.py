@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from .search import MIN_PREFIX_LENGTH, tokenize
+
+
+def term_tags(tokens):
+    """
+    Tags of every query term that would prefix-match one of `tokens`.
+    """
+    tags = set()
+    for token in tokens:
+        for end in range(MIN_PREFIX_LENGTH, len(token) + 1):
+            tags.add(f'term:{token[:end]}')
+    return tags
+
+
+class SearchCache:
+    """
+    Bounded LRU of search responses with a TTL, invalidated precisely through dependency tags.
+
+    Every entry is tagged with what its result depends on: its query terms, its facet filters,
+    the listings on its page, "all" when it has no terms (it matches every listing), "facets"
+    when it carries facet counts, "availability" when it is filtered by availability and "rating"
+    when it is sorted by rating.
+    A change invalidates only the entries sharing one of its tags. The TTL bounds staleness
+    for changes made by other processes.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or getattr(settings, 'SEARCH_CACHE_MAX_ENTRIES', 2048)
+        self.ttl = ttl or getattr(settings, 'SEARCH_CACHE_TTL', 10)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.tagged = defaultdict(set)  # tag -> keys
+
+    @staticmethod
+    def make_key(terms, filters, **params):
+        return (
+            tuple(sorted(terms)),
+            tuple(sorted((name, value) for name, value in filters.items() if value not in (None, ''))),
+            tuple(sorted(params.items())),
+        )
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags):
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self.tagged[tag].add(key)
+            while len(self.entries) > self.max_entries:
+                self._discard(next(iter(self.entries)))
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged[tag]
+
+    def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tagged.get(tag, ())):
+                    self._discard(key)
+
+    def invalidate_listing(self, listing_id, tokens=(), facet_values=()):
+        """
+        Drop entries a listing change can affect: `tokens` are the listing's search tokens before
+        and after the change, `facet_values` any (facet, value) pairs it gained or lost.
+        """
+        tags = {'all', 'facets', f'listing:{listing_id}'} | term_tags(tokens)
+        tags.update(f'{facet}:{value}' for facet, value in facet_values)
+        self.invalidate(tags)
+
+    def invalidate_names(self, *names):
+        """
+        Drop entries whose terms match a renamed service, specialization or place.
+        """
+        tokens = set()
+        for name in names:
+            tokens.update(tokenize(name))
+        self.invalidate(term_tags(tokens))
+
+    def invalidate_rating(self, listing_id):
+        """
+        Drop entries showing a listing whose rating changed, and every rating-sorted entry.
+        """
+        self.invalidate({'rating', f'listing:{listing_id}'})
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tagged.clear()
+
+
+def response_tags(terms, filters, listing_ids, facets=False, availability=False, rating=False):
+    tags = {f'term:{term}' for term in terms} if terms else {'all'}
+    tags.update(f'{facet}:{value}' for facet, value in filters.items() if value not in (None, ''))
+    tags.update(f'listing:{listing_id}' for listing_id in listing_ids)
+    if facets:
+        tags.add('facets')
+    if availability:
+        tags.add('availability')
+    if rating:
+        tags.add('rating')
+    return tags
+
+
+search_cache = SearchCache()
@@ -1,8 +1,8 @@
 # serializers.py
 from ninja import Schema
 from pydantic import Field
-from typing import Optional
-from datetime import date
+from typing import List, Optional
+from datetime import date, datetime, time
 
 class ListingSerializer(Schema):
     id: int
@@ -23,6 +23,24 @@ class ListingSerializer(Schema):
         from_attributes = True
         arbitrary_types_allowed = True
 
+class ListingCardSchema(Schema):
+    id: int
+    title: str
+    slug: Optional[str]
+    fee: int
+    experienceyear: int
+    state_id: int
+    city_id: int
+    location_id: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    online_verified: bool
+    offline_verified: bool
+    claimed: bool
+    rating_average: float = 0
+    rating_count: int = 0
+
+
 class ListingCreateSerializer(Schema):
     title: str
     description: str
@@ -44,8 +62,8 @@ class EducationSchema(Schema):
     college_id: Optional[int]
     year: int
     status: bool
-    created_at: date
-    updated_at: date
+    created_at: datetime
+    updated_at: datetime
 
 
 # Training Schema
@@ -56,8 +74,8 @@ class TrainingSchema(Schema):
     college_id: Optional[int]
     year: int
     status: bool
-    created_at: date
-    updated_at: date
+    created_at: datetime
+    updated_at: datetime
 
 
 # Registration List Schema
@@ -79,8 +97,8 @@ class ExperienceSchema(Schema):
     end_date: Optional[date]
     ongoing: bool
     status: bool
-    created_at: date
-    updated_at: date
+    created_at: datetime
+    updated_at: datetime
 
 
 # Review Schema
@@ -91,5 +109,43 @@ class ReviewSchema(Schema):
     rating: int
     comment: Optional[str]
     status: bool
-    created_at: date
-    updated_at: date
\ No newline at end of file
+    created_at: datetime
+    updated_at: datetime
+
+
+# Appointment Schemas
+class AppointmentCreateSchema(Schema):
+    listing_id: int
+    date: date
+    start_time: time
+
+
+class AppointmentSchema(Schema):
+    id: int
+    listing_id: int
+    user_id: int
+    date: date
+    start_time: time
+    end_time: time
+    status: str
+    created_at: datetime
+
+
+# Bulk weekly schedule Schemas
+class ScheduleEntrySchema(Schema):
+    listing_id: int
+    day: str
+    start_time: time
+    end_time: time
+    start_time2: Optional[time] = None
+    end_time2: Optional[time] = None
+    start_time3: Optional[time] = None
+    end_time3: Optional[time] = None
+    slot_time: str = '15'
+    max_in_slot: int = 10
+    max_in_day: int = 50
+    status: bool = True
+
+
+class BulkScheduleSchema(Schema):
+    entries: List[ScheduleEntrySchema]
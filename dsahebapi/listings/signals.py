@@ -0,0 +1,340 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from config.utils.autocomplete import autocomplete_index
+from config.models import State, City, Location, Services, Specialization, Memberships, Degree, College, Registration
+from .models import Listing, Education, Experience, RegistrationList, Review, Availability, Unavailability
+from .documents import rebuild_listing_documents
+from .facets import facet_index
+from .fuzzy import index_term, remove_term
+from .ratings import apply_review_change
+from .schedules import schedules_changed
+from .search import index_listing, reindex_listings
+from .search_cache import search_cache
+from .slots import invalidate_slots
+
+
+@receiver(post_save, sender=Listing)
+def update_search_index(sender, instance, **kwargs):
+    tokens = index_listing(instance)
+    search_cache.invalidate_listing(instance.pk, tokens)
+
+
+@receiver(post_delete, sender=Listing)
+def invalidate_search_cache(sender, instance, **kwargs):
+    search_cache.invalidate_listing(instance.pk)
+
+
+@receiver(m2m_changed, sender=Listing.specialization.through)
+@receiver(m2m_changed, sender=Listing.services.through)
+def invalidate_search_cache_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    field, facet = ('specialization', 'specialization') if sender is Listing.specialization.through else ('services', 'service')
+    if action == 'pre_clear':
+        # pk_set is not provided on clear, so remember what is about to be removed.
+        related = instance.listings if reverse else getattr(instance, field)
+        instance._search_cache_cleared = set(related.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_search_cache_cleared', set())
+    if not reverse:
+        search_cache.invalidate_listing(instance.pk, facet_values=[(facet, value) for value in pk_set])
+    else:
+        search_cache.invalidate({f'{facet}:{instance.pk}'})
+        for listing_id in pk_set:
+            search_cache.invalidate_listing(listing_id)
+
+
+@receiver(pre_save, sender=Services)
+@receiver(pre_save, sender=Specialization)
+@receiver(pre_save, sender=State)
+@receiver(pre_save, sender=City)
+@receiver(pre_save, sender=Location)
+def invalidate_search_cache_names(sender, instance, **kwargs):
+    previous = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first() if instance.pk else None
+    instance._search_name_changed = previous is not None and previous != instance.name
+    if previous != instance.name:
+        search_cache.invalidate_names(previous or '', instance.name)
+
+
+def reindex_search(listing_ids):
+    for listing_id, tokens in reindex_listings(listing_ids).items():
+        search_cache.invalidate_listing(listing_id, tokens)
+
+
+@receiver(m2m_changed, sender=Listing.specialization.through)
+@receiver(m2m_changed, sender=Listing.services.through)
+def update_search_index_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        listing_ids = [instance.pk]
+    elif action == 'post_clear':
+        listing_ids = list(getattr(instance, '_search_cache_cleared', set()))
+    else:
+        listing_ids = list(pk_set)
+    transaction.on_commit(lambda: reindex_search(listing_ids))
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def update_facet_index(sender, instance, **kwargs):
+    facet_index.refresh_listings([instance.pk])
+
+
+@receiver(m2m_changed, sender=Listing.specialization.through)
+@receiver(m2m_changed, sender=Listing.services.through)
+def update_facet_index_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        facet_index.refresh_listings([instance.pk])
+    elif pk_set:
+        facet_index.refresh_listings(pk_set)
+    else:
+        # A specialization/service was cleared from every listing: rebuild everywhere.
+        facet_index.invalidate()
+
+
+# Autocomplete ranks reference names by how many listings/educations use them.
+AUTOCOMPLETE_LINKS = {Listing: ('city', 'location'), Education: ('degree', 'college')}
+
+
+@receiver(pre_save, sender=Listing)
+@receiver(pre_save, sender=Education)
+def remember_autocomplete_links(sender, instance, **kwargs):
+    fields = [f'{name}_id' for name in AUTOCOMPLETE_LINKS[sender]]
+    instance._autocomplete_links = sender.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+
+
+@receiver(pre_delete, sender=Listing)
+def remember_autocomplete_m2m(sender, instance, **kwargs):
+    # The through rows go with the listing without m2m_changed.
+    instance._autocomplete_m2m = {
+        'service': list(instance.services.values_list('id', flat=True)),
+        'specialization': list(instance.specialization.values_list('id', flat=True)),
+    }
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_save, sender=Education)
+@receiver(post_delete, sender=Listing)
+@receiver(post_delete, sender=Education)
+def update_autocomplete_popularity(sender, instance, signal, **kwargs):
+    previous = getattr(instance, '_autocomplete_links', None) if signal is post_save else None
+    for name in AUTOCOMPLETE_LINKS[sender]:
+        old, new = (previous or {}).get(f'{name}_id'), getattr(instance, f'{name}_id')
+        if previous is None or old != new:
+            autocomplete_index.changed(name, [old, new])
+    for kind, ids in getattr(instance, '_autocomplete_m2m', {}).items():
+        autocomplete_index.changed(kind, ids)
+
+
+@receiver(m2m_changed, sender=Listing.specialization.through)
+@receiver(m2m_changed, sender=Listing.services.through)
+def update_autocomplete_popularity_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    kind = 'specialization' if sender is Listing.specialization.through else 'service'
+    if reverse:
+        autocomplete_index.changed(kind, [instance.pk])
+    elif action == 'post_clear':
+        autocomplete_index.changed(kind, getattr(instance, '_search_cache_cleared', set()))
+    else:
+        autocomplete_index.changed(kind, pk_set)
+
+
+@receiver(pre_save, sender=Location)
+def remember_location_coordinates(sender, instance, **kwargs):
+    instance._coordinates_before = (
+        Location.objects.filter(pk=instance.pk).values_list('latitude', 'longitude').first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Location)
+def move_inheriting_listings(sender, instance, **kwargs):
+    # Listings saved without coordinates copied the location's; those still at the old point
+    # (including any pinned exactly there) move along with it.
+    previous = getattr(instance, '_coordinates_before', None)
+    if previous is None or previous == (instance.latitude, instance.longitude):
+        return
+    latitude, longitude = previous
+    listings = Listing.objects.filter(location=instance)
+    listings = listings.filter(latitude__isnull=True) if latitude is None else listings.filter(latitude=latitude)
+    listings = listings.filter(longitude__isnull=True) if longitude is None else listings.filter(longitude=longitude)
+    listing_ids = list(listings.values_list('id', flat=True))
+    if not listing_ids:
+        return
+    Listing.objects.filter(id__in=listing_ids).update(
+        latitude=instance.latitude, longitude=instance.longitude, geo_cell=instance.geo_cell,
+    )
+    transaction.on_commit(lambda: rebuild_listing_documents(listing_ids))
+
+
+# Listing documents: everything a document embeds, mapped to the listings that embed it.
+DOCUMENT_DEPENDENCIES = {
+    State: lambda instance: Listing.objects.filter(state=instance),
+    City: lambda instance: Listing.objects.filter(city=instance),
+    Location: lambda instance: Listing.objects.filter(location=instance),
+    Services: lambda instance: Listing.objects.filter(services=instance),
+    Specialization: lambda instance: Listing.objects.filter(specialization=instance),
+    Memberships: lambda instance: Listing.objects.filter(memberships=instance),
+    Degree: lambda instance: Listing.objects.filter(education__degree=instance),
+    College: lambda instance: Listing.objects.filter(education__college=instance),
+    Registration: lambda instance: Listing.objects.filter(registration__name=instance),
+    Education: lambda instance: Listing.objects.filter(education=instance),
+    Experience: lambda instance: Listing.objects.filter(experience=instance),
+    RegistrationList: lambda instance: Listing.objects.filter(registration=instance),
+}
+DOCUMENT_M2M_THROUGH = [
+    Listing.services.through,
+    Listing.specialization.through,
+    Listing.education.through,
+    Listing.memberships.through,
+    Listing.experience.through,
+    Listing.registration.through,
+]
+
+
+@receiver(post_save, sender=Listing)
+def update_listing_document(sender, instance, **kwargs):
+    rebuild_listing_documents([instance.pk])
+
+
+def update_dependent_documents(sender, instance, **kwargs):
+    listing_ids = list(DOCUMENT_DEPENDENCIES[sender](instance).values_list('id', flat=True))
+    transaction.on_commit(lambda: rebuild_listing_documents(listing_ids))
+
+
+def remember_dependent_documents(sender, instance, **kwargs):
+    # M2M rows are gone by post_delete, so find the listings while they are still linked.
+    instance._document_listing_ids = list(DOCUMENT_DEPENDENCIES[sender](instance).values_list('id', flat=True))
+
+
+def update_documents_on_delete(sender, instance, **kwargs):
+    listing_ids = getattr(instance, '_document_listing_ids', [])
+    transaction.on_commit(lambda: rebuild_listing_documents(listing_ids))
+
+
+def update_documents_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            rebuild_listing_documents([instance.pk])
+        return
+    # Reverse side: instance is e.g. a Services row and pk_set holds listing ids.
+    if action == 'pre_clear':
+        instance._cleared_listing_ids = list(instance.listings.values_list('id', flat=True))
+    elif action == 'post_clear':
+        rebuild_listing_documents(getattr(instance, '_cleared_listing_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        rebuild_listing_documents(pk_set)
+
+
+for model in DOCUMENT_DEPENDENCIES:
+    post_save.connect(update_dependent_documents, sender=model, dispatch_uid=f'listing_document_{model.__name__}')
+    pre_delete.connect(remember_dependent_documents, sender=model, dispatch_uid=f'listing_document_pre_delete_{model.__name__}')
+    post_delete.connect(update_documents_on_delete, sender=model, dispatch_uid=f'listing_document_delete_{model.__name__}')
+for through in DOCUMENT_M2M_THROUGH:
+    m2m_changed.connect(update_documents_m2m, sender=through, dispatch_uid=f'listing_document_m2m_{through.__name__}')
+
+
+# Search tags embed these names (Listing.build_search_tags).
+SEARCH_DEPENDENCIES = {model: DOCUMENT_DEPENDENCIES[model] for model in (State, City, Location, Services, Specialization)}
+
+
+def update_dependent_search_index(sender, instance, created=False, **kwargs):
+    if created or not getattr(instance, '_search_name_changed', False):
+        return
+    listing_ids = list(SEARCH_DEPENDENCIES[sender](instance).values_list('id', flat=True))
+    transaction.on_commit(lambda: reindex_search(listing_ids))
+
+
+def remember_dependent_search_listings(sender, instance, **kwargs):
+    instance._search_listing_ids = list(SEARCH_DEPENDENCIES[sender](instance).values_list('id', flat=True))
+
+
+def update_search_index_on_delete(sender, instance, **kwargs):
+    listing_ids = getattr(instance, '_search_listing_ids', [])
+    transaction.on_commit(lambda: reindex_search(listing_ids))
+
+
+for model in SEARCH_DEPENDENCIES:
+    post_save.connect(update_dependent_search_index, sender=model, dispatch_uid=f'listing_search_{model.__name__}')
+    pre_delete.connect(remember_dependent_search_listings, sender=model, dispatch_uid=f'listing_search_pre_delete_{model.__name__}')
+    post_delete.connect(update_search_index_on_delete, sender=model, dispatch_uid=f'listing_search_delete_{model.__name__}')
+
+
+def _counted(review):
+    """
+    The contribution of a review to its listing's rating, or None if it is not published.
+    """
+    return (review.rating, review.created_at) if review.status else None
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    instance._rating_before = None
+    if instance.pk:
+        instance._rating_before = Review.objects.filter(pk=instance.pk).values(
+            'listing_id', 'rating', 'status', 'created_at'
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_rating_before', None)
+    old = (previous['rating'], previous['created_at']) if previous and previous['status'] else None
+    if previous and previous['listing_id'] != instance.listing_id:
+        apply_review_change(previous['listing_id'], old=old)
+        search_cache.invalidate_rating(previous['listing_id'])
+        old = None
+    new = _counted(instance)
+    apply_review_change(instance.listing_id, old=old, new=new)
+    if old != new:
+        search_cache.invalidate_rating(instance.listing_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, origin=None, **kwargs):
+    # Reviews deleted along with their listing: the aggregate row goes with it.
+    if isinstance(origin, Listing) or getattr(origin, 'model', None) is Listing:
+        return
+    apply_review_change(instance.listing_id, old=_counted(instance))
+    search_cache.invalidate_rating(instance.listing_id)
+
+
+TRIGRAM_SOURCES = {
+    Listing: ('listing', 'title'),
+    Specialization: ('specialization', 'name'),
+    Services: ('service', 'name'),
+}
+
+
+def update_trigram_index(sender, instance, **kwargs):
+    kind, field = TRIGRAM_SOURCES[sender]
+    index_term(kind, instance.pk, getattr(instance, field))
+
+
+def remove_from_trigram_index(sender, instance, **kwargs):
+    kind, _ = TRIGRAM_SOURCES[sender]
+    remove_term(kind, instance.pk)
+
+
+for model in TRIGRAM_SOURCES:
+    post_save.connect(update_trigram_index, sender=model, dispatch_uid=f'trigram_{model.__name__}')
+    post_delete.connect(remove_from_trigram_index, sender=model, dispatch_uid=f'trigram_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+@receiver(post_save, sender=Unavailability)
+@receiver(post_delete, sender=Unavailability)
+def invalidate_listing_slots(sender, instance, **kwargs):
+    # After commit, so no worker caches the old rows under the new version.
+    listing_id = instance.listing_id
+    if isinstance(kwargs.get('origin'), Listing):
+        # The listing's bitmaps are deleted along with it.
+        transaction.on_commit(lambda: invalidate_slots(listing_id))
+        return
+    transaction.on_commit(lambda: schedules_changed([listing_id]))
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from django.core.cache import cache
+from config.utils.versioning import bump_version, get_version
+from .models import Availability, Unavailability
+
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+MINUTES_PER_DAY = 24 * 60
+MAX_RANGE_DAYS = 31
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def version_label(listing_id):
+    return f'slots:{listing_id}'
+
+
+def invalidate_slots(listing_id):
+    """
+    Drop every cached day of a listing (the cache keys embed the listing's version).
+    """
+    bump_version(version_label(listing_id))
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _format(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def availability_windows(availability):
+    """
+    The (start, end) minute ranges of the up to three time windows of an Availability row.
+    """
+    windows = []
+    for start, end in (
+        (availability.start_time, availability.end_time),
+        (availability.start_time2, availability.end_time2),
+        (availability.start_time3, availability.end_time3),
+    ):
+        if start and end and start < end:
+            windows.append((_minutes(start), _minutes(end)))
+    return windows
+
+
+def blackout_interval(unavailability):
+    """
+    The (start, end) minute range an Unavailability row blocks; all day when no times are set.
+    """
+    if unavailability.allday or not (unavailability.start_time and unavailability.end_time):
+        return (0, MINUTES_PER_DAY)
+    return (_minutes(unavailability.start_time), _minutes(unavailability.end_time))
+
+
+def day_schedule(availabilities, blackouts):
+    """
+    Bookable slots of one day from its Availability rows and blackout (start, end) minute ranges.
+    Slots are laid out from each window start and dropped if they overlap a blackout.
+    """
+    slots = []
+    max_in_day = 0
+    for availability in availabilities:
+        step = int(availability.slot_time)
+        max_in_day += availability.max_in_day
+        for start, end in availability_windows(availability):
+            for minute in range(start, end - step + 1, step):
+                if any(block_start < minute + step and block_end > minute for block_start, block_end in blackouts):
+                    continue
+                slots.append({"start": _format(minute), "end": _format(minute + step), "capacity": availability.max_in_slot})
+    slots.sort(key=lambda slot: slot["start"])
+    return {"slots": slots, "max_in_day": max_in_day}
+
+
+def compute_schedules(listing_id, dates):
+    """
+    Schedules for the given dates with two queries: weekly availability and blackouts in range.
+    """
+    by_weekday = {}
+    for availability in Availability.objects.filter(listing_id=listing_id, status=True):
+        by_weekday.setdefault(availability.day, []).append(availability)
+
+    blackouts = {}
+    for unavailability in Unavailability.objects.filter(
+        listing_id=listing_id, status=True, dateofunavailability__range=(min(dates), max(dates)),
+    ):
+        blackouts.setdefault(unavailability.dateofunavailability, []).append(blackout_interval(unavailability))
+
+    return {
+        day: day_schedule(by_weekday.get(WEEKDAYS[day.weekday()], []), blackouts.get(day, []))
+        for day in dates
+    }
+
+
+def listing_schedule(listing_id, start_date, days):
+    """
+    Return [{"date", "slots", "max_in_day"}] for `days` days from `start_date`.
+    Each (listing, date) is kept in the shared cache under the listing's version stamp, so
+    every worker sees an invalidation at once; only the missing days are computed.
+    """
+    days = max(1, min(days, MAX_RANGE_DAYS))
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    version = get_version(version_label(listing_id))
+    keys = {day: f'slots:{listing_id}:{version}:{day.isoformat()}' for day in dates}
+
+    cached = cache.get_many(keys.values())
+    missing = [day for day in dates if keys[day] not in cached]
+    if missing:
+        computed = compute_schedules(listing_id, missing)
+        cache.set_many({keys[day]: schedule for day, schedule in computed.items()}, CACHE_TIMEOUT)
+        cached.update({keys[day]: schedule for day, schedule in computed.items()})
+
+    return [{"date": day, **cached[keys[day]]} for day in dates]
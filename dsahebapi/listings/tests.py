@@ -1,3 +1,718 @@
-from django.test import TestCase
+import io
+import threading
+from unittest import mock
+from datetime import date, time, timedelta
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from config.models import CustomUser, State, City, Location, Services, Specialization
+from config.utils.autocomplete import AutocompleteIndex
+from config.utils.geo import grid_cell
+from config.utils.versioning import get_version
+from .availability import FILL_LOCK_KEY, cell_mask, filter_available, refresh_bitmaps
+from .booking import BookingError, book_appointment, cancel_appointment
+from .documents import get_listing_document
+from .facets import FacetIndex
+from .fuzzy import fuzzy_listings, index_term, trigrams
+from .models import (
+    Appointment, Availability, AvailabilityBitmap, DayCounter, Experience, Listing, ListingRating, ListingSearchToken, Review,
+    SlotCounter, TrigramTerm, Unavailability,
+)
+from .nearby import nearby_listings
+from .ratings import STARS, rebuild_ratings
+from .schedules import bulk_upsert_schedules
+from .search import search_listings
+from .search_cache import SearchCache, search_cache
+from .slots import MAX_RANGE_DAYS, WEEKDAYS, blackout_interval, day_schedule, listing_schedule, version_label
 
-# Create your tests here.
+
+def make_listing(title, user, location, **extra):
+    return Listing.objects.create(
+        user=user, title=title, slug=title.lower().replace(' ', '-'), description=title,
+        contact_number='9000000000', state=location.cities.state, city=location.cities,
+        location=location, **{'experienceyear': 5, 'fee': 500, **extra},
+    )
+
+
+class ListingFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(mobile='9000000000', name='Doctor', usertype='doctor')
+        state = State.objects.create(name='Maharashtra', status='1')
+        city = City.objects.create(name='Pune', state=state)
+        cls.location = Location.objects.create(name='Kothrud', cities=city, latitude=18.5074, longitude=73.8077)
+
+
+class NearbyListingTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        # Kothrud, Shivajinagar (~5 km), Hinjewadi (~12 km), Mumbai (~120 km)
+        self.kothrud = make_listing('Kothrud Clinic', self.user, self.location, latitude=18.5074, longitude=73.8077)
+        self.shivajinagar = make_listing('Shivajinagar Clinic', self.user, self.location, latitude=18.5308, longitude=73.8475)
+        self.hinjewadi = make_listing('Hinjewadi Clinic', self.user, self.location, latitude=18.5913, longitude=73.7389)
+        self.mumbai = make_listing('Mumbai Clinic', self.user, self.location, latitude=19.0760, longitude=72.8777)
+
+    def test_grid_cell_is_stored_on_save(self):
+        self.assertEqual(self.kothrud.geo_cell, grid_cell(18.5074, 73.8077))
+
+    def test_listing_inherits_location_coordinates(self):
+        listing = make_listing('Location Only Clinic', self.user, self.location)
+        self.assertEqual((listing.latitude, listing.longitude), (18.5074, 73.8077))
+        self.assertEqual(listing.geo_cell, self.location.geo_cell)
+
+    def test_inherited_coordinates_follow_the_location(self):
+        listing = make_listing('Location Only Clinic', self.user, self.location)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.latitude, self.location.longitude = 18.5204, 73.8567
+            self.location.save()
+        listing.refresh_from_db()
+        self.assertEqual((listing.latitude, listing.longitude, listing.geo_cell), (18.5204, 73.8567, grid_cell(18.5204, 73.8567)))
+        self.assertEqual(get_listing_document(listing.id)['latitude'], 18.5204)
+        self.shivajinagar.refresh_from_db()
+        self.assertEqual((self.shivajinagar.latitude, self.shivajinagar.longitude), (18.5308, 73.8475))
+
+    def test_radius_search_orders_by_distance(self):
+        results = nearby_listings(18.5074, 73.8077, radius_km=15)
+        self.assertEqual([listing for listing, _ in results], [self.kothrud, self.shivajinagar, self.hinjewadi])
+        self.assertAlmostEqual(results[1][1], 4.9, delta=0.3)
+
+    def test_radius_excludes_listings_outside_circle(self):
+        results = nearby_listings(18.5074, 73.8077, radius_km=6)
+        self.assertEqual([listing for listing, _ in results], [self.kothrud, self.shivajinagar])
+
+    def test_nearest_k_grows_search_ring(self):
+        results = nearby_listings(18.5074, 73.8077, limit=3)
+        self.assertEqual([listing for listing, _ in results], [self.kothrud, self.shivajinagar, self.hinjewadi])
+
+    def test_radius_above_the_cap_is_rejected(self):
+        response = self.client.get('/api/listing/listings/nearby', {'lat': 18.5, 'lng': 73.8, 'radius_km': 51})
+        self.assertEqual(response.status_code, 422)
+        with self.assertRaises(ValueError):
+            nearby_listings(18.5, 73.8, radius_km=51)
+
+    def test_nearby_endpoint(self):
+        response = self.client.get('/api/listing/listings/nearby', {'lat': 18.5308, 'lng': 73.8475, 'radius_km': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['data']], [self.shivajinagar.id])
+
+
+class SearchIndexDependencyTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        self.service = Services.objects.create(name='Dental')
+        self.listing = make_listing('Smile Clinic', self.user, self.location)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.services.add(self.service)
+
+    def found(self, query):
+        return list(search_listings(Listing.objects.all(), query).values_list('id', flat=True)) == [self.listing.id]
+
+    def test_linked_names_are_indexed(self):
+        # make_listing saves without full_clean(), so the place names come from save() itself.
+        self.assertTrue(self.found('dental kothrud'))
+        self.assertTrue(self.found('smile pune'))
+
+    def test_rename_reindexes(self):
+        city = self.location.cities
+        with self.captureOnCommitCallbacks(execute=True):
+            city.name = 'Poona'
+            city.save()
+            self.service.name = 'Orthodontics'
+            self.service.save()
+        self.assertTrue(self.found('poona ortho'))
+        self.assertFalse(self.found('pune'))
+        self.assertFalse(self.found('dental'))
+
+    def test_delete_reindexes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+        self.assertFalse(self.found('dental'))
+        self.assertTrue(self.found('smile'))
+
+    def test_place_change_reindexes(self):
+        nagpur = City.objects.create(name='Nagpur', state=self.location.cities.state)
+        self.listing.city = nagpur
+        self.listing.save()
+        self.assertTrue(self.found('smile nagpur'))
+        self.assertFalse(self.found('pune'))
+
+    def test_rebuild_command_recomputes_tags(self):
+        Listing.objects.filter(id=self.listing.id).update(search_tags='smile clinic')
+        ListingSearchToken.objects.filter(listing=self.listing).delete()
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertTrue(self.found('dental pune'))
+
+    def test_unrelated_saves_do_not_reindex(self):
+        with mock.patch('listings.signals.reindex_listings') as reindex, self.captureOnCommitCallbacks(execute=True):
+            self.service.description = 'Teeth'
+            self.service.save()
+        reindex.assert_not_called()
+
+
+class SearchCacheTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        search_cache.clear()
+        self.smile = make_listing('Smile Clinic', self.user, self.location)
+        self.heart = make_listing('Heart Clinic', self.user, self.location)
+
+    def titles(self, query):
+        response = self.client.get('/api/listing/listings', {'query': query})
+        return [row['title'] for row in response.json()['data']]
+
+    def test_only_tagged_entries_are_invalidated(self):
+        self.assertEqual(self.titles('smile'), ['Smile Clinic'])
+        self.assertEqual(self.titles('heart'), ['Heart Clinic'])
+        # Raw updates send no signals, so cached pages keep the old titles.
+        Listing.objects.update(title='Renamed')
+        self.assertEqual(self.titles('smile'), ['Smile Clinic'])
+        self.heart.title = 'Heart Care'
+        self.heart.save()
+        self.assertEqual(self.titles('heart'), ['Heart Care'])
+        self.assertEqual(self.titles('smile'), ['Smile Clinic'])
+
+    def test_new_listing_invalidates_matching_terms(self):
+        self.assertEqual(self.titles('smi'), ['Smile Clinic'])
+        make_listing('Smiley Dental', self.user, self.location)
+        self.assertEqual(sorted(self.titles('smi')), ['Smile Clinic', 'Smiley Dental'])
+
+    def test_name_and_facet_changes_invalidate(self):
+        results = SearchCache(max_entries=10, ttl=60)
+        results.set('pune', 1, {'term:pun'})
+        results.set('kothrud', 2, {'term:kothrud'})
+        results.set('dental', 3, {'service:7'})
+        results.set('slots', 4, {'availability'})
+        results.invalidate_names('Pune')
+        results.invalidate_listing(99, facet_values=[('service', 7)])
+        self.assertEqual([results.get(key) for key in ('pune', 'kothrud', 'dental', 'slots')], [None, 2, None, 4])
+        results.invalidate({'availability'})
+        self.assertIsNone(results.get('slots'))
+
+    def test_entries_expire_and_stay_bounded(self):
+        results = SearchCache(max_entries=2, ttl=10)
+        with mock.patch('listings.search_cache.time.monotonic', return_value=100):
+            for key in ('a', 'b', 'c'):
+                results.set(key, key, {f'term:{key}'})
+            self.assertEqual([results.get(key) for key in ('a', 'b', 'c')], [None, 'b', 'c'])
+            self.assertNotIn('term:a', results.tagged)
+        with mock.patch('listings.search_cache.time.monotonic', return_value=111):
+            self.assertIsNone(results.get('b'))
+        self.assertNotIn('term:b', results.tagged)
+
+
+class TypoSearchTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        search_cache.clear()
+        self.specialization = Specialization.objects.create(name='Dermatology')
+        self.skin = make_listing('Radiant Skin Clinic', self.user, self.location)
+        self.bones = make_listing('Sunrise Orthopedic Centre', self.user, self.location)
+        self.skin.specialization.add(self.specialization)
+
+    def fuzzy(self, query):
+        listings, suggestions = fuzzy_listings(Listing.objects.all(), query)
+        return sorted(listings.values_list('id', flat=True)), suggestions
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('Skin'), {'$$s', '$sk', 'ski', 'kin', 'in$'})
+
+    def test_misspelled_title_and_specialization(self):
+        self.assertEqual(self.fuzzy('sunrise orthopedik'), ([self.bones.id], ['Sunrise Orthopedic Centre']))
+        self.assertEqual(self.fuzzy('dermatolgy'), ([self.skin.id], ['Dermatology']))
+        self.assertEqual(self.fuzzy('xyzzy'), ([], []))
+
+    def test_endpoint_falls_back_only_without_exact_matches(self):
+        response = self.client.get('/api/listing/listings', {'query': 'dermatolgy'}).json()
+        self.assertEqual(([row['id'] for row in response['data']], response['suggestions']), ([self.skin.id], ['Dermatology']))
+        response = self.client.get('/api/listing/listings', {'query': 'sunrise'}).json()
+        self.assertEqual([row['id'] for row in response['data']], [self.bones.id])
+        self.assertNotIn('suggestions', response)
+
+    def test_renames_and_deletes_reach_the_index(self):
+        self.specialization.name = 'Cardiology'
+        self.specialization.save()
+        self.assertEqual(self.fuzzy('dermatolgy'), ([], []))
+        self.assertEqual(self.fuzzy('cardiolgy'), ([self.skin.id], ['Cardiology']))
+        self.bones.delete()
+        self.assertFalse(TrigramTerm.objects.filter(kind='listing', object_id=self.bones.id).exists())
+        self.assertEqual(self.fuzzy('sunrise orthopedik'), ([], []))
+
+    def test_unchanged_text_is_not_reindexed(self):
+        with self.assertNumQueries(1):
+            index_term('listing', self.skin.id, self.skin.title)
+
+
+class AutocompletePopularityTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dental = Services.objects.create(name='Dental')
+        self.derma = Services.objects.create(name='Dermatology')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing = make_listing('Smile Clinic', self.user, self.location)
+            self.listing.services.add(self.derma)
+        self.index = AutocompleteIndex()
+
+    def ranked(self, prefix):
+        return [entry['name'] for entry in self.index.suggest(prefix)]
+
+    def test_links_move_popularity(self):
+        self.assertEqual(self.ranked('de'), ['Dermatology', 'Dental'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.services.set([self.dental])
+        self.assertEqual(self.ranked('de'), ['Dental', 'Dermatology'])
+        nagpur = City.objects.create(name='Nagpur', state=self.location.cities.state)
+        self.assertEqual(self.ranked('pune'), ['Pune'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.city = nagpur
+            self.listing.save()
+        self.assertEqual([entry['popularity'] for entry in self.index.suggest('nagpur')], [1])
+        self.assertEqual([entry['popularity'] for entry in self.index.suggest('pune')], [0])
+
+    def test_listing_delete_releases_its_links(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.delete()
+        self.assertEqual([entry['popularity'] for entry in self.index.suggest('derma')], [0])
+
+
+class FacetIndexTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cheap = make_listing('Cheap Clinic', self.user, self.location, fee=200)
+        self.dear = make_listing('Dear Clinic', self.user, self.location, fee=700)
+        # Two processes' indexes, both built before the change
+        self.writer, self.reader = FacetIndex(), FacetIndex()
+        self.writer.counts()
+        self.reader.counts()
+
+    def change_fee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dear.fee = 1500
+            self.dear.save()
+
+    def test_changes_reach_other_processes_as_deltas(self):
+        self.change_fee()
+        with mock.patch.object(self.reader, 'rebuild', side_effect=AssertionError("rebuilt")):
+            with self.assertNumQueries(3):  # the changed listing, its specializations and services
+                counts = self.reader.counts()
+        self.assertEqual(counts['fee_band'], {'0-300': 1, '1000+': 1})
+        self.assertEqual(self.writer.counts()['fee_band'], {'0-300': 1, '1000+': 1})
+
+    def test_m2m_changes_are_logged(self):
+        specialization = Specialization.objects.create(name='Cardiology')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.specialization.add(specialization)
+        self.assertEqual(self.reader.counts()['specialization'], {specialization.id: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            specialization.listings.clear()
+        self.assertEqual(self.reader.counts()['specialization'], {})
+
+    def test_lost_change_rebuilds(self):
+        self.change_fee()
+        cache.delete(f'facets:{self.reader.version}:{self.reader.seq + 1}')
+        self.assertEqual(self.reader.counts()['fee_band'], {'0-300': 1, '1000+': 1})
+
+    def test_lost_log_rebuilds_everywhere(self):
+        version = self.reader.version
+        cache.clear()
+        self.change_fee()
+        self.assertEqual(self.reader.counts()['fee_band'], {'0-300': 1, '1000+': 1})
+        self.assertNotEqual(self.reader.version, version)
+
+    def test_rolled_back_change_is_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.dear.save()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.reader.seq, cache.get(f'facets:{self.reader.version}:head'))
+
+
+class ListingDocumentTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        self.service = Services.objects.create(name='Dental')
+        self.experience = Experience.objects.create(user=self.user, title='Resident')
+        self.listing = make_listing('Document Clinic', self.user, self.location)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.services.add(self.service)
+            self.listing.experience.add(self.experience)
+
+    def document(self):
+        return get_listing_document(self.listing.id)
+
+    def test_dependency_rename_refreshes_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.service.name = 'Dentistry'
+            self.service.save()
+        self.assertEqual(self.document()['services'][0]['name'], 'Dental')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.document()['services'][0]['name'], 'Dentistry')
+
+    def test_dependency_delete_refreshes(self):
+        self.assertEqual(len(self.document()['experience']), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+            self.experience.delete()
+        document = self.document()
+        self.assertEqual((document['services'], document['experience']), ([], []))
+
+
+class RatingAggregateTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        self.listing = make_listing('Rated Clinic', self.user, self.location)
+        self.other = make_listing('Other Clinic', self.user, self.location)
+
+    def review(self, rating, listing=None, **extra):
+        return Review.objects.create(user=self.user, listing=listing or self.listing, rating=rating, **extra)
+
+    def aggregate(self, listing=None):
+        rating = ListingRating.objects.get(listing=listing or self.listing)
+        return rating.review_count, rating.rating_total, rating.average, [getattr(rating, f'star_{star}') for star in STARS]
+
+    def test_create_and_edit(self):
+        self.review(5)
+        review = self.review(2)
+        self.assertEqual(self.aggregate(), (2, 7, 3.5, [0, 1, 0, 0, 1]))
+        review.rating = 4
+        review.save()
+        self.assertEqual(self.aggregate(), (2, 9, 4.5, [0, 0, 0, 1, 1]))
+        review.comment = 'Edited'
+        review.save()
+        self.assertEqual(self.aggregate(), (2, 9, 4.5, [0, 0, 0, 1, 1]))
+
+    def test_unpublished_reviews_are_not_counted(self):
+        self.review(5)
+        review = self.review(1, status=False)
+        self.assertEqual(self.aggregate(), (1, 5, 5.0, [0, 0, 0, 0, 1]))
+        review.status = True
+        review.save()
+        self.assertEqual(self.aggregate(), (2, 6, 3.0, [1, 0, 0, 0, 1]))
+        review.status = False
+        review.save()
+        self.assertEqual(self.aggregate(), (1, 5, 5.0, [0, 0, 0, 0, 1]))
+
+    def test_delete(self):
+        first = self.review(3)
+        second = self.review(5)
+        second.delete()
+        rating = ListingRating.objects.get(listing=self.listing)
+        self.assertEqual(self.aggregate(), (1, 3, 3.0, [0, 0, 1, 0, 0]))
+        self.assertEqual(rating.last_review_at, first.created_at)
+        first.delete()
+        self.assertEqual(self.aggregate(), (0, 0, 0.0, [0, 0, 0, 0, 0]))
+        self.assertIsNone(ListingRating.objects.get(listing=self.listing).last_review_at)
+
+    def test_moving_a_review_updates_both_listings(self):
+        review = self.review(4)
+        review.listing = self.other
+        review.save()
+        self.assertEqual(self.aggregate(), (0, 0, 0.0, [0, 0, 0, 0, 0]))
+        self.assertEqual(self.aggregate(self.other), (1, 4, 4.0, [0, 0, 0, 1, 0]))
+
+    def test_incremental_matches_rebuild(self):
+        reviews = [self.review(rating) for rating in (1, 4, 5, 2)]
+        reviews.append(self.review(3, listing=self.other))
+        reviews[1].rating = 2
+        reviews[1].save()
+        reviews[2].delete()
+        reviews[3].status = False
+        reviews[3].save()
+        incremental = [self.aggregate(), self.aggregate(self.other)]
+        rebuild_ratings()
+        self.assertEqual([self.aggregate(), self.aggregate(self.other)], incremental)
+
+    def test_sort_by_rating_follows_reviews(self):
+        search_cache.clear()
+        self.review(3)
+        review = self.review(5, listing=self.other)
+
+        def ranked():
+            response = self.client.get('/api/listing/listings', {'sort': 'rating'})
+            return [(row['id'], row['rating_average']) for row in response.json()['data']]
+
+        self.assertEqual(ranked(), [(self.other.id, 5.0), (self.listing.id, 3.0)])
+        review.rating = 1
+        review.save()
+        self.assertEqual(ranked(), [(self.listing.id, 3.0), (self.other.id, 1.0)])
+        review.delete()
+        self.assertEqual(ranked(), [(self.listing.id, 3.0), (self.other.id, 0.0)])
+
+
+class AppointmentBookingTests(TransactionTestCase):
+    """
+    The threaded tests check that capacity is never oversold. They do not measure throughput
+    or lock waits: SQLite serializes every writer, so those depend on the production database.
+    """
+    THREADS = 24
+
+    def setUp(self):
+        state = State.objects.create(name='Maharashtra', status='1')
+        city = City.objects.create(name='Pune', state=state)
+        location = Location.objects.create(name='Kothrud', cities=city, latitude=18.5074, longitude=73.8077)
+        self.doctor = CustomUser.objects.create(mobile='9000000000', name='Doctor', usertype='doctor')
+        self.listing = make_listing('Booking Clinic', self.doctor, location)
+        self.day = date.today() + timedelta(days=1)
+        Availability.objects.create(
+            listing=self.listing, day=WEEKDAYS[self.day.weekday()], start_time=time(10), end_time=time(11),
+            slot_time='30', max_in_slot=5, max_in_day=8,
+        )
+        # bulk_create skips the OTP signal sent for new patients
+        CustomUser.objects.bulk_create([
+            CustomUser(mobile=f'91000000{number:02d}', name=f'Patient {number}', usertype='patient')
+            for number in range(self.THREADS)
+        ])
+        self.patients = list(CustomUser.objects.filter(usertype='patient'))
+
+    def book_concurrently(self, start_time):
+        booked, rejected, errors = [], [], []
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(patient):
+            try:
+                barrier.wait()
+                booked.append(book_appointment(self.listing.id, patient, self.day, start_time))
+            except BookingError:
+                rejected.append(patient)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(patient,)) for patient in self.patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return booked, rejected
+
+    def test_concurrent_bookings_never_exceed_slot_capacity(self):
+        booked, rejected = self.book_concurrently(time(10))
+        self.assertEqual(len(booked), 5)
+        self.assertEqual(len(rejected), self.THREADS - 5)
+        self.assertEqual(Appointment.objects.filter(start_time=time(10)).count(), 5)
+        self.assertEqual(SlotCounter.objects.get(start_time=time(10)).booked, 5)
+
+    def test_concurrent_bookings_never_exceed_day_capacity(self):
+        self.book_concurrently(time(10))
+        booked, _ = self.book_concurrently(time(10, 30))
+        self.assertEqual(len(booked), 3)
+        self.assertEqual(Appointment.objects.filter(date=self.day).count(), 8)
+        self.assertEqual(DayCounter.objects.get(date=self.day).booked, 8)
+        self.assertEqual(SlotCounter.objects.get(start_time=time(10, 30)).booked, 3)
+
+    def test_cancel_releases_capacity(self):
+        booked, _ = self.book_concurrently(time(10))
+        cancel_appointment(booked[0])
+        self.assertEqual(SlotCounter.objects.get(start_time=time(10)).booked, 4)
+        self.assertEqual(DayCounter.objects.get(date=self.day).booked, 4)
+        book_appointment(self.listing.id, self.patients[0], self.day, time(10))
+        with self.assertRaises(BookingError):
+            cancel_appointment(booked[0])
+
+    def test_capacity_follows_availability_changes(self):
+        book_appointment(self.listing.id, self.patients[0], self.day, time(10))
+        availability = Availability.objects.get()
+        availability.max_in_slot = 1
+        availability.save()
+        with self.assertRaises(BookingError):
+            book_appointment(self.listing.id, self.patients[1], self.day, time(10))
+
+        entry = {
+            'listing_id': self.listing.id, 'day': WEEKDAYS[self.day.weekday()], 'start_time': time(10), 'end_time': time(11),
+            'start_time2': None, 'end_time2': None, 'start_time3': None, 'end_time3': None,
+            'slot_time': '30', 'max_in_slot': 3, 'max_in_day': 8, 'status': True,
+        }
+        bulk_upsert_schedules(self.doctor, [entry])
+        book_appointment(self.listing.id, self.patients[1], self.day, time(10))
+        book_appointment(self.listing.id, self.patients[2], self.day, time(10))
+        self.assertEqual(SlotCounter.objects.values_list('capacity', 'booked').get(), (3, 3))
+
+    def test_bookings_do_not_overwrite_capacity(self):
+        book_appointment(self.listing.id, self.patients[0], self.day, time(10))
+        Availability.objects.update(max_in_slot=1)  # no signal: the capacity stays at 5
+        with mock.patch('listings.booking._slot_of', return_value=({'start': '10:00', 'end': '10:30', 'capacity': 1}, 8)):
+            book_appointment(self.listing.id, self.patients[1], self.day, time(10))
+        self.assertEqual(SlotCounter.objects.values_list('capacity', 'booked').get(), (5, 2))
+
+    def test_slots_leaving_the_schedule_close(self):
+        book_appointment(self.listing.id, self.patients[0], self.day, time(10))
+        availability = Availability.objects.get()
+        availability.start_time = time(14)
+        availability.end_time = time(15)
+        availability.save()
+        self.assertEqual(SlotCounter.objects.values_list('capacity', 'booked').get(), (0, 1))
+
+    def test_past_slots_are_rejected(self):
+        yesterday = self.day - timedelta(days=2)
+        Availability.objects.create(
+            listing=self.listing, day=WEEKDAYS[yesterday.weekday()], start_time=time(10), end_time=time(11),
+            slot_time='30', max_in_slot=5, max_in_day=8,
+        )
+        with self.assertRaisesMessage(BookingError, "Slot has already started"):
+            book_appointment(self.listing.id, self.patients[0], yesterday, time(10))
+        self.assertFalse(SlotCounter.objects.exists())
+
+    def test_unknown_slot_is_rejected(self):
+        with self.assertRaises(BookingError):
+            book_appointment(self.listing.id, self.patients[0], self.day, time(10, 15))
+
+
+class SlotEngineTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.listing = make_listing('Slot Clinic', self.user, self.location)
+        self.day = date.today() + timedelta(days=1)
+        self.availability = Availability.objects.create(
+            listing=self.listing, day=WEEKDAYS[self.day.weekday()], start_time=time(9), end_time=time(10, 30),
+            start_time2=time(17), end_time2=time(18), slot_time='30', max_in_slot=2, max_in_day=6,
+        )
+
+    def starts(self, day=None):
+        return [slot['start'] for slot in listing_schedule(self.listing.id, day or self.day, 1)[0]['slots']]
+
+    def test_windows_are_cut_into_slots(self):
+        self.assertEqual(self.starts(), ['09:00', '09:30', '10:00', '17:00', '17:30'])
+        schedule = listing_schedule(self.listing.id, self.day, 1)[0]
+        self.assertEqual(schedule['slots'][0], {'start': '09:00', 'end': '09:30', 'capacity': 2})
+        self.assertEqual(schedule['max_in_day'], 6)
+        self.assertEqual(self.starts(self.day + timedelta(days=1)), [])
+
+    def test_blackouts_drop_overlapping_slots(self):
+        blackouts = [blackout_interval(Unavailability(allday=False, start_time=time(9, 15), end_time=time(10)))]
+        self.assertEqual([slot['start'] for slot in day_schedule([self.availability], blackouts)['slots']], ['10:00', '17:00', '17:30'])
+        self.assertEqual(day_schedule([self.availability], [blackout_interval(Unavailability(allday=True))])['slots'], [])
+
+    def test_days_are_cached_until_the_schedule_changes(self):
+        self.starts()
+        with self.assertNumQueries(0):
+            self.starts()
+        with self.captureOnCommitCallbacks(execute=True):
+            Unavailability.objects.create(listing=self.listing, dateofunavailability=self.day, allday=False, start_time=time(17), end_time=time(18))
+        self.assertEqual(self.starts(), ['09:00', '09:30', '10:00'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.availability.slot_time = '15'
+            self.availability.save()
+        self.assertEqual(len(self.starts()), 6)
+
+    def test_cached_days_survive_a_lost_version_entry(self):
+        # The stamp is stored in the database: another worker, or a cache eviction, reads the same one
+        self.starts()
+        version = get_version(version_label(self.listing.id))
+        cache.delete(f'version:{version_label(self.listing.id)}')
+        with self.assertNumQueries(1):  # the stamp, not the schedule
+            self.starts()
+        self.assertEqual(get_version(version_label(self.listing.id)), version)
+
+    def test_range_is_clamped(self):
+        self.assertEqual(len(listing_schedule(self.listing.id, self.day, 100)), MAX_RANGE_DAYS)
+        self.assertEqual(len(listing_schedule(self.listing.id, self.day, 0)), 1)
+
+    def test_slots_endpoint_reports_available_places(self):
+        response = self.client.get(f'/api/listing/listings/{self.listing.id}/slots', {'start': self.day.isoformat(), 'days': 1})
+        day = response.json()['data'][0]
+        self.assertEqual(day['available_in_day'], 6)
+        self.assertEqual({slot['available'] for slot in day['slots']}, {2})
+
+
+class AvailabilityFilterTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()  # coverage marks of earlier tests' days
+        self.day = date.today() + timedelta(days=1)
+        weekday = WEEKDAYS[self.day.weekday()]
+        self.morning = make_listing('Morning Clinic', self.user, self.location)
+        self.evening = make_listing('Evening Clinic', self.user, self.location)
+        self.closed = make_listing('Closed Clinic', self.user, self.location)
+        with self.captureOnCommitCallbacks(execute=True):
+            Availability.objects.create(listing=self.morning, day=weekday, start_time=time(9), end_time=time(12), slot_time='30')
+            Availability.objects.create(listing=self.evening, day=weekday, start_time=time(17), end_time=time(20), slot_time='30')
+
+    def available(self, start, end):
+        return set(filter_available(Listing.objects.all(), self.day, start, end))
+
+    def test_cell_mask(self):
+        self.assertEqual(cell_mask(0, 5), 0b1)
+        self.assertEqual(cell_mask(10, 20), 0b1100)
+        self.assertEqual(cell_mask(12, 13), 0b100)
+
+    def test_bitmaps_follow_availability_changes(self):
+        self.assertEqual(AvailabilityBitmap.objects.filter(date=self.day).count(), 2)
+        self.assertEqual(self.available(0, 24 * 60), {self.morning, self.evening})
+        self.assertEqual(self.available(18 * 60, 21 * 60), {self.evening})
+        with self.captureOnCommitCallbacks(execute=True):
+            Unavailability.objects.create(listing=self.evening, dateofunavailability=self.day, allday=True)
+        self.assertEqual(self.available(0, 24 * 60), {self.morning})
+
+    def test_missing_candidate_bitmaps_are_filled_in(self):
+        AvailabilityBitmap.objects.filter(listing=self.evening).delete()
+        with mock.patch('listings.availability.refresh_bitmaps', wraps=refresh_bitmaps) as refresh:
+            self.assertEqual(set(filter_available(Listing.objects.exclude(id=self.morning.id), self.day)), {self.evening})
+        refresh.assert_called_once_with([self.evening.id], start=self.day, days=1)
+        with self.assertNumQueries(3):  # nothing missing: the check, the bitmaps and the listings
+            self.assertEqual(self.available(0, 24 * 60), {self.morning, self.evening})
+
+    def test_covered_days_skip_the_fallback(self):
+        call_command('refresh_availability_bitmaps', stdout=io.StringIO())
+        with self.assertNumQueries(2):  # the bitmaps and the listings
+            self.assertEqual(self.available(0, 24 * 60), {self.morning, self.evening})
+
+    def test_one_request_fills_in_at_a_time(self):
+        AvailabilityBitmap.objects.all().delete()
+        cache.add(FILL_LOCK_KEY.format(self.day.isoformat()), True)
+        self.assertEqual(self.available(0, 24 * 60), set())
+        cache.clear()
+        self.assertEqual(self.available(0, 24 * 60), {self.morning, self.evening})
+
+    def test_schedule_changes_apply_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Unavailability.objects.create(listing=self.evening, dateofunavailability=self.day, allday=True)
+        self.assertTrue(AvailabilityBitmap.objects.filter(listing=self.evening, date=self.day).exists())
+        for callback in callbacks:
+            callback()
+        self.assertFalse(AvailabilityBitmap.objects.filter(listing=self.evening, date=self.day).exists())
+
+    def test_available_on_filter(self):
+        response = self.client.get('/api/listing/listings', {
+            'available_on': self.day.isoformat(), 'available_from': '16:00', 'available_to': '22:00',
+        })
+        self.assertEqual([row['id'] for row in response.json()['data']], [self.evening.id])
+        response = self.client.get('/api/listing/listings', {'available_on': (self.day + timedelta(days=365)).isoformat()})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkScheduleTests(ListingFixtureMixin, TestCase):
+    def entry(self, listing, day, **extra):
+        values = {
+            'listing_id': listing.id, 'day': day, 'start_time': time(9), 'end_time': time(13),
+            'start_time2': None, 'end_time2': None, 'start_time3': None, 'end_time3': None,
+            'slot_time': '30', 'max_in_slot': 2, 'max_in_day': 10, 'status': True,
+        }
+        values.update(extra)
+        return values
+
+    def test_creates_then_updates(self):
+        listings = [make_listing(f'Clinic {number}', self.user, self.location) for number in range(3)]
+        entries = [self.entry(listing, day) for listing in listings for day in ('monday', 'tuesday')]
+        result, errors = bulk_upsert_schedules(self.user, entries)
+        self.assertEqual((result, errors), ({"created": 6, "updated": 0}, []))
+
+        entries = [self.entry(listing, day, max_in_slot=4) for listing in listings for day in ('MONDAY', 'TUESDAY')]
+        with self.captureOnCommitCallbacks(execute=True):
+            result, errors = bulk_upsert_schedules(self.user, entries)
+        self.assertEqual(result, {"created": 0, "updated": 6})
+        self.assertEqual(set(Availability.objects.values_list('max_in_slot', flat=True)), {4})
+        self.assertTrue(AvailabilityBitmap.objects.filter(listing=listings[0]).exists())
+
+    def test_invalid_entries_write_nothing(self):
+        listing = make_listing('Clinic', self.user, self.location)
+        other = CustomUser.objects.create(mobile='9000000001', name='Other', usertype='doctor')
+        foreign = make_listing('Foreign Clinic', other, self.location)
+        entries = [
+            self.entry(listing, 'MONDAY'),
+            self.entry(listing, 'FUNDAY'),
+            self.entry(listing, 'TUESDAY', start_time2=time(12), end_time2=time(14)),
+            self.entry(foreign, 'MONDAY'),
+            self.entry(listing, 'MONDAY'),
+        ]
+        result, errors = bulk_upsert_schedules(self.user, entries)
+        self.assertIsNone(result)
+        self.assertEqual([error['index'] for error in errors], [1, 2, 3, 4])
+        self.assertIn("Slot 2 overlaps with slot 1.", errors[1]['errors'])
+        self.assertFalse(Availability.objects.exists())
@@ -1,34 +1,152 @@
 # views.py
+from datetime import date, time, timedelta
+from typing import Optional
 from ninja import Router
+from ninja.errors import HttpError
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import Listing
-from .serializers import ListingSerializer
-from django.db.models import Q
+from django.utils import timezone
+from .models import Listing, Review
+from .serializers import ListingCardSchema, ReviewSchema
+from .search import query_terms, search_listings
+from .facets import apply_facet_filters, facet_index
+from .search_cache import response_tags, search_cache
+from .nearby import MAX_RADIUS_KM, nearby_listings
+from .documents import get_listing_document
+from .ratings import with_rating
+from .fuzzy import fuzzy_listings
+from .slots import listing_schedule
+from .booking import with_bookings
+from .availability import filter_available, horizon_days
+from config.utils.api_helpers import success_response
+from config.utils.pagination import get_page_size, paginate_queryset
 
 router = Router()
 
-@router.get("/listings", response=ListingSerializer)
-def list_listings(request):
+@router.get("/listings", response=dict)
+def list_listings(
+    request,
+    query: str = '',
+    city: Optional[int] = None,
+    specialization: Optional[int] = None,
+    service: Optional[int] = None,
+    fee_band: Optional[str] = None,
+    verification: Optional[str] = None,
+    facets: bool = False,
+    sort: Optional[str] = None,
+    available_on: Optional[date] = None,
+    available_from: Optional[time] = None,
+    available_to: Optional[time] = None,
+):
     """
     List all active listings publicly.
     Can be filtered by location, specialization, service, etc.
+    Results are paginated with `limit` and the `cursor` returned as `next_cursor`.
+    With `facets=true` the response also carries per-facet counts for the whole result set.
+    `sort=rating` orders by average rating instead of relevance/title.
+    `available_on` keeps listings with a bookable slot that day, optionally between
+    `available_from` and `available_to`.
     """
-    query = request.GET.get('query', '')
-    listings = Listing.objects.filter(
-        Q(title__icontains=query) |
-        Q(services__icontains=query) |
-        Q(specializations__icontains=query) |
-        Q(state__name__icontains=query) |
-        Q(city__name__icontains=query) |
-        Q(location__name__icontains=query)
-    ).filter(is_active=True)  # Ensure only active listings are shown
+    filters = {
+        'city': city,
+        'specialization': specialization,
+        'service': service,
+        'fee_band': fee_band,
+        'verification': verification,
+    }
+    window = None
+    if available_on is not None:
+        today = timezone.localdate()
+        if not today <= available_on < today + timedelta(days=horizon_days()):
+            raise HttpError(400, f"available_on must be within the next {horizon_days()} days")
+        start = available_from.hour * 60 + available_from.minute if available_from else 0
+        end = available_to.hour * 60 + available_to.minute if available_to else 24 * 60
+        if start >= end:
+            raise HttpError(400, "available_from must be before available_to")
+        window = (available_on, start, end)
 
-    return listings
+    terms = query_terms(query)
+    cache_key = search_cache.make_key(
+        terms, filters, cursor=request.GET.get('cursor'), limit=get_page_size(request), facets=facets, sort=sort,
+        window=window,
+    )
+    response = search_cache.get(cache_key)
+    if response is not None:
+        return response
 
-@router.get("/listings/{listing_id}", response=ListingSerializer)
+    active = Listing.objects.filter(status=True)  # Ensure only active listings are shown
+    matched = search_listings(active, query)
+    searched = filter_available(matched, *window) if window else matched
+    ordering = ('-rating_average', '-rating_count', 'id') if sort == 'rating' else None
+    page, next_cursor = paginate_queryset(with_rating(apply_facet_filters(searched, filters)), request, ordering=ordering)
+
+    meta = {}
+    if terms and not page and not matched.exists():
+        # Nothing matched exactly: retry with typo-tolerant trigram matching.
+        searched, meta["suggestions"] = fuzzy_listings(active, query)
+        if window:
+            searched = filter_available(searched, *window)
+        page, next_cursor = paginate_queryset(with_rating(apply_facet_filters(searched, filters)), request, ordering=ordering)
+
+    data = [ListingCardSchema.from_orm(listing).dict() for listing in page]
+    meta["next_cursor"] = next_cursor
+    if facets:
+        candidate_ids = searched.values_list('id', flat=True) if terms or window else None
+        meta["facets"] = facet_index.counts(candidate_ids, filters)
+    response = success_response(message="Listings fetched successfully", data=data, **meta)
+    search_cache.set(cache_key, response, response_tags(
+        terms, filters, [row["id"] for row in data], facets, bool(window), sort == 'rating',
+    ))
+    return response
+
+@router.get("/listings/nearby", response=dict)
+def list_nearby_listings(request, lat: float, lng: float, radius_km: Optional[float] = None):
+    """
+    List active listings near a point, nearest first.
+    With `radius_km` (at most 50 km) returns listings inside that radius, otherwise
+    the nearest `limit` listings.
+    """
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise HttpError(400, "Invalid coordinates")
+    if radius_km is not None and radius_km <= 0:
+        raise HttpError(400, "radius_km must be positive")
+    if radius_km is not None and radius_km > MAX_RADIUS_KM:
+        raise HttpError(422, f"radius_km must be at most {MAX_RADIUS_KM}")
+
+    results = nearby_listings(lat, lng, radius_km=radius_km, limit=get_page_size(request))
+    data = [
+        {**ListingCardSchema.from_orm(listing).dict(), "distance_km": round(distance, 3)}
+        for listing, distance in results
+    ]
+    return success_response(message="Listings fetched successfully", data=data)
+
+@router.get("/listings/{listing_id}", response=dict)
 def get_listing(request, listing_id: int):
     """
     Retrieve a listing by its ID (public view).
+    Served from the precomputed listing document.
+    """
+    document = get_listing_document(listing_id)
+    if not document or not document["status"]:
+        raise Http404("Listing not found")
+    return success_response(message="Listing fetched successfully", data=document)
+
+@router.get("/listings/{listing_id}/slots", response=dict)
+def list_slots(request, listing_id: int, start: Optional[date] = None, days: int = 7):
+    """
+    Bookable slots of a listing for `days` days (at most 31) from `start` (default today),
+    with the places still `available` in each slot and day.
+    """
+    get_object_or_404(Listing, pk=listing_id, status=True)
+    schedule = with_bookings(listing_id, listing_schedule(listing_id, start or timezone.localdate(), days))
+    return success_response(message="Slots fetched successfully", data=schedule)
+
+@router.get("/listings/{listing_id}/reviews", response=dict)
+def list_reviews(request, listing_id: int):
+    """
+    List the published reviews of a listing, newest first.
     """
-    listing = get_object_or_404(Listing, pk=listing_id, is_active=True)
-    return listing
+    reviews = Review.objects.filter(listing_id=listing_id, status=True)
+    page, next_cursor = paginate_queryset(reviews, request, ordering=('-created_at', '-id'))
+    data = [ReviewSchema.from_orm(review).dict() for review in page]
+    return success_response(message="Reviews fetched successfully", data=data, next_cursor=next_cursor)
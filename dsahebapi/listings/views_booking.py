@@ -0,0 +1,48 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from ninja import Router
+from .models import Appointment, Listing
+from .serializers import AppointmentCreateSchema, AppointmentSchema
+from .booking import BookingError, book_appointment, cancel_appointment
+from config.utils.jwt_auth import JWTAuth
+from config.utils.api_helpers import success_response, failure_response
+from config.utils.pagination import paginate_queryset
+
+router = Router(auth=JWTAuth())
+
+
+@router.post("/appointments", response=dict)
+def create_appointment(request, data: AppointmentCreateSchema):
+    """
+    Book a slot of a listing for the authenticated user.
+    """
+    get_object_or_404(Listing, pk=data.listing_id, status=True)
+    try:
+        appointment = book_appointment(data.listing_id, request.auth, data.date, data.start_time)
+    except BookingError as e:
+        return JsonResponse(failure_response(message=str(e)), status=409)
+    return success_response(message="Appointment booked successfully", data=AppointmentSchema.from_orm(appointment).dict())
+
+
+@router.get("/appointments", response=dict)
+def list_appointments(request):
+    """
+    List the appointments of the authenticated user, past and upcoming, by date and start time.
+    """
+    appointments = Appointment.objects.filter(user=request.auth)
+    page, next_cursor = paginate_queryset(appointments, request, ordering=('date', 'start_time'))
+    data = [AppointmentSchema.from_orm(appointment).dict() for appointment in page]
+    return success_response(message="Appointments fetched successfully", data=data, next_cursor=next_cursor)
+
+
+@router.post("/appointments/{appointment_id}/cancel", response=dict)
+def cancel_appointment_view(request, appointment_id: int):
+    """
+    Cancel one of the authenticated user's appointments.
+    """
+    appointment = get_object_or_404(Appointment, pk=appointment_id, user=request.auth)
+    try:
+        cancel_appointment(appointment)
+    except BookingError as e:
+        return JsonResponse(failure_response(message=str(e)), status=409)
+    return success_response(message="Appointment cancelled successfully", data=AppointmentSchema.from_orm(appointment).dict())
@@ -4,30 +4,19 @@ from typing import Dict
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import ValidationError
 from .models import Listing, Education, Training, RegistrationList, Experience
-from .serializers import ListingSerializer, ListingCreateSerializer, EducationSchema, TrainingSchema, RegistrationListSchema, ExperienceSchema,EducationSchema,TrainingSchema, RegistrationListSchema,ExperienceSchema
+from .serializers import BulkScheduleSchema, ListingSerializer, ListingCardSchema, ListingCreateSerializer, EducationSchema, TrainingSchema, RegistrationListSchema, ExperienceSchema,EducationSchema,TrainingSchema, RegistrationListSchema,ExperienceSchema
 from django.utils import timezone
-from ninja.security import HttpBearer
+from config.utils.jwt_auth import JWTAuth
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from config.utils.api_helpers import success_response, error_response, failure_response  # Assuming these are defined in utils.py
+from config.utils.pagination import paginate_queryset
+from .ratings import with_rating
+from .schedules import bulk_upsert_schedules
 from django.http import JsonResponse
 from typing import List
 
 
-# # JWT authentication for endpoints
-class JWTAuth(HttpBearer):
-    def authenticate(self, request, token):
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        try:
-            validated_token = JWTAuthentication().get_validated_token(token)
-            user = JWTAuthentication().get_user(validated_token)
-            return user
-        except Exception:
-            return None
-    
-    class Config:
-        arbitrary_types_allowed = True
-
 # Common headers for responses
 COMMON_HEADERS = {
     "Content-Type": "application/json",
@@ -35,7 +24,7 @@ COMMON_HEADERS = {
 
 # Creating an instance of the JWTAuth class
 auth = JWTAuth()
-router = Router(auth=JWTAuth)
+router = Router(auth=auth)
 
 
 
@@ -125,15 +114,17 @@ def delete_listing(request, listing_id: int):
         return error_response(message=f"Error deleting listing: {str(e)}")
 
 
-@router.get("/listings/my-listings", response=ListingSerializer)
+@router.get("/listings/my-listings", response=dict)
 def list_my_listings(request):
     """
     List all active listings created by the authenticated doctor or hospital.
     """
     user = request.auth  # This is automatically set by JWTAuth
     try:
-        listings = Listing.objects.filter(created_by=user.id, is_active=True)
-        return success_response(message="Listings fetched successfully", data=listings)
+        listings = with_rating(Listing.objects.filter(created_by=user.id, status=True))
+        page, next_cursor = paginate_queryset(listings, request)
+        data = [ListingCardSchema.from_orm(listing).dict() for listing in page]
+        return success_response(message="Listings fetched successfully", data=data, next_cursor=next_cursor)
     except Exception as e:
         return error_response(message=f"Error fetching listings: {str(e)}")
 
@@ -156,6 +147,19 @@ def search_my_listings(request, query: str):
     
 
 
+@router.post("/schedules/bulk", response=dict)
+def bulk_schedules(request, payload: BulkScheduleSchema):
+    """
+    Create or update the weekly schedule of many listings in one request.
+    Nothing is written if any entry is invalid; the errors are returned per entry.
+    """
+    user = request.auth
+    result, errors = bulk_upsert_schedules(user, [entry.dict() for entry in payload.entries])
+    if errors:
+        return JsonResponse(failure_response(message="Invalid schedule entries", data=errors), status=400)
+    return success_response(message="Schedules saved successfully", data=result)
+
+
 @router.post("/educations", response=EducationSchema)
 def create_education(request, payload: EducationSchema):
     """
@@ -166,14 +170,16 @@ def create_education(request, payload: EducationSchema):
     return success_response(message="Education record created successfully", data=education)
 
 
-@router.get("/educations", response=EducationSchema)
+@router.get("/educations", response=dict)
 def list_educations(request):
     """
     Fetch all education records for the authenticated user.
     """
     user = request.auth
     educations = Education.objects.filter(user=user)
-    return success_response(message="Education records fetched successfully", data=educations)
+    page, next_cursor = paginate_queryset(educations, request, ordering=('id',))
+    data = [EducationSchema.from_orm(item).dict() for item in page]
+    return success_response(message="Education records fetched successfully", data=data, next_cursor=next_cursor)
 
 
 @router.get("/educations/{id}", response=EducationSchema)
@@ -221,14 +227,16 @@ def create_training(request, payload: TrainingSchema):
     return success_response(message="Training record created successfully", data=training)
 
 
-@router.get("/trainings", response=TrainingSchema)
+@router.get("/trainings", response=dict)
 def list_trainings(request):
     """
     Fetch all training records for the authenticated user.
     """
     user = request.auth
     trainings = Training.objects.filter(user=user)
-    return success_response(message="Training records fetched successfully", data=trainings)
+    page, next_cursor = paginate_queryset(trainings, request, ordering=('id',))
+    data = [TrainingSchema.from_orm(item).dict() for item in page]
+    return success_response(message="Training records fetched successfully", data=data, next_cursor=next_cursor)
 
 
 @router.get("/trainings/{id}", response=TrainingSchema)
@@ -276,14 +284,16 @@ def create_registration(request, payload: RegistrationListSchema):
     return success_response(message="Registration record created successfully", data=registration)
 
 
-@router.get("/registrations", response=RegistrationListSchema)
+@router.get("/registrations", response=dict)
 def list_registrations(request):
     """
     Fetch all registration records for the authenticated user.
     """
     user = request.auth
     registrations = RegistrationList.objects.filter(user=user)
-    return success_response(message="Registration records fetched successfully", data=registrations)
+    page, next_cursor = paginate_queryset(registrations, request, ordering=('id',))
+    data = [RegistrationListSchema.from_orm(item).dict() for item in page]
+    return success_response(message="Registration records fetched successfully", data=data, next_cursor=next_cursor)
 
 
 @router.get("/registrations/{id}", response=RegistrationListSchema)
@@ -331,14 +341,16 @@ def create_experience(request, payload: ExperienceSchema):
     return success_response(message="Experience record created successfully", data=experience)
 
 
-@router.get("/experiences", response=ExperienceSchema)
+@router.get("/experiences", response=dict)
 def list_experiences(request):
     """
     Fetch all experience records for the authenticated user.
     """
     user = request.auth
     experiences = Experience.objects.filter(user=user)
-    return success_response(message="Experience records fetched successfully", data=experiences)
+    page, next_cursor = paginate_queryset(experiences, request, ordering=('id',))
+    data = [ExperienceSchema.from_orm(item).dict() for item in page]
+    return success_response(message="Experience records fetched successfully", data=data, next_cursor=next_cursor)
 
 
 @router.get("/experiences/{id}", response=ExperienceSchema)